@@ -0,0 +1,2 @@
+from .export import TrackExporter, load_export, load_track_table
+from .summary import player_summaries, team_summaries
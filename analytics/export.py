@@ -0,0 +1,197 @@
+import glob
+import json
+import os
+import numpy as np
+import sys
+sys.path.append('../')
+from trackers import TrackTable, OBJECT_CLASSES
+from .summary import player_summaries, team_summaries
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet output is optional, NPZ always works
+    pyarrow = None
+
+EXPORT_COLUMNS = ("frame", "track_id", "cls", "bbox", "position_transformed", "team", "speed", "distance", "has_ball")
+
+VECTOR_COLUMNS = {"bbox": ("x1", "y1", "x2", "y2"), "position_transformed": ("x", "y"), "camera_movement": ("x", "y")}
+
+def flatten_columns(columns):
+    # 2-D columns become one column per component (bbox_x1 ... position_transformed_y), for Parquet/Arrow
+    flat = {}
+    for name, column in columns.items():
+        if name in VECTOR_COLUMNS:
+            for index, suffix in enumerate(VECTOR_COLUMNS[name]):
+                flat[f"{name}_{suffix}"] = column[:, index]
+        else:
+            flat[name] = column
+    return flat
+
+def unflatten_columns(flat):
+    flat = dict(flat)
+    columns = {}
+    for name, suffixes in VECTOR_COLUMNS.items():
+        parts = [f"{name}_{suffix}" for suffix in suffixes]
+        if all(part in flat for part in parts):
+            columns[name] = np.stack([flat.pop(part) for part in parts], axis=1)
+    columns.update(flat)
+    return columns
+
+class TrackExporter():
+    # Writes per-frame, per-track rows (bbox, position_transformed, team, speed, distance, has_ball) and per-frame
+    # rows (team in control of the ball, camera movement) to `directory` as numbered chunk files while the run
+    # is going, in NPZ or (with pyarrow installed) Parquet. close() writes a manifest and the per-player and
+    # per-team summaries, so downstream tools never need to run the pipeline again; with the source video_path
+    # the export is also all renderer.render_export needs to draw the annotated video later
+    def __init__(self, directory, format='npz', frame_rate=24, chunk_frames=1500, sprint_speed=25.0, video_path=None):
+        if format not in ('npz', 'parquet'):
+            raise ValueError(f"unknown export format '{format}'")
+        if format == 'parquet' and pyarrow is None:
+            raise ImportError("Parquet export needs pyarrow (pip install pyarrow); use format='npz' otherwise")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.format = format
+        self.frame_rate = frame_rate
+        self.chunk_frames = chunk_frames  # Tables longer than this are split into several chunk files
+        self.sprint_speed = sprint_speed
+        self.video_path = video_path
+        self.chunks = []  # Clip frame range [start, stop) of every chunk
+        self.num_chunks = 0
+        self.num_frames = 0
+        self.team_colors = {}
+        self._summary_columns = []  # Only the columns the summaries need, kept until close()
+        self._team_ball_control = []
+
+    def _write(self, kind, columns):
+        path = os.path.join(self.directory, f"{kind}_{self.num_chunks:06d}.{self.format}")
+        if self.format == 'npz':
+            np.savez(path, **columns)
+        else:
+            pyarrow.parquet.write_table(pyarrow.table(flatten_columns(columns)), path)
+
+    def write_table(self, table, start_frame=0, team_ball_control=None, camera_movement=None):
+        # Rows of a TrackTable whose frame 0 is clip frame start_frame; per-frame arrays are aligned with the table
+        columns = table.to_columns()
+        clip_frame = columns["frame"].astype(np.int64) + start_frame
+        per_frame = {}
+        if team_ball_control is not None:
+            per_frame["team_ball_control"] = np.asarray(team_ball_control, dtype=np.int8)
+        if camera_movement is not None:
+            per_frame["camera_movement"] = np.asarray(camera_movement, dtype=np.float32).reshape(-1, 2)
+        self.team_colors.update({int(team): np.asarray(color).tolist() for team, color in table.team_colors.items()})
+
+        for chunk_start in range(0, max(table.num_frames, 1), self.chunk_frames):
+            chunk_stop = min(chunk_start + self.chunk_frames, table.num_frames)
+            rows = slice(*np.searchsorted(columns["frame"], [chunk_start, chunk_stop]))  # Rows are sorted by frame
+            chunk = {name: columns[name][rows] for name in EXPORT_COLUMNS}
+            chunk["frame"] = clip_frame[rows]
+            self._write("tracks", chunk)
+            if per_frame:
+                frames = {"frame": np.arange(start_frame + chunk_start, start_frame + chunk_stop)}
+                frames.update({name: column[chunk_start:chunk_stop] for name, column in per_frame.items()})
+                self._write("frames", frames)
+            self._summary_columns.append({name: chunk[name] for name in ("frame", "track_id", "cls", "speed", "distance", "team", "has_ball")})
+            self.chunks.append([start_frame + chunk_start, start_frame + chunk_stop])
+            self.num_chunks += 1
+
+        if team_ball_control is not None:
+            self._team_ball_control.append(per_frame["team_ball_control"])
+        self.num_frames = max(self.num_frames, start_frame + table.num_frames)
+
+    def write_tracks(self, tracks, start_frame=0, team_ball_control=None, camera_movement=None):
+        # Same for the nested per-frame dicts of a streamed window
+        self.write_table(TrackTable.from_tracks(tracks), start_frame, team_ball_control, camera_movement)
+
+    def summaries(self):
+        columns = {name: np.concatenate([chunk[name] for chunk in self._summary_columns]) for name in self._summary_columns[0]} if self._summary_columns else None
+        players = player_summaries(columns, self.frame_rate, self.sprint_speed) if columns else None
+        teams = team_summaries(np.concatenate(self._team_ball_control), self.frame_rate) if self._team_ball_control else None
+        return players, teams
+
+    def close(self):
+        players, teams = self.summaries()
+        for name, summary in (("player_summary", players), ("team_summary", teams)):
+            if summary is None:
+                continue
+            path = os.path.join(self.directory, f"{name}.{self.format}")
+            if self.format == 'npz':
+                np.savez(path, **summary)
+            else:
+                pyarrow.parquet.write_table(pyarrow.table(summary), path)
+
+        manifest = {
+            "format": self.format,
+            "frame_rate": self.frame_rate,
+            "num_frames": self.num_frames,
+            "num_chunks": self.num_chunks,
+            "chunks": self.chunks,
+            "video_path": os.path.abspath(self.video_path) if self.video_path is not None else None,
+            "object_classes": list(OBJECT_CLASSES),  # cls column codes
+            "team_colors": self.team_colors,
+            "units": {"position_transformed": "m", "speed": "km/h", "distance": "m"}
+        }
+        with open(os.path.join(self.directory, "manifest.json"), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return players, teams
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _read(path):
+    if path.endswith('.npz'):
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+    if pyarrow is None:
+        raise ImportError("Reading a Parquet export needs pyarrow")
+    table = pyarrow.parquet.read_table(path)
+    return unflatten_columns({name: table.column(name).to_numpy() for name in table.column_names})
+
+def _empty_column(template, length):
+    # A column the export does not carry, filled the way TrackTable initialises it
+    fill = np.nan if template.dtype.kind == 'f' else 0
+    return np.full((length,) + template.shape[1:], fill, dtype=template.dtype)
+
+def load_track_table(directory, start_frame=0, stop_frame=None):
+    # TrackTable of clip frames [start_frame, stop_frame) of an export, renumbered to start at 0, plus the
+    # per-frame columns of the same frames and the manifest; only the chunks overlapping the range are read
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    stop_frame = manifest["num_frames"] if stop_frame is None else min(stop_frame, manifest["num_frames"])
+    tracks, frames = [], []
+    for index, (chunk_start, chunk_stop) in enumerate(manifest["chunks"]):
+        if chunk_stop <= start_frame or chunk_start >= stop_frame:
+            continue
+        chunk = _read(os.path.join(directory, f"tracks_{index:06d}.{manifest['format']}"))
+        keep = (chunk["frame"] >= start_frame) & (chunk["frame"] < stop_frame)
+        tracks.append({name: column[keep] for name, column in chunk.items()})
+        frames_path = os.path.join(directory, f"frames_{index:06d}.{manifest['format']}")
+        if os.path.exists(frames_path):
+            chunk = _read(frames_path)
+            keep = (chunk["frame"] >= start_frame) & (chunk["frame"] < stop_frame)
+            frames.append({name: column[keep] for name, column in chunk.items()})
+
+    num_frames = max(stop_frame - start_frame, 0)
+    columns = {name: np.concatenate([chunk[name] for chunk in tracks]) for name in tracks[0]} if tracks else {}
+    rows = len(columns.get("frame", []))
+    templates = TrackTable([], [], [], [], num_frames=0).to_columns()
+    columns = {name: columns[name] if name in columns else _empty_column(template, rows) for name, template in templates.items()}
+    columns["frame"] = columns["frame"] - start_frame
+    table = TrackTable.from_columns(columns, num_frames)
+    table.team_colors.update({int(team): color for team, color in manifest["team_colors"].items()})
+    table.computed.add(("position_transformed", OBJECT_CLASSES.index("players")))  # Missing positions were None in the run
+    frames = {name: np.concatenate([chunk[name] for chunk in frames]) for name in frames[0]} if frames else {}
+    return table, frames, manifest
+
+def load_export(directory, kind='tracks'):
+    # All chunks of an export concatenated: kind 'tracks' gives TrackTable columns, 'frames' the per-frame columns
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    paths = sorted(glob.glob(os.path.join(directory, f"{kind}_*.{manifest['format']}")))
+    chunks = [_read(path) for path in paths]
+    if not chunks:
+        return {}, manifest
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}, manifest
@@ -0,0 +1,77 @@
+import numpy as np
+import sys
+sys.path.append('../')
+from trackers import OBJECT_CLASSES
+
+PLAYERS = OBJECT_CLASSES.index("players")
+
+def player_summaries(columns, frame_rate=24, sprint_speed=25.0, min_sprint_frames=12):
+    # Per-player aggregates of a whole match from track columns (a TrackTable's to_columns() or load_tracks()),
+    # computed with one sort and segment reductions instead of a loop over players. A sprint is a run of at least
+    # min_sprint_frames consecutive frames at sprint_speed km/h or more. Returns one array per field, one entry
+    # per player track id
+    rows = np.flatnonzero(columns["cls"] == PLAYERS)
+    rows = rows[np.lexsort((columns["frame"][rows], columns["track_id"][rows]))]  # Every track contiguous, in frame order
+    track_ids = columns["track_id"][rows].astype(np.int64)
+    frames = columns["frame"][rows].astype(np.int64)
+    speed = columns["speed"][rows].astype(np.float64)
+    distance = columns["distance"][rows].astype(np.float64)
+    team = columns["team"][rows].astype(np.int64)
+    has_ball = columns["has_ball"][rows]
+
+    if len(rows) == 0:
+        empty = np.zeros(0)
+        return {"track_id": empty.astype(np.int64), "team": empty.astype(np.int64), "frames": empty.astype(np.int64),
+                "seconds_seen": empty, "distance_m": empty, "top_speed_kmh": empty, "mean_speed_kmh": empty,
+                "sprints": empty.astype(np.int64), "possession_s": empty}
+
+    starts = np.flatnonzero(np.r_[True, track_ids[1:] != track_ids[:-1]])
+    group = np.cumsum(np.r_[True, track_ids[1:] != track_ids[:-1]]) - 1  # Player index of every row
+    num_players = len(starts)
+    counts = np.diff(np.r_[starts, len(rows)])
+
+    with np.errstate(invalid='ignore'):
+        distance_m = np.fmax.reduceat(distance, starts)  # Distance is cumulative per track; fmax skips NaN
+        top_speed = np.fmax.reduceat(speed, starts)
+    valid_speed = ~np.isnan(speed)
+    speed_counts = np.bincount(group, weights=valid_speed, minlength=num_players)
+    speed_sums = np.bincount(group, weights=np.where(valid_speed, speed, 0.0), minlength=num_players)
+    mean_speed = np.divide(speed_sums, speed_counts, out=np.full(num_players, np.nan), where=speed_counts > 0)
+
+    # Sprints: runs of consecutive frames of one track above the sprint speed
+    fast = valid_speed & (speed >= sprint_speed)
+    continues = np.r_[False, fast[:-1] & (group[1:] == group[:-1]) & (frames[1:] == frames[:-1] + 1)]
+    run_starts = fast & ~continues
+    run_ids = np.cumsum(run_starts) - 1
+    run_lengths = np.bincount(run_ids[fast], minlength=int(run_starts.sum()))
+    run_players = group[run_starts]
+    sprints = np.bincount(run_players[run_lengths >= min_sprint_frames], minlength=num_players)
+
+    # The team a player was assigned most often (0 when never assigned)
+    team_counts = np.bincount(group * 3 + np.clip(team, 0, 2), minlength=num_players * 3).reshape(num_players, 3)
+    team_counts[:, 0] = 0
+    main_team = np.where(team_counts.max(axis=1) > 0, team_counts.argmax(axis=1), 0)
+
+    return {
+        "track_id": track_ids[starts],
+        "team": main_team,
+        "frames": counts,
+        "seconds_seen": counts / frame_rate,
+        "distance_m": np.nan_to_num(distance_m),
+        "top_speed_kmh": top_speed,
+        "mean_speed_kmh": mean_speed,
+        "sprints": sprints,
+        "possession_s": np.bincount(group, weights=has_ball, minlength=num_players) / frame_rate
+    }
+
+def team_summaries(team_ball_control, frame_rate=24):
+    # Ball control per team from the per-frame team in control (0 = nobody yet)
+    team_ball_control = np.asarray(team_ball_control)
+    counts = np.bincount(team_ball_control, minlength=3)[1:3]
+    total = max(int(counts.sum()), 1)
+    return {
+        "team": np.array([1, 2]),
+        "control_frames": counts,
+        "control_s": counts / frame_rate,
+        "control_percent": counts / total * 100
+    }
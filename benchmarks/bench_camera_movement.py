@@ -0,0 +1,92 @@
+import argparse
+import time
+import numpy as np
+import cv2
+import sys
+sys.path.append('../')
+sys.path.append('.')
+from camera_movement import CameraMovementEstimator
+from tools import read_video_frames
+
+def synthetic_pan(num_frames, size=(1080, 1920), seed=0):
+    # Frames cropped from a large textured image along a smooth random pan; also returns the true movement
+    # per frame in the estimator's convention (old position - new position of the background)
+    rng = np.random.default_rng(seed)
+    velocity = np.cumsum(rng.normal(0, 0.4, size=(num_frames, 2)), axis=0).clip(-6, 6)
+    velocity[0] = 0
+    offsets = np.cumsum(velocity, axis=0)
+    offsets -= offsets.min(axis=0)
+    margin = np.ceil(offsets.max(axis=0)).astype(int) + 2
+
+    texture = rng.integers(0, 256, size=(size[0] + margin[1], size[1] + margin[0], 3), dtype=np.uint8)
+    texture = cv2.GaussianBlur(texture, (0, 0), 2)
+
+    def frames():
+        for x, y in offsets:
+            matrix = np.float32([[1, 0, -x], [0, 1, -y]])  # Sub-pixel crop starting at (x, y)
+            yield cv2.warpAffine(texture, matrix, (size[1], size[0]), flags=cv2.INTER_LINEAR)
+
+    movement = np.zeros((num_frames, 2))
+    movement[1:] = np.diff(offsets, axis=0)  # The camera moves right, so the background moves left
+    return frames, movement
+
+class TimedFrames():
+    # Wraps a frame iterable and measures the time spent producing frames, so decoding is not counted
+    def __init__(self, frames):
+        self.frames = frames
+        self.seconds = 0.0
+
+    def __iter__(self):
+        iterator = iter(self.frames)
+        while True:
+            start = time.perf_counter()
+            try:
+                frame = next(iterator)
+            except StopIteration:
+                return
+            self.seconds += time.perf_counter() - start
+            yield frame
+
+def run(method, make_frames):
+    first_frame = next(iter(make_frames()))
+    estimator = CameraMovementEstimator(first_frame, method=method)
+    frames = TimedFrames(make_frames())
+    start = time.perf_counter()
+    movement = np.array(estimator.get_camera_movement_window(frames), dtype=np.float64)
+    elapsed = time.perf_counter() - start - frames.seconds
+    return movement, len(movement) / elapsed
+
+def main():
+    # Throughput of the camera movement estimators and how far their accumulated camera path drifts
+    # from the legacy estimator (and from the true path on the synthetic pan)
+    parser = argparse.ArgumentParser(description='Camera movement estimator throughput and drift')
+    parser.add_argument('--video', help='Video to run on; a synthetic pan with known movement is used when omitted')
+    parser.add_argument('--max-frames', type=int, default=300)
+    parser.add_argument('--methods', nargs='+', default=['legacy', 'median', 'affine'])
+    args = parser.parse_args()
+
+    if args.video:
+        def make_frames():
+            for frame_num, frame in enumerate(read_video_frames(args.video)):
+                if frame_num == args.max_frames:
+                    return
+                yield frame
+        truth = None
+    else:
+        make_frames, truth = synthetic_pan(args.max_frames)
+
+    results = {method: run(method, make_frames) for method in args.methods}
+    legacy_path = np.cumsum(results['legacy'][0], axis=0) if 'legacy' in results else None
+    for method, (movement, fps) in results.items():
+        path = np.cumsum(movement, axis=0)
+        line = f"{method:<7} {fps:7.1f} frames/s"
+        if legacy_path is not None and method != 'legacy':
+            drift = np.linalg.norm(path - legacy_path, axis=1)
+            line += f"  drift vs legacy: max {drift.max():.1f} px, final {drift[-1]:.1f} px"
+        if truth is not None:
+            error = np.linalg.norm(path - np.cumsum(truth, axis=0), axis=1)
+            line += f"  drift vs truth: max {error.max():.1f} px, final {error[-1]:.1f} px"
+        print(line)
+
+if __name__ == '__main__':
+    main()
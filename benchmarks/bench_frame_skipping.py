@@ -0,0 +1,39 @@
+import argparse
+import time
+import sys
+sys.path.append('../')
+sys.path.append('.')
+from trackers import Tracker
+from tools import read_video, compare_tracks
+
+def run(model_path, frames, **tracker_options):
+    tracker = Tracker(model_path, **tracker_options)
+    start = time.perf_counter()
+    tracks = tracker.track_detections(tracker.detect_frames(frames))
+    return tracks, time.perf_counter() - start, tracker.detected_frames
+
+def main():
+    # Inference cost and accuracy of frame-skipping detection against detecting every frame
+    parser = argparse.ArgumentParser(description='Frame-skipping detection vs full detection')
+    parser.add_argument('--video', required=True)
+    parser.add_argument('--model', default='models/best.pt')
+    parser.add_argument('--max-frames', type=int, default=600)
+    parser.add_argument('--strides', type=int, nargs='+', default=[2, 3, 5])
+    args = parser.parse_args()
+
+    frames = read_video(args.video, stop_frame=args.max_frames)
+    reference, reference_time, _ = run(args.model, frames)
+    print(f"full detection: {len(frames)} detector frames in {reference_time:.1f} s")
+
+    for adaptive_skip in (False, True):
+        for stride in args.strides:
+            tracks, elapsed, detected = run(args.model, frames, detect_every=stride, adaptive_skip=adaptive_skip)
+            report = compare_tracks(reference, tracks)
+            mode = 'adaptive' if adaptive_skip else 'fixed'
+            print(f"{mode} stride {stride}: {detected} detector frames ({len(frames) / detected:.1f}x fewer), "
+                  f"{reference_time / elapsed:.1f}x faster")
+            for object, metrics in report.items():
+                print(f"    {object:<9} recall {metrics['recall']:.3f}  precision {metrics['precision']:.3f}  mean IoU {metrics['mean_iou']:.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import time
+import sys
+sys.path.append('../')
+sys.path.append('.')
+from trackers import Tracker
+from tools import read_video, compare_tracks
+
+def run(model_path, frames, batch_size, **tracker_options):
+    tracker = Tracker(model_path, batch_size=batch_size, **tracker_options)
+    start = time.perf_counter()
+    tracks = tracker.track_detections(tracker.detect_frames(frames))
+    return tracks, time.perf_counter() - start, tracker.inference
+
+def main():
+    # Speedup and recall of region-of-interest, downscaled and tiled-ball inference against full-frame detection
+    parser = argparse.ArgumentParser(description='Region-of-interest and downscaled detection vs full-frame detection')
+    parser.add_argument('--video', required=True)
+    parser.add_argument('--model', default='models/best.pt')
+    parser.add_argument('--max-frames', type=int, default=600)
+    parser.add_argument('--imgsz', type=int, nargs='+', default=[640, 480])
+    parser.add_argument('--batch-sizes', nargs='+', default=['8', 'auto'],
+                        help="Batch sizes to compare at; 'auto' lets the engine tune it (dynamic regions lag more behind larger batches)")
+    args = parser.parse_args()
+
+    frames = read_video(args.video, stop_frame=args.max_frames)
+    for batch_size in args.batch_sizes:
+        batch_size = None if batch_size == 'auto' else int(batch_size)
+        reference, reference_time, _ = run(args.model, frames, batch_size)
+        print(f"batch size {batch_size or 'auto'}, full frame: {len(frames)} frames in {reference_time:.1f} s")
+
+        for imgsz in args.imgsz:
+            for region in (None, 'pitch', 'dynamic'):
+                for ball_tiles in (False, True):
+                    if region is None and imgsz == 640 and not ball_tiles:
+                        continue  # The reference
+                    tracks, elapsed, inference = run(args.model, frames, batch_size, region=region, imgsz=imgsz, ball_tiles=ball_tiles)
+                    report = compare_tracks(reference, tracks)
+                    print(f"region {region or 'full'}, imgsz {imgsz}{', ball tiles' if ball_tiles else ''}: {reference_time / elapsed:.2f}x faster")
+                    print(f"    {inference.report()}")
+                    for object, metrics in report.items():
+                        print(f"    {object:<9} recall {metrics['recall']:.3f}  precision {metrics['precision']:.3f}  mean IoU {metrics['mean_iou']:.3f}")
+
+if __name__ == '__main__':
+    main()
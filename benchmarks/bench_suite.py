@@ -0,0 +1,164 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import time
+import numpy as np
+import cv2
+import sys
+sys.path.append('../')
+sys.path.append('.')
+from trackers import Tracker, TrackTable
+from camera_movement import CameraMovementEstimator
+from view import ViewTransformer
+from team_assigner import TeamAssigner
+from speed_distance import SpeedAndDistance_Estimator
+from player_ball_assigner import PlayerBallAssigner
+from renderer import FrameRenderer
+from synthetic_match import SyntheticMatch
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+class StageTimer():
+    # Seconds per stage; time spent drawing synthetic frames inside a stage is not counted
+    def __init__(self, match):
+        self.match = match
+        self.seconds = {}
+
+    def time(self, name, function, *args):
+        drawing = self.match.render_seconds
+        start = time.perf_counter()
+        result = function(*args)
+        self.seconds[name] = time.perf_counter() - start - (self.match.render_seconds - drawing)
+        return result
+
+def run_pipeline(match, detections, render_chunk=30):
+    # The stages of main.main after detection, in the same order, on the synthetic clip
+    timer = StageTimer(match)
+    table = TrackTable.from_tracks(detections)
+    tracker = Tracker('models/best.pt')  # The stages below never load the YOLO model
+
+    timer.time('positions', tracker.add_position_to_table, table)
+    camera_movement_estimator = CameraMovementEstimator(match[0])
+    camera_movement = timer.time('camera_movement', camera_movement_estimator.get_camera_movement, match)
+    timer.time('camera_adjustment', camera_movement_estimator.add_adjust_positions_to_table, table, camera_movement)
+    timer.time('view_transform', ViewTransformer().add_transformed_position_to_table, table)
+    timer.time('team_assignment', TeamAssigner().assign_teams_to_table, match, table)
+    timer.time('speed_distance', SpeedAndDistance_Estimator().add_speed_and_distance_to_table, table)
+    tracks = table.to_tracks()
+    tracks["ball"] = timer.time('ball_interpolation', tracker.interpolate_ball_positions, tracks["ball"])
+    team_ball_control = timer.time('possession', PlayerBallAssigner().assign_ball_to_tracks, tracks)
+
+    # Rendering draws on the frames in place; frames are drawn (untimed) a chunk at a time to bound memory
+    renderer = FrameRenderer()
+    ball_control_counts = tracker.ball_control_counts(team_ball_control)
+    render_seconds = 0.0
+    for start in range(0, len(match), render_chunk):
+        stop = min(start + render_chunk, len(match))
+        frames = [match[frame_num] for frame_num in range(start, stop)]
+        chunk_tracks = {object: object_tracks[start:stop] for object, object_tracks in tracks.items()}
+        started = time.perf_counter()
+        renderer.render(frames, chunk_tracks, ball_control_counts[start:stop], camera_movement[start:stop])
+        render_seconds += time.perf_counter() - started
+    timer.seconds['render'] = render_seconds
+
+    checks = {
+        "camera_drift_px": float(np.abs(np.cumsum(np.asarray(camera_movement) - match.camera_movement(), axis=0)).max()),
+        "team_accuracy": team_accuracy(table, match)
+    }
+    return timer.seconds, checks
+
+def team_accuracy(table, match):
+    # Share of player rows in the right team, whichever way round team ids 1 and 2 were assigned
+    players = table.object_mask('players')
+    assigned = table.team[players]
+    truth = match.teams[table.track_id[players].astype(int) - 1]
+    if len(truth) == 0:
+        return None
+    return float(max(np.mean(assigned == truth), np.mean(assigned == 3 - truth)))
+
+def benchmark(num_frames, num_players, repeats, seed):
+    # Best of `repeats` runs per stage, each on fresh stage objects
+    match = SyntheticMatch(num_frames, num_players, seed=seed)
+    detections = match.tracks()
+    best = {}
+    for _ in range(repeats):
+        seconds, checks = run_pipeline(match, detections)
+        for name, value in seconds.items():
+            best[name] = min(best.get(name, value), value)
+    return {"stages": best, "checks": checks, "frames": num_frames, "players": num_players}
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count()
+    }
+
+def compare(results, baseline, tolerance, min_seconds):
+    # (config, stage, baseline seconds, seconds) of every stage slower than the baseline by more than the tolerance
+    regressions = []
+    for config, result in results.items():
+        reference = baseline.get("results", {}).get(config)
+        if reference is None:
+            continue
+        for stage, seconds in result["stages"].items():
+            expected = reference["stages"].get(stage)
+            if expected is not None and seconds > expected * (1 + tolerance) and seconds - expected > min_seconds:
+                regressions.append((config, stage, expected, seconds))
+    return regressions
+
+def main():
+    # Per-stage timings on synthetic matches of several lengths and player counts, compared to a stored baseline.
+    # Baselines are machine specific: record one with --save-baseline on the machine the suite runs on
+    parser = argparse.ArgumentParser(description='End-to-end stage benchmarks on synthetic matches')
+    parser.add_argument('--frames', type=int, nargs='+', default=[120, 480])
+    parser.add_argument('--players', type=int, nargs='+', default=[10, 22])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown per stage before it is flagged')
+    parser.add_argument('--min-seconds', type=float, default=0.005, help='Slowdowns smaller than this are never flagged')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = {}
+    for num_frames, num_players in itertools.product(args.frames, args.players):
+        config = f"frames={num_frames},players={num_players}"
+        results[config] = benchmark(num_frames, num_players, args.repeats, args.seed)
+        stages = results[config]["stages"]
+        checks = results[config]["checks"]
+        print(f"{config}: total {sum(stages.values()):.3f} s, camera drift {checks['camera_drift_px']:.1f} px, team accuracy {checks['team_accuracy']:.3f}")
+        for stage, seconds in stages.items():
+            print(f"    {stage:<20}{seconds * 1000:>10.2f} ms{num_frames / seconds if seconds > 0 else float('inf'):>12.0f} frames/s")
+
+    report = {"environment": environment(), "seed": args.seed, "results": results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; record one with --save-baseline")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("environment") != report["environment"]:
+        print("warning: the baseline was recorded in a different environment")
+    regressions = compare(results, baseline, args.tolerance, args.min_seconds)
+    for config, stage, expected, seconds in regressions:
+        print(f"REGRESSION {config} {stage}: {expected * 1000:.2f} ms -> {seconds * 1000:.2f} ms ({seconds / expected:.2f}x)")
+    if regressions:
+        sys.exit(1)
+    print("no regressions against the baseline")
+
+if __name__ == '__main__':
+    main()
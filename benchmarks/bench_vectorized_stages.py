@@ -0,0 +1,103 @@
+import argparse
+import copy
+import time
+import numpy as np
+import sys
+sys.path.append('../')
+sys.path.append('.')
+from trackers import Tracker, TrackTable
+from camera_movement import CameraMovementEstimator
+from view import ViewTransformer
+
+def make_tracks(num_detections, players_per_frame=22, seed=0):
+    # Synthetic clip: players and a referee walking around the pitch, one ball per frame
+    rng = np.random.default_rng(seed)
+    objects_per_frame = players_per_frame + 2
+    num_frames = num_detections // objects_per_frame
+
+    start = rng.uniform([100, 250], [1700, 1000], size=(players_per_frame + 1, 2))
+    step = rng.normal(0, 2, size=(num_frames, players_per_frame + 1, 2))
+    feet = start + np.cumsum(step, axis=0)
+    people = np.concatenate([feet - [15, 60], feet + [15, 0]], axis=2).astype(np.float32)  # YOLO boxes are float32
+    balls = rng.uniform([100, 250], [1700, 1000], size=(num_frames, 2))
+    balls = np.concatenate([balls - 5, balls + 5], axis=1).astype(np.float32)
+
+    tracks = {"players": [], "referees": [], "ball": []}
+    for frame_num in range(num_frames):
+        boxes = people[frame_num].tolist()
+        tracks["players"].append({track_id + 1: {"bbox": boxes[track_id]} for track_id in range(players_per_frame)})
+        tracks["referees"].append({100: {"bbox": boxes[-1]}})
+        tracks["ball"].append({1: {"bbox": balls[frame_num].tolist()}})
+
+    camera_movement = rng.normal(0, 3, size=(num_frames, 2)).tolist()
+    return tracks, camera_movement
+
+def bench_per_point(tracks, camera_movement, tracker, camera_movement_estimator, view_transformer):
+    timings = {}
+    start = time.perf_counter()
+    tracker.add_position_to_tracks(tracks)
+    timings["position"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    camera_movement_estimator.add_adjust_positions_to_tracks(tracks, camera_movement)
+    timings["camera_adjustment"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    view_transformer.add_transformed_position_to_tracks(tracks)
+    timings["view_transform"] = time.perf_counter() - start
+    return timings
+
+def bench_vectorized(table, camera_movement, tracker, camera_movement_estimator, view_transformer):
+    timings = {}
+    start = time.perf_counter()
+    tracker.add_position_to_table(table)
+    timings["position"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    camera_movement_estimator.add_adjust_positions_to_table(table, camera_movement)
+    timings["camera_adjustment"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    view_transformer.add_transformed_position_to_table(table)
+    timings["view_transform"] = time.perf_counter() - start
+    return timings
+
+def check_same_result(tracks, table):
+    # The batch stages must give the same transformed positions as the per-point path
+    for object, object_tracks in tracks.items():
+        for frame_num, track in enumerate(object_tracks):
+            rows = table.frame_rows(frame_num, object)
+            for row, (track_id, track_info) in zip(range(rows.start, rows.stop), track.items()):
+                expected = track_info['position_transformed']
+                actual = table.position_transformed[row]
+                if expected is None:
+                    assert np.isnan(actual).all(), (object, frame_num, track_id)
+                else:
+                    assert np.allclose(actual, expected, atol=1e-3), (object, frame_num, track_id)
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-point vs vectorized position, camera and view stages')
+    parser.add_argument('--detections', type=int, default=500_000)
+    args = parser.parse_args()
+
+    tracks, camera_movement = make_tracks(args.detections)
+    table = TrackTable.from_tracks(tracks)
+    tracks = copy.deepcopy(tracks)
+
+    tracker = Tracker('models/best.pt')  # Only its position stages are timed
+    camera_movement_estimator = CameraMovementEstimator(np.zeros((1080, 1920, 3), dtype=np.uint8))
+    view_transformer = ViewTransformer()
+
+    per_point = bench_per_point(tracks, camera_movement, tracker, camera_movement_estimator, view_transformer)
+    vectorized = bench_vectorized(table, camera_movement, tracker, camera_movement_estimator, view_transformer)
+    check_same_result(tracks, table)
+
+    print(f"{len(table)} detections over {table.num_frames} frames")
+    print(f"{'stage':<20}{'per point (s)':>15}{'vectorized (s)':>16}{'speedup':>10}")
+    for stage in per_point:
+        print(f"{stage:<20}{per_point[stage]:>15.3f}{vectorized[stage]:>16.4f}{per_point[stage] / vectorized[stage]:>9.0f}x")
+    total_per_point, total_vectorized = sum(per_point.values()), sum(vectorized.values())
+    print(f"{'total':<20}{total_per_point:>15.3f}{total_vectorized:>16.4f}{total_per_point / total_vectorized:>9.0f}x")
+
+if __name__ == '__main__':
+    main()
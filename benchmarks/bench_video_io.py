@@ -0,0 +1,96 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import cv2
+import sys
+sys.path.append('../')
+sys.path.append('.')
+from tools import VideoReader, VideoWriter, probe_video
+
+def write_synthetic_video(video_path, num_frames, size=(1080, 1920), fps=25):
+    # A moving textured clip so the encoder and decoder do real work
+    rng = np.random.default_rng(0)
+    texture = cv2.GaussianBlur(rng.integers(0, 256, size=(size[0], size[1] + num_frames * 4, 3), dtype=np.uint8), (0, 0), 2)
+    out = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'XVID'), fps, (size[1], size[0]))
+    for frame_num in range(num_frames):
+        out.write(np.ascontiguousarray(texture[:, frame_num * 4:frame_num * 4 + size[1]]))
+    out.release()
+
+def legacy_read(video_path):
+    # The previous read_video: sequential cv2.VideoCapture reads into a list
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+def legacy_write(frames, video_path):
+    # The previous save_video: synchronous XVID encoding at a fixed 24 fps
+    out = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'XVID'), 24, (frames[0].shape[1], frames[0].shape[0]))
+    for frame in frames:
+        out.write(frame)
+    out.release()
+
+def consume(frames, work_ms):
+    # Stands in for the analysis done on every frame, which prefetching overlaps with decoding
+    count = 0
+    for _ in frames:
+        if work_ms:
+            time.sleep(work_ms / 1000)
+        count += 1
+    return count
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+def main():
+    # Decode and encode frames/s of the legacy read/save functions against VideoReader/VideoWriter
+    parser = argparse.ArgumentParser(description='Video decode/encode throughput')
+    parser.add_argument('--video', help='Video to read; a synthetic 1080p clip is generated when omitted')
+    parser.add_argument('--frames', type=int, default=150, help='Length of the synthetic clip')
+    parser.add_argument('--work-ms', type=float, default=0.0, help='Simulated per-frame analysis time while reading')
+    parser.add_argument('--scale', type=float, default=0.5, help='Decode downscale factor to compare')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        video_path = args.video
+        if video_path is None:
+            video_path = os.path.join(directory, 'synthetic.avi')
+            write_synthetic_video(video_path, args.frames)
+        info = probe_video(video_path)
+        print(f"{video_path}: {info['width']}x{info['height']} at {info['fps']:.2f} fps, {info['num_frames']} frames")
+
+        frames, seconds = timed(lambda: legacy_read(video_path))
+        if args.work_ms:
+            _, work_seconds = timed(lambda: consume(frames, args.work_ms))
+            seconds += work_seconds
+        print(f"read   legacy            {len(frames) / seconds:7.1f} frames/s")
+        count, seconds = timed(lambda: consume(VideoReader(video_path), args.work_ms))
+        print(f"read   VideoReader       {count / seconds:7.1f} frames/s")
+        count, seconds = timed(lambda: consume(VideoReader(video_path, scale=args.scale), args.work_ms))
+        print(f"read   VideoReader x{args.scale:<4} {count / seconds:7.1f} frames/s")
+        middle = len(frames) // 2
+        count, seconds = timed(lambda: consume(VideoReader(video_path, start_frame=middle), args.work_ms))
+        print(f"read   from frame {middle:<6} {count / seconds:7.1f} frames/s ({count} frames)")
+
+        _, seconds = timed(lambda: legacy_write(frames, os.path.join(directory, 'legacy.avi')))
+        print(f"write  legacy            {len(frames) / seconds:7.1f} frames/s")
+
+        def write():
+            with VideoWriter(os.path.join(directory, 'writer.avi'), info['fps']) as writer:
+                for frame in frames:
+                    writer.write(frame)
+            return writer.frames_written
+        count, seconds = timed(write)
+        print(f"write  VideoWriter       {count / seconds:7.1f} frames/s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import time
+import numpy as np
+import cv2
+
+TEAM_KITS = [(40, 40, 220), (220, 120, 30)]  # BGR shirt colors of team 1 and team 2
+REFEREE_KIT = (0, 220, 230)
+
+class SyntheticMatch():
+    # Reproducible synthetic broadcast clip: a striped pitch with lines, two teams in colored kits, referees and
+    # a ball passed between players, filmed by a smoothly panning camera. Frames are drawn on demand (len, index,
+    # iteration), so long clips never have to fit in memory; render_seconds adds up the time spent drawing them,
+    # for benchmarks to subtract. tracks() gives the matching detections in the format of Tracker.track_detections
+    # and camera_movement() the true movement per frame, so nothing needs the YOLO weights or real footage
+    def __init__(self, num_frames, num_players=22, num_referees=1, size=(1080, 1920), ball_miss_rate=0.1, seed=0):
+        self.num_frames = num_frames
+        self.size = size
+        self.render_seconds = 0.0
+        rng = np.random.default_rng(seed)
+
+        # Camera: a smooth random pan over a pitch canvas larger than the frame
+        velocity = np.cumsum(rng.normal(0, 0.3, size=(num_frames, 2)), axis=0).clip(-5, 5)
+        velocity[:, 1] *= 0.3  # Broadcast cameras mostly pan sideways
+        velocity[0] = 0
+        offsets = np.cumsum(velocity, axis=0)
+        offsets -= offsets.min(axis=0)
+        self.offsets = np.round(offsets).astype(int)
+        margin = self.offsets.max(axis=0) + 2
+        self.canvas = self.draw_pitch((size[0] + margin[1], size[1] + margin[0]), rng)
+
+        # People walk around the visible part of the pitch (pitch coordinates, feet positions)
+        num_people = num_players + num_referees
+        start = rng.uniform([350, 350], [1550, 950], size=(num_people, 2)) + self.offsets[0]
+        walk = np.cumsum(np.cumsum(rng.normal(0, 0.15, size=(num_frames, num_people, 2)), axis=0).clip(-4, 4), axis=0)
+        self.feet = start + walk
+        self.heights = rng.uniform(60, 85, size=num_people)
+        self.kits = [TEAM_KITS[index % 2] for index in range(num_players)] + [REFEREE_KIT] * num_referees
+        self.teams = np.array([index % 2 + 1 for index in range(num_players)])  # True team per player track id - 1
+        self.num_players = num_players
+
+        # Ball: held at a player's feet, passed to another player every second or so
+        self.ball = np.zeros((num_frames, 2))
+        holder, frame_num = 0, 0
+        while frame_num < num_frames:
+            hold = int(rng.integers(15, 45))
+            for offset in range(min(hold, num_frames - frame_num)):
+                self.ball[frame_num + offset] = self.feet[frame_num + offset, holder] + [12, -6]
+            frame_num += hold
+            receiver = int(rng.integers(0, num_players))
+            pass_frames = min(12, num_frames - frame_num)
+            for offset in range(pass_frames):
+                weight = (offset + 1) / 13
+                source = self.feet[frame_num + offset, holder] + [12, -6]
+                target = self.feet[frame_num + offset, receiver] + [12, -6]
+                self.ball[frame_num + offset] = source + weight * (target - source)
+            frame_num += pass_frames
+            holder = receiver
+        self.ball_detected = rng.random(num_frames) >= ball_miss_rate
+        self.box_noise = rng.normal(0, 1.0, size=(num_frames, num_people, 4))
+
+    def draw_pitch(self, shape, rng):
+        grass = np.empty(shape + (3,), dtype=np.uint8)
+        grass[:] = (40, 130, 40)
+        for x in range(0, shape[1], 240):  # Mowing stripes
+            grass[:, x:x + 120] = (45, 150, 45)
+        texture = cv2.GaussianBlur(rng.integers(0, 256, size=shape, dtype=np.uint8), (0, 0), 2).astype(np.float32)
+        texture = (texture - texture.mean()) * (60 / max(texture.std(), 1))  # Worn grass for the camera movement features
+        grass = np.clip(grass + texture[..., None], 0, 255).astype(np.uint8)
+        for x in range(150, shape[1], 700):
+            cv2.line(grass, (x, 0), (x, shape[0]), (235, 235, 235), 4)
+        cv2.line(grass, (0, 200), (shape[1], 200), (235, 235, 235), 4)
+        cv2.circle(grass, (shape[1] // 2, shape[0] // 2), 180, (235, 235, 235), 4)
+        return grass
+
+    def boxes(self, frame_num):
+        # (people, 4) bboxes in frame coordinates
+        feet = self.feet[frame_num] - self.offsets[frame_num]
+        width = self.heights * 0.4
+        return np.stack([feet[:, 0] - width / 2, feet[:, 1] - self.heights, feet[:, 0] + width / 2, feet[:, 1]], axis=1)
+
+    def ball_box(self, frame_num):
+        x, y = self.ball[frame_num] - self.offsets[frame_num]
+        return np.array([x - 5, y - 5, x + 5, y + 5])
+
+    def visible(self, box):
+        return box[2] > 0 and box[3] > 0 and box[0] < self.size[1] and box[1] < self.size[0]
+
+    def __len__(self):
+        return self.num_frames
+
+    def __getitem__(self, frame_num):
+        started = time.perf_counter()
+        x, y = self.offsets[frame_num]
+        frame = self.canvas[y:y + self.size[0], x:x + self.size[1]].copy()
+        for box, kit in zip(self.boxes(frame_num).astype(int).tolist(), self.kits):
+            x1, y1, x2, y2 = box
+            inset = (x2 - x1) // 5  # Detection boxes include some grass around the player
+            x1, x2, y1 = x1 + inset, x2 - inset, y1 + inset
+            middle = (y1 + y2) // 2
+            cv2.rectangle(frame, (x1, y1), (x2, middle), kit, cv2.FILLED)  # Shirt
+            cv2.rectangle(frame, (x1, middle), (x2, y2), (20, 20, 20), cv2.FILLED)  # Shorts
+        ball_x, ball_y = (self.ball[frame_num] - self.offsets[frame_num]).astype(int).tolist()
+        cv2.circle(frame, (ball_x, ball_y), 5, (250, 250, 250), cv2.FILLED)
+        self.render_seconds += time.perf_counter() - started
+        return frame
+
+    def __iter__(self):
+        return (self[frame_num] for frame_num in range(self.num_frames))
+
+    def tracks(self):
+        # Detections as ByteTrack would return them: players 1..N, referees from 100, the ball as track 1
+        # (missing in ball_miss_rate of the frames); boxes carry a pixel of detector noise
+        tracks = {"players": [], "referees": [], "ball": []}
+        for frame_num in range(self.num_frames):
+            boxes = (self.boxes(frame_num) + self.box_noise[frame_num]).astype(np.float32).tolist()  # YOLO boxes are float32
+            players, referees = {}, {}
+            for index, box in enumerate(boxes):
+                if not self.visible(box):
+                    continue
+                if index < self.num_players:
+                    players[index + 1] = {"bbox": box}
+                else:
+                    referees[100 + index - self.num_players] = {"bbox": box}
+            tracks["players"].append(players)
+            tracks["referees"].append(referees)
+            ball = self.ball_box(frame_num)
+            tracks["ball"].append({1: {"bbox": ball.astype(np.float32).tolist()}} if self.ball_detected[frame_num] and self.visible(ball) else {})
+        return tracks
+
+    def camera_movement(self):
+        # True movement per frame in CameraMovementEstimator's convention
+        movement = np.zeros((self.num_frames, 2))
+        movement[1:] = np.diff(self.offsets, axis=0)
+        return movement
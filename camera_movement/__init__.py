@@ -1 +1,2 @@
-from .camera_movement import CameraMovementEstimator
\ No newline at end of file
+from .camera_movement import CameraMovementEstimator
+from .parallel import get_camera_movement_parallel
\ No newline at end of file
@@ -7,8 +7,13 @@ sys.path.append('../')
 from tools import measure_distance,measure_xy_distance
 
 class CameraMovementEstimator():
-    def __init__(self,frame):
-        self.minimum_distance = 5
+    def __init__(self,frame, method='median', downscale=0.5):
+        self.minimum_distance = 5  # Movements up to this many pixels are reported as no movement, whatever the method
+        self.method = method  # 'median' or 'affine' (RANSAC) global motion models, or 'legacy' (largest single feature move)
+        self.downscale = downscale  # Scale of the frames the robust methods track features on
+        self.redetect_every = 10  # Robust methods follow their features and pick new ones this often
+        self.min_features = 10  # ... or as soon as fewer than this many are left
+        self.ransac_threshold = 1.0  # Reprojection error (downscaled pixels) of an inlier in the affine model
 
         self.lk_params = dict(
             winSize = (15,15),
@@ -29,6 +34,17 @@ class CameraMovementEstimator():
             mask = mask_features
         )
 
+        # Robust methods only read the columns the mask covers, downscaled
+        columns = np.flatnonzero(mask_features.any(axis=0))
+        self.roi = (int(columns[0]), int(columns[-1]) + 1)
+        roi_mask = mask_features[:, self.roi[0]:self.roi[1]]
+        self.roi_features = dict(
+            self.features,
+            mask = cv2.resize(roi_mask, None, fx=downscale, fy=downscale, interpolation=cv2.INTER_NEAREST)
+        )
+
+        self.reset_camera_movement()
+
     def add_adjust_positions_to_tracks(self,tracks, camera_movement_per_frame):
         for object, object_tracks in tracks.items():
             for frame_num, track in enumerate(object_tracks):
@@ -37,48 +53,170 @@ class CameraMovementEstimator():
                     camera_movement = camera_movement_per_frame[frame_num]
                     position_adjusted = (position[0]-camera_movement[0],position[1]-camera_movement[1])
                     tracks[object][frame_num][track_id]['position_adjusted'] = position_adjusted
-                    
 
+    def adjust_positions(self, positions, frame_nums, camera_movement_per_frame):
+        # Subtract the camera movement of each point's frame from an (N, 2) array of positions
+        camera_movement = np.asarray(camera_movement_per_frame, dtype=np.float32).reshape(-1, 2)
+        return np.asarray(positions, dtype=np.float32) - camera_movement[frame_nums]
 
-    def get_camera_movement(self,frames,read_from_stub=False, stub_path=None):
-        # Read the stub 
-        if read_from_stub and stub_path is not None and os.path.exists(stub_path):
-            with open(stub_path,'rb') as f:
-                return pickle.load(f)
+    def add_adjust_positions_to_table(self, table, camera_movement_per_frame):
+        table.position_adjusted[:] = self.adjust_positions(table.position, table.frame, camera_movement_per_frame)
 
-        camera_movement = [[0, 0]] * len(frames)
+    def reset_camera_movement(self):
+        # Forget the previous frame so the next window starts a new clip
+        self.old_gray = None
+        self.old_features = None
+        self.frames_since_detection = 0
 
-        old_gray = cv2.cvtColor(frames[0],cv2.COLOR_BGR2GRAY)
-        old_features = cv2.goodFeaturesToTrack(old_gray,**self.features)
+    def prepare_frame(self, frame):
+        if self.method == 'legacy':
+            return cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
+        roi = frame[:, self.roi[0]:self.roi[1]]  # A view, the full frame is never converted
+        small = cv2.resize(roi, None, fx=self.downscale, fy=self.downscale, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small,cv2.COLOR_BGR2GRAY)
 
-        for frame_num in range(1,len(frames)):
-            frame_gray = cv2.cvtColor(frames[frame_num],cv2.COLOR_BGR2GRAY)
-            new_features, _,_ = cv2.calcOpticalFlowPyrLK(old_gray,frame_gray,old_features,None,**self.lk_params)
+    def detect_features(self, frame_gray):
+        self.frames_since_detection = 0
+        return cv2.goodFeaturesToTrack(frame_gray,**(self.features if self.method == 'legacy' else self.roi_features))
 
-            max_distance = 0
-            camera_movement_x, camera_movement_y = 0,0
+    def get_camera_movement(self,frames,read_from_stub=False, stub_path=None, cache=None, video_path=None):
+        if cache is not None:
+            return self.get_cached_camera_movement(frames, cache, video_path)
 
-            for i, (new,old) in enumerate(zip(new_features,old_features)):
-                new_features_point = new.ravel()
-                old_features_point = old.ravel()
+        # Read the stub 
+        if read_from_stub and stub_path is not None and os.path.exists(stub_path):
+            with open(stub_path,'rb') as f:
+                return pickle.load(f)
 
-                distance = measure_distance(new_features_point,old_features_point)
-                if distance>max_distance:
-                    max_distance = distance
-                    camera_movement_x,camera_movement_y = measure_xy_distance(old_features_point, new_features_point ) 
-            
-            if max_distance > self.minimum_distance:
-                camera_movement[frame_num] = [camera_movement_x,camera_movement_y]
-                old_features = cv2.goodFeaturesToTrack(frame_gray,**self.features)
+        self.reset_camera_movement()
+        camera_movement = self.get_camera_movement_window(frames)
 
-            old_gray = frame_gray.copy()
-        
         if stub_path is not None:
             with open(stub_path,'wb') as f:
                 pickle.dump(camera_movement,f)
 
         return camera_movement
-    
+
+    def get_cached_camera_movement(self, frames, cache, video_path):
+        key = cache.key(
+            'camera_movement',
+            video=cache.file_digest(video_path),
+            minimum_distance=self.minimum_distance,
+            lk_params=self.lk_params,
+            method=self.method,
+            downscale=self.downscale,
+            redetect_every=self.redetect_every,
+            min_features=self.min_features,
+            ransac_threshold=self.ransac_threshold,
+            features={name: value for name, value in self.features.items() if name != 'mask'},
+            mask=cache.array_digest(self.features['mask'])
+        )
+
+        completed = cache.completed('camera_movement', key)
+        num_frames = len(frames) if completed is None else completed["num_frames"]
+
+        self.reset_camera_movement()
+        camera_movement = []
+        resume_features = None  # Feature state at the end of the last chunk read from the cache
+        resume_age = 0
+        for index, (start, stop) in enumerate(cache.chunk_ranges(num_frames)):
+            chunk = cache.load_chunk('camera_movement', key, index)
+            if chunk is not None:
+                camera_movement += chunk["movement"].tolist()
+                resume_features = chunk["features"] if len(chunk["features"]) else None
+                resume_age = int(chunk["frames_since_detection"])
+                self.old_gray = None
+                continue
+
+            if start > 0 and self.old_gray is None:  # Pick up the optical flow where the cached chunks stopped
+                self.old_gray = self.prepare_frame(frames[start - 1])
+                self.old_features = resume_features
+                self.frames_since_detection = resume_age
+            movement = self.get_camera_movement_window(frames[start:stop])
+            features = self.old_features if self.old_features is not None else np.zeros((0, 1, 2), dtype=np.float32)
+            cache.save_chunk('camera_movement', key, index, movement=np.array(movement, dtype=np.float32).reshape(-1, 2), features=features,
+                              frames_since_detection=np.array(self.frames_since_detection))
+            camera_movement += movement
+
+        if completed is None:
+            cache.mark_complete('camera_movement', key, len(cache.chunk_ranges(num_frames)), num_frames)
+        return camera_movement
+
+    def get_camera_movement_window(self,frames):
+        # Continues from the last frame of the previous window, so a clip can be fed in bounded chunks;
+        # frames can be any iterable (e.g. read_video_frames), only the previous frame is kept
+        camera_movement = []
+
+        for frame in frames:
+            frame_gray = self.prepare_frame(frame)
+            if self.old_gray is None:
+                self.old_gray = frame_gray
+                self.old_features = self.detect_features(frame_gray)
+                camera_movement.append([0, 0])
+                continue
+
+            if self.method == 'legacy':
+                camera_movement.append(self.get_largest_movement(frame_gray))
+            else:
+                camera_movement.append(self.get_global_movement(frame_gray))
+            self.old_gray = frame_gray
+
+        return camera_movement
+
+    def get_largest_movement(self, frame_gray):
+        new_features, _,_ = cv2.calcOpticalFlowPyrLK(self.old_gray,frame_gray,self.old_features,None,**self.lk_params)
+
+        max_distance = 0
+        camera_movement_x, camera_movement_y = 0,0
+
+        for i, (new,old) in enumerate(zip(new_features,self.old_features)):
+            new_features_point = new.ravel()
+            old_features_point = old.ravel()
+
+            distance = measure_distance(new_features_point,old_features_point)
+            if distance>max_distance:
+                max_distance = distance
+                camera_movement_x,camera_movement_y = measure_xy_distance(old_features_point, new_features_point ) 
+
+        if max_distance > self.minimum_distance:
+            self.old_features = self.detect_features(frame_gray)
+            return [camera_movement_x,camera_movement_y]
+        return [0, 0]
+
+    def get_global_movement(self, frame_gray):
+        # Movement of the background between the previous and this frame from all tracked features at once:
+        # the median displacement, or the translation of a RANSAC similarity fit evaluated at the ROI center
+        if self.old_features is None or len(self.old_features) < self.min_features:
+            self.old_features = self.detect_features(self.old_gray)
+            if self.old_features is None:
+                return [0, 0]
+
+        new_features, status, _ = cv2.calcOpticalFlowPyrLK(self.old_gray,frame_gray,self.old_features,None,**self.lk_params)
+        found = status.ravel() == 1
+        old_points = self.old_features.reshape(-1, 2)[found]
+        new_points = new_features.reshape(-1, 2)[found]
+
+        movement = np.zeros(2)
+        if len(old_points):
+            matrix = None
+            if self.method == 'affine' and len(old_points) >= 3:
+                matrix, _ = cv2.estimateAffinePartial2D(new_points, old_points, method=cv2.RANSAC, ransacReprojThreshold=self.ransac_threshold)
+            if matrix is not None:
+                center = np.array([frame_gray.shape[1] / 2, frame_gray.shape[0] / 2])
+                movement = matrix[:, :2] @ center + matrix[:, 2] - center  # Where the center came from, minus the center
+            else:
+                movement = np.median(old_points - new_points, axis=0)
+
+        self.frames_since_detection += 1
+        if self.frames_since_detection >= self.redetect_every:
+            self.old_features = self.detect_features(frame_gray)
+        else:
+            self.old_features = new_points.reshape(-1, 1, 2)
+        movement = movement / self.downscale  # Back to full resolution pixels
+        if np.hypot(*movement) <= self.minimum_distance:  # The same dead-zone as the legacy method
+            return [0, 0]
+        return movement.tolist()
+
     def draw_camera_movement(self, frames, camera_movement_per_frame):
         output_frames = []
 
@@ -0,0 +1,45 @@
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import os
+import numpy as np
+import sys
+sys.path.append('../')
+from tools import read_video_frames, count_video_frames
+from .camera_movement import CameraMovementEstimator
+
+def estimate_chunk(video_path, start, stop, overlap, estimator_options):
+    # Runs in a worker process: decodes its own frame range, starting `overlap` frames early so the
+    # feature tracking has settled by the first frame it reports, and returns the movement of [start, stop)
+    first = max(start - overlap, 0)
+    frames = read_video_frames(video_path, first, stop)
+    first_frame = next(frames, None)
+    if first_frame is None:
+        return np.zeros((0, 2))
+
+    estimator = CameraMovementEstimator(first_frame, **estimator_options)  # Only the frame size is used
+    camera_movement = estimator.get_camera_movement_window(itertools.chain([first_frame], frames))
+    return np.array(camera_movement, dtype=np.float64).reshape(-1, 2)[start - first:]
+
+def get_camera_movement_parallel(video_path, workers=None, chunk_size=500, overlap=10, **estimator_options):
+    # Camera movement of a whole video, with chunks of frames estimated in separate processes.
+    # Movement is per frame pair, so overlapping each chunk with the end of the previous one is enough
+    # to stitch the chunks by concatenation (overlap must be at least 1); returns a (frames, 2) array
+    workers = workers or os.cpu_count()
+    num_frames = count_video_frames(video_path)
+    starts = list(range(0, max(num_frames, 1), chunk_size))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                estimate_chunk,
+                video_path,
+                start,
+                start + chunk_size if index < len(starts) - 1 else None,  # The last chunk reads to the real end of the video
+                overlap,
+                estimator_options
+            )
+            for index, start in enumerate(starts)
+        ]
+        chunks = [future.result() for future in futures]
+
+    return np.concatenate(chunks) if chunks else np.zeros((0, 2))
@@ -1,122 +1,397 @@
-from tools import read_video, save_video  # Import functions to read and save video files
+import argparse
+import json
+import os
+import threading
+import time
+from tools import read_video, read_video_chunks, save_video, get_video_fps, VideoWriter, FrameStore, AnalysisCache, Profiler, profile_stage  # Import video functions, the frame store, the stage cache and the profiler
 from trackers import Tracker  # Import the Tracker class for object tracking
 import cv2  
 import numpy as np  
 from team_assigner import TeamAssigner  # Import the TeamAssigner class
 from player_ball_assigner import PlayerBallAssigner  # Import the PlayerBallAssigner class
-from camera_movement import CameraMovementEstimator  # Import the CameraMovementEstimator class
-from view import ViewTransformer  # Import the ViewTransformer class
+from camera_movement import CameraMovementEstimator, get_camera_movement_parallel  # Import the camera movement estimators
+from view import ViewTransformer, ShotHomography, PitchKeypointDetector  # Import the fixed and the per-shot pixel -> pitch transforms
 from speed_distance import SpeedAndDistance_Estimator  # Import the SpeedAndDistance_Estimator class
+from pipeline import StreamingAnalyzer, Stage, StagePipeline, run_sharded, LiveSource, LiveAnalyzer  # Import the windowed, pipelined, sharded and live runners
+from renderer import FrameRenderer, render_export  # Import the single-pass frame renderer and rendering from an export
+from analytics import TrackExporter  # Import the columnar track and summary export
 
+INPUT_VIDEO_PATH = 'input_videos/NWANERI_WITH_A_WORLDIE!_Preston_vS_Arsenal_0_3_Carabao_Cup - Trim.mp4'
+OUTPUT_VIDEO_PATH = 'output_videos/output_video.avi'
 
-def main():
-    # Read video frames from the input video file
-    video_frames = read_video('input_videos/NWANERI_WITH_A_WORLDIE!_Preston_vS_Arsenal_0_3_Carabao_Cup - Trim.mp4')
+
+def main(cache_dir='stubs/cache', detect_every=1, adaptive_skip=False, min_possession_frames=1, camera_workers=1, render_workers=2, frame_store_dir=None,
+         export_dir=None, export_format='npz', headless=False, detector_options=None, homography=None):
+    # Read video frames from the input video file, or decode them once into a memory-mapped store on disk
+    # that is deleted when main returns; speeds and the output video use the source frame rate
+    if frame_store_dir is not None:
+        video_frames = FrameStore(INPUT_VIDEO_PATH, frame_store_dir)
+    else:
+        video_frames = read_video(INPUT_VIDEO_PATH)
+    fps = get_video_fps(INPUT_VIDEO_PATH)
+    num_frames = len(video_frames)
+
+    # Cache of detections, tracks and camera movement, keyed by the video, the weights and the stage parameters
+    cache = AnalysisCache(cache_dir)
 
     # Initialize the Tracker with a pre-trained model
-    tracker = Tracker('models/best.pt')
+    tracker = Tracker('models/best.pt', detect_every=detect_every, adaptive_skip=adaptive_skip, **(detector_options or {}))
 
-    # Get object tracks from the video frames (using stub data if available)
-    tracks = tracker.get_object_tracks(
+    # Get object tracks from the video frames (reusing cached results when they match) as a column store
+    track_table = tracker.get_object_tracks(
         video_frames,
-        read_from_stub=True,
-        stub_path='stubs/track_stubs.pkl'
+        as_table=True,
+        cache=cache,
+        video_path=INPUT_VIDEO_PATH
     )
+    if detector_options and tracker.detected_frames:  # Tracks from the cache never ran the detector
+        print(tracker.inference.report())  # Share of the frame the detector saw and balls recovered by the tiled pass
 
     # Add position data to the object tracks
-    tracker.add_position_to_tracks(tracks)
+    with profile_stage('positions', num_frames):
+        tracker.add_position_to_table(track_table)
 
     # Initialize the CameraMovementEstimator with the first frame
     camera_movement_estimator = CameraMovementEstimator(video_frames[0])
 
-    # Estimate camera movement for each frame (using stub data if available)
-    camera_movement_per_frame = camera_movement_estimator.get_camera_movement(
-        video_frames,
-        read_from_stub=True,
-        stub_path='stubs/camera_movement_stub.pkl'
-    )
+    # Estimate camera movement for each frame (reusing cached results when they match,
+    # or split across processes that each decode their own part of the video)
+    with profile_stage('camera_movement', num_frames):
+        if camera_workers > 1:
+            camera_movement_per_frame = get_camera_movement_parallel(INPUT_VIDEO_PATH, workers=camera_workers)
+        else:
+            camera_movement_per_frame = camera_movement_estimator.get_camera_movement(
+                video_frames,
+                cache=cache,
+                video_path=INPUT_VIDEO_PATH
+            )
 
-    # Adjust positions in the tracks based on camera movement
-    camera_movement_estimator.add_adjust_positions_to_tracks(
-        tracks,
-        camera_movement_per_frame
-    )
+        # Adjust positions in the tracks based on camera movement
+        camera_movement_estimator.add_adjust_positions_to_table(
+            track_table,
+            camera_movement_per_frame
+        )
 
-    # Initialize the ViewTransformer
-    view_transformer = ViewTransformer()
+    # Add transformed positions to the tracks: through the fixed ViewTransformer quad, or through a homography
+    # estimated on every shot's keyframes and moved with the camera in between
+    with profile_stage('view_transform', num_frames):
+        if homography is not None:
+            homography.update(video_frames, camera_movement_per_frame)
+            homography.add_transformed_position_to_table(track_table)
+            print(homography.summary())
+        else:
+            ViewTransformer().add_transformed_position_to_table(track_table)
 
-    # Add transformed positions to the tracks
-    view_transformer.add_transformed_position_to_tracks(tracks)
+    # Initialize the TeamAssigner
+    team_assigner = TeamAssigner()
 
-    # Interpolate missing ball positions
-    tracks["ball"] = tracker.interpolate_ball_positions(tracks["ball"])
+    # Assign teams to every player track (team colors are fitted on the first frame with players)
+    with profile_stage('team_assignment', num_frames):
+        team_assigner.assign_teams_to_table(video_frames, track_table)
 
     # Initialize the SpeedAndDistance_Estimator
-    speed_and_distance_estimator = SpeedAndDistance_Estimator()
+    speed_and_distance_estimator = SpeedAndDistance_Estimator(frame_rate=fps)
 
     # Add speed and distance data to the tracks
-    speed_and_distance_estimator.add_speed_and_distance_to_tracks(tracks)
+    with profile_stage('speed_distance', num_frames):
+        speed_and_distance_estimator.add_speed_and_distance_to_table(track_table)
 
-    # Initialize the TeamAssigner
-    team_assigner = TeamAssigner()
+    # Interpolate missing ball positions
+    with profile_stage('ball_interpolation', num_frames):
+        track_table.replace_object('ball', tracker.interpolate_ball_positions(track_table.as_tracks()["ball"]))
 
-    # Assign team colors using the first frame and initial player tracks
-    team_assigner.assign_team_color(
-        video_frames[0],
-        tracks['players'][0]
-    )
+    # Initialize the PlayerBallAssigner
+    player_assigner = PlayerBallAssigner(min_possession_frames)
 
-    # Assign team information to each player's track data
-    for frame_num, player_track in enumerate(tracks['players']):
-        for player_id, track in player_track.items():
-            team = team_assigner.get_player_team(
-                video_frames[frame_num],
-                track['bbox'],
-                player_id
-            )
-            tracks['players'][frame_num][player_id]['team'] = team
-            tracks['players'][frame_num][player_id]['team_color'] = team_assigner.team_colors[team]
+    # Assign the ball to players in all frames at once and collect which team controls it
+    with profile_stage('possession', num_frames):
+        team_ball_control = player_assigner.assign_ball_to_table(track_table)
 
-    # Initialize the PlayerBallAssigner
-    player_assigner = PlayerBallAssigner()
-    team_ball_control = []  # List to track which team controls the ball
-
-    # Assign the ball to players in each frame
-    for frame_num, player_track in enumerate(tracks['players']):
-        ball_bbox = tracks['ball'][frame_num][1]['bbox']
-        assigned_player = player_assigner.assign_ball_to_player(player_track, ball_bbox)
-
-        if assigned_player != -1:
-            # Mark that the player has the ball
-            tracks['players'][frame_num][assigned_player]['has_ball'] = True
-            # Append the team controlling the ball
-            team_ball_control.append(tracks['players'][frame_num][assigned_player]['team'])
-        else:
-            # If no player is assigned, keep the last known team control
-            team_ball_control.append(team_ball_control[-1])
-    team_ball_control = np.array(team_ball_control)
+    # Write the per-track rows, the per-frame possession and camera movement and the per-player summaries
+    if export_dir is not None:
+        with profile_stage('export', num_frames):
+            with TrackExporter(export_dir, export_format, frame_rate=fps, video_path=INPUT_VIDEO_PATH) as exporter:
+                exporter.write_table(track_table, team_ball_control=team_ball_control, camera_movement=camera_movement_per_frame)
 
-    # Draw annotations on the video frames
-    output_video_frames = tracker.draw_annotations(
-        video_frames,
-        tracks,
-        team_ball_control
-    )
+    # A headless run stops at the numbers; the video can be drawn later from the export with --render-from
+    if headless:
+        print_ball_control([np.sum(team_ball_control == 1), np.sum(team_ball_control == 2)])
+        return
 
-    # Draw camera movement on the video frames
-    output_video_frames = camera_movement_estimator.draw_camera_movement(
-        output_video_frames,
-        camera_movement_per_frame
-    )
+    # Rendering works on the nested per-frame dicts
+    tracks = track_table.to_tracks()
 
-    # Draw speed and distance information on the video frames
-    speed_and_distance_estimator.draw_speed_and_distance(
-        output_video_frames,
-        tracks
-    )
+    renderer = FrameRenderer(render_workers)
+    ball_control_counts = tracker.ball_control_counts(team_ball_control)
+
+    # The frame store is mapped read-only: every frame is drawn on its own copy and streamed to the encoder,
+    # a few frames per rendering worker at a time, so the annotated clip is never held in RAM
+    if frame_store_dir is not None:
+        def render():
+            window_size = 4 * max(render_workers, 1)
+            for start in range(0, num_frames, window_size):
+                stop = min(start + window_size, num_frames)
+                window_tracks = {object: object_tracks[start:stop] for object, object_tracks in tracks.items()}
+                yield from renderer.render(video_frames[start:stop], window_tracks, ball_control_counts[start:stop],
+                                           camera_movement_per_frame[start:stop], copy=True)
+
+        with profile_stage('render', num_frames):  # Includes waiting for the encoder
+            save_video(render(), OUTPUT_VIDEO_PATH, fps)
+        return
+
+    # Draw tracks, ball control, camera movement and speed on the video frames in one pass per frame
+    with profile_stage('render', num_frames):
+        output_video_frames = renderer.render(
+            video_frames,
+            tracks,
+            ball_control_counts,
+            camera_movement_per_frame
+        )
 
     # Save the annotated video frames to an output video file
-    save_video(output_video_frames, 'output_videos/output_video.avi')
+    save_video(output_video_frames, OUTPUT_VIDEO_PATH, fps)
+
+def print_ball_control(counts):
+    # Ball control of the whole run, as the renderer shows it on the last frame
+    total = max(int(np.sum(counts)), 1)
+    print(f"ball control: team 1 {counts[0] / total * 100:.1f}%, team 2 {counts[1] / total * 100:.1f}%")
+
+def frame_range(fps, start_time=None, end_time=None):
+    # Frames [start, stop) of a time range in seconds; None reads from the start or to the end
+    start_frame = round(start_time * fps) if start_time is not None else 0
+    stop_frame = round(end_time * fps) if end_time is not None else None
+    return start_frame, stop_frame
+
+def main_stream(window_size, detect_every=1, adaptive_skip=False, min_possession_frames=1, render_workers=2, start_time=None, end_time=None,
+                export_dir=None, export_format='npz', headless=False, detector_options=None, homography=None):
+    # Initialize the Tracker with a pre-trained model
+    tracker = Tracker('models/best.pt', detect_every=detect_every, adaptive_skip=adaptive_skip, **(detector_options or {}))
+    fps = get_video_fps(INPUT_VIDEO_PATH)
+    start_frame, stop_frame = frame_range(fps, start_time, end_time)
+
+    # Analyse the video (or only [start_time, end_time)) window by window; frames are written as soon as they are annotated
+    # and, with an export directory, every finished window is exported as it goes
+    exporter = TrackExporter(export_dir, export_format, frame_rate=fps, video_path=INPUT_VIDEO_PATH) if export_dir is not None else None
+    analyzer = StreamingAnalyzer(tracker, window_size=window_size, min_possession_frames=min_possession_frames, render_workers=render_workers,
+                                 frame_rate=fps, exporter=exporter, start_frame=start_frame, homography=homography)
+    frame_windows = read_video_chunks(INPUT_VIDEO_PATH, window_size, start_frame, stop_frame)
+    if headless:
+        print_ball_control(analyzer.analyze(frame_windows))
+    else:
+        save_video(analyzer.run(frame_windows), OUTPUT_VIDEO_PATH, fps)
+    if detector_options and tracker.detected_frames:
+        print(tracker.inference.report())
+    if exporter is not None:
+        exporter.close()
+
+class ThreadLocalDetector():
+    # YOLO models are not safe to share between threads, so every detect worker loads its own copy
+    def __init__(self, model_path, **tracker_options):
+        self.model_path = model_path
+        self.tracker_options = tracker_options
+        self.local = threading.local()
+
+    def __call__(self, frames):
+        if not hasattr(self.local, 'tracker'):
+            self.local.tracker = Tracker(self.model_path, **self.tracker_options)
+        return frames, self.local.tracker.detect_frames(frames)
+
+def main_pipelined(window_size, detect_workers=1, render_workers=2, detect_every=1, adaptive_skip=False, min_possession_frames=1, start_time=None, end_time=None,
+                   export_dir=None, export_format='npz', headless=False, detector_options=None, homography=None):
+    # Initialize the Tracker; only its ByteTrack state is used, by the single-threaded analyse stage, so it never loads the model
+    tracker = Tracker('models/best.pt')
+    fps = get_video_fps(INPUT_VIDEO_PATH)
+    start_frame, stop_frame = frame_range(fps, start_time, end_time)
+    exporter = TrackExporter(export_dir, export_format, frame_rate=fps, video_path=INPUT_VIDEO_PATH) if export_dir is not None else None
+    analyzer = StreamingAnalyzer(tracker, window_size=window_size, min_possession_frames=min_possession_frames, frame_rate=fps,
+                                 exporter=exporter, start_frame=start_frame, homography=homography)
+
+    # decode -> detect -> track/analyse -> render -> encode, each stage overlapping with the others;
+    # a headless run ends at the analyse stage
+    stages = [
+        Stage('detect', ThreadLocalDetector('models/best.pt', detect_every=detect_every, adaptive_skip=adaptive_skip, **(detector_options or {})), workers=detect_workers),
+        Stage('analyze', lambda item: analyzer.analyze_window(*item), flush=lambda: [analyzer.flush()])
+    ]
+    if not headless:
+        stages.append(Stage('render', analyzer.render_window, workers=render_workers))
+    pipeline = StagePipeline(stages)
+
+    outputs = pipeline.run(read_video_chunks(INPUT_VIDEO_PATH, window_size, start_frame, stop_frame))
+    if headless:
+        for _ in outputs:
+            pass
+        print_ball_control(analyzer.ball_control_counts)
+    else:
+        save_video((frame for frames in outputs for frame in frames), OUTPUT_VIDEO_PATH, fps)
+    if exporter is not None:
+        exporter.close()
+    print(pipeline.report())
+
+def main_sharded(shard_workers, window_size=120, detect_every=1, adaptive_skip=False, min_possession_frames=1, render_workers=2,
+                 export_dir=None, export_format='npz', headless=False, detector_options=None):
+    # Track and analyse time shards of the video in parallel processes, stitched into one set of tracks
+    track_table, camera_movement_per_frame = run_sharded(
+        INPUT_VIDEO_PATH,
+        'models/best.pt',
+        workers=shard_workers,
+        tracker_options=dict(detect_every=detect_every, adaptive_skip=adaptive_skip, **(detector_options or {}))
+    )
+
+    # Ball interpolation, speed and possession need the whole clip and run on the merged tracks
+    fps = get_video_fps(INPUT_VIDEO_PATH)
+    speed_and_distance_estimator = SpeedAndDistance_Estimator(frame_rate=fps)
+    speed_and_distance_estimator.add_speed_and_distance_to_table(track_table)
+    tracker = Tracker('models/best.pt')  # Ball interpolation and ball control only: the model is not loaded
+    track_table.replace_object('ball', tracker.interpolate_ball_positions(track_table.as_tracks()["ball"]))
+    team_ball_control = PlayerBallAssigner(min_possession_frames).assign_ball_to_table(track_table)
+    ball_control_counts = tracker.ball_control_counts(team_ball_control)
+
+    if export_dir is not None:
+        with TrackExporter(export_dir, export_format, frame_rate=fps, video_path=INPUT_VIDEO_PATH) as exporter:
+            exporter.write_table(track_table, team_ball_control=team_ball_control, camera_movement=camera_movement_per_frame)
+    if headless:
+        print_ball_control([np.sum(team_ball_control == 1), np.sum(team_ball_control == 2)])
+        return
+    tracks = track_table.to_tracks()
+
+    renderer = FrameRenderer(render_workers)
+
+    def render():
+        # Decode the video again window by window instead of keeping it in memory
+        start = 0
+        for frames in read_video_chunks(INPUT_VIDEO_PATH, window_size):
+            stop = start + len(frames)
+            window_tracks = {object: object_tracks[start:stop] for object, object_tracks in tracks.items()}
+            yield from renderer.render(frames, window_tracks, ball_control_counts[start:stop], camera_movement_per_frame[start:stop])
+            start = stop
+
+    save_video(render(), OUTPUT_VIDEO_PATH, fps)
+
+def main_render(export_dir, ranges=None, video_path=None, render_workers=2, window_size=120):
+    # Draw the annotated video from a headless run's export, for the whole clip or only some time ranges
+    # ("START-END" in seconds, one output file per range next to OUTPUT_VIDEO_PATH)
+    if not ranges:
+        render_export(export_dir, OUTPUT_VIDEO_PATH, video_path=video_path, window_size=window_size, render_workers=render_workers)
+        return
+    with open(os.path.join(export_dir, 'manifest.json')) as f:
+        fps = json.load(f)["frame_rate"]
+    root, extension = os.path.splitext(OUTPUT_VIDEO_PATH)
+    for time_range in ranges:
+        start_time, end_time = (float(value) for value in time_range.split('-'))
+        start_frame, stop_frame = frame_range(fps, start_time, end_time)
+        output_path = f"{root}_{time_range}{extension}"
+        render_export(export_dir, output_path, start_frame, stop_frame, video_path, window_size, render_workers)
+        print(f"rendered {time_range} s to {output_path}")
+
+def main_live(source, latency_budget=0.25, realtime=False, ball_lookahead=2, min_possession_frames=1, detector_options=None):
+    # Analyse a live feed frame by frame; frames that cannot be annotated within the latency budget are dropped
+    tracker = Tracker('models/best.pt', batch_size=1, **(detector_options or {}))  # One frame at a time, no batch size tuning
+    live_source = LiveSource(source, realtime=realtime)
+    analyzer = LiveAnalyzer(tracker, latency_budget=latency_budget, frame_rate=live_source.fps,
+                            ball_lookahead=ball_lookahead, min_possession_frames=min_possession_frames)
+
+    # Frames dropped late or at the source are filled with the last emitted frame (the first one before it), so the
+    # saved video keeps the feed's timing; the progress line is printed about once a second whichever frames get through
+    last_frame_num, last_frame = -1, None
+    last_report = time.perf_counter()
+    with VideoWriter(OUTPUT_VIDEO_PATH, live_source.fps) as writer:
+        for emitted in analyzer.run(live_source):
+            for _ in range(emitted["frame_num"] - last_frame_num - 1):
+                writer.write(emitted["frame"] if last_frame is None else last_frame)
+            writer.write(emitted["frame"])
+            last_frame_num, last_frame = emitted["frame_num"], emitted["frame"]
+            if time.perf_counter() - last_report >= 1.0:
+                last_report = time.perf_counter()
+                team_1, team_2 = emitted["ball_control"]
+                print(f"frame {emitted['frame_num']}: ball control {team_1:.1f}% / {team_2:.1f}%, latency {emitted['latency'] * 1000:.0f} ms")
+        if last_frame is not None:
+            for _ in range(live_source.captured - last_frame_num - 1):  # Dropped after the last emitted frame
+                writer.write(last_frame)
+    print(analyzer.monitor.report(live_source.dropped))
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Soccer game analysis')
+    parser.add_argument('--window-size', type=int, default=0,
+                        help='Analyse the video in windows of this many frames (0 loads the whole clip)')
+    parser.add_argument('--cache-dir', default='stubs/cache', help='Where detections, tracks and camera movement are cached')
+    parser.add_argument('--detect-every', type=int, default=1,
+                        help='Run the detector on every Nth frame and interpolate the frames in between')
+    parser.add_argument('--adaptive-skip', action='store_true',
+                        help='Shrink the detection stride when players move fast or confidence drops')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='Overlap decode, detection, analysis, rendering and encoding (needs --window-size)')
+    parser.add_argument('--detect-workers', type=int, default=1, help='Detection threads in pipelined mode')
+    parser.add_argument('--render-workers', type=int, default=2, help='Rendering threads (per window in pipelined mode)')
+    parser.add_argument('--camera-workers', type=int, default=1,
+                        help='Processes estimating camera movement in parallel chunks (whole-clip mode)')
+    parser.add_argument('--shard-workers', type=int, default=0,
+                        help='Split the video into time shards analysed by this many processes (0 disables sharding)')
+    parser.add_argument('--min-possession-frames', type=int, default=1,
+                        help='Frames a team must keep the ball before control changes (filters possession flicker)')
+    parser.add_argument('--frame-store', default=None,
+                        help='Decode the clip once into a memory-mapped frame file in this directory instead of RAM (whole-clip mode)')
+    parser.add_argument('--live', default=None, metavar='SOURCE',
+                        help='Analyse a live feed (stream URL, camera or file) frame by frame within a latency budget')
+    parser.add_argument('--latency-budget', type=float, default=0.25, help='Seconds from capture to annotated frame in live mode')
+    parser.add_argument('--realtime', action='store_true', help='Replay a file source at its frame rate in live mode')
+    parser.add_argument('--profile', default=None, metavar='JSON',
+                        help='Record per-stage wall/CPU time, frames/s, peak RSS and allocations into this JSON report')
+    parser.add_argument('--prometheus', default=None, metavar='PATH',
+                        help='Also write the profile as a Prometheus text file (needs --profile)')
+    parser.add_argument('--trace-allocations', action='store_true', help='Add tracemalloc peaks of the main-thread stages to the profile (slower)')
+    parser.add_argument('--export', default=None, metavar='DIR',
+                        help='Export per-track rows, per-frame possession and per-player summaries to this directory')
+    parser.add_argument('--export-format', choices=['npz', 'parquet'], default='npz', help='Parquet needs pyarrow')
+    parser.add_argument('--start-time', type=float, default=None,
+                        help='Start the analysis this many seconds into the video (windowed and pipelined modes)')
+    parser.add_argument('--end-time', type=float, default=None,
+                        help='Stop the analysis this many seconds into the video (windowed and pipelined modes)')
+    parser.add_argument('--roi', choices=['pitch', 'dynamic'], default=None,
+                        help='Run the detector on the pitch area or on the region around the last detections instead of the full frame')
+    parser.add_argument('--imgsz', type=int, default=640,
+                        help='Detector input size for the full frame; lower values downscale (crops keep the same scale)')
+    parser.add_argument('--ball-tiles', action='store_true',
+                        help='Search frames where the ball was missed again in full-resolution tiles')
+    parser.add_argument('--pitch-keypoints', default=None, metavar='MODEL',
+                        help='Estimate the pitch homography per shot from this pitch keypoint model and the pitch lines (whole-clip, windowed and pipelined modes)')
+    parser.add_argument('--keyframe-every', type=int, default=0,
+                        help='Also re-estimate the homography every this many frames within a shot (0: only on scene cuts)')
+    parser.add_argument('--headless', action='store_true',
+                        help='Only compute the analytics: no drawing and no output video (combine with --export to render later)')
+    parser.add_argument('--render-from', default=None, metavar='DIR',
+                        help='Draw the output video from an export of an earlier run instead of analysing the video')
+    parser.add_argument('--ranges', nargs='+', default=None, metavar='START-END',
+                        help='Time ranges in seconds to render with --render-from, one output file each (default: the whole export)')
+    args = parser.parse_args()
+
+    windowed = args.render_from is None and args.live is None and args.shard_workers == 0 and (args.pipelined or args.window_size > 0)
+    if (args.start_time is not None or args.end_time is not None) and not windowed:
+        parser.error('--start-time and --end-time need the windowed or pipelined mode')
+    if args.live is not None and args.detect_every != 1:
+        parser.error('--detect-every is not supported in live mode')
+    homography = ShotHomography(PitchKeypointDetector(args.pitch_keypoints), keyframe_every=args.keyframe_every) if args.pitch_keypoints else None
+    detector_options = dict(region=args.roi, imgsz=args.imgsz, ball_tiles=args.ball_tiles) if args.roi or args.imgsz != 640 or args.ball_tiles else None
+
+    with Profiler(enabled=args.profile is not None, trace_allocations=args.trace_allocations) as profiler:
+        if args.render_from is not None:
+            main_render(args.render_from, args.ranges, render_workers=args.render_workers, window_size=args.window_size or 120)
+        elif args.live is not None:
+            main_live(args.live, args.latency_budget, args.realtime, min_possession_frames=args.min_possession_frames, detector_options=detector_options)
+        elif args.shard_workers > 0:
+            main_sharded(args.shard_workers, args.window_size or 120, args.detect_every, args.adaptive_skip, args.min_possession_frames, args.render_workers,
+                         args.export, args.export_format, args.headless, detector_options)
+        elif args.pipelined:
+            main_pipelined(args.window_size or 120, args.detect_workers, args.render_workers, args.detect_every, args.adaptive_skip, args.min_possession_frames, args.start_time, args.end_time,
+                           args.export, args.export_format, args.headless, detector_options, homography)
+        elif args.window_size > 0:
+            main_stream(args.window_size, args.detect_every, args.adaptive_skip, args.min_possession_frames, args.render_workers, args.start_time, args.end_time,
+                        args.export, args.export_format, args.headless, detector_options, homography)
+        else:
+            main(args.cache_dir, args.detect_every, args.adaptive_skip, args.min_possession_frames, args.camera_workers, args.render_workers, args.frame_store,
+                 args.export, args.export_format, args.headless, detector_options, homography)
+
+    if args.profile is not None:
+        profiler.save_json(args.profile)
+        if args.prometheus is not None:
+            profiler.save_prometheus(args.prometheus)
+        print(profiler.summary())
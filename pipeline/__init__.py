@@ -0,0 +1,4 @@
+from .streaming import StreamingAnalyzer
+from .executor import Stage, StagePipeline
+from .sharded import run_sharded, merge_shards
+from .live import LiveSource, LiveAnalyzer, OnlineBallInterpolator, LatencyMonitor
@@ -0,0 +1,173 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_END = object()  # Marks the end of the stream on every queue
+
+class _Failure:
+    # Carries an exception from a stage thread to the consumer
+    def __init__(self, error):
+        self.error = error
+
+class Stage:
+    # One step of the pipeline. fn(item) returns the item for the next stage, or None to emit nothing
+    # (stateful stages that buffer); flush() returns the items still buffered when the input ends.
+    # Stages with workers > 1 run fn on a thread pool and still emit results in input order.
+    def __init__(self, name, fn, workers=1, flush=None):
+        if workers > 1 and flush is not None:
+            raise ValueError(f"stage '{name}' buffers items, so it must run on a single worker")
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.flush = flush
+
+class StagePipeline:
+    # Runs the stages concurrently, connected by bounded queues, so the slowest stage sets the pace.
+    # The source iterable is consumed in its own thread; run() yields the last stage's output in order.
+    def __init__(self, stages, queue_size=2):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats = {}  # Stage name -> {"items": n, "busy": seconds}
+        self._stop = threading.Event()
+        self._stats_lock = threading.Lock()  # Pool workers record their timings concurrently
+
+    def _put(self, q, item):
+        while not self._stop.is_set():  # Give up once the consumer has gone away
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return _END
+
+    def _record(self, name, started):
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self.stats[name]["items"] += 1
+            self.stats[name]["busy"] += elapsed
+
+    def _run_source(self, source, out_q):
+        try:
+            iterator = iter(source)
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                self._record("source", started)
+                if not self._put(out_q, item):
+                    return
+        except BaseException as error:
+            self._put(out_q, _Failure(error))
+            return
+        self._put(out_q, _END)
+
+    def _run_stage(self, stage, in_q, out_q):
+        while True:
+            item = self._get(in_q)
+            if item is _END or isinstance(item, _Failure):
+                break
+            try:
+                started = time.perf_counter()
+                result = stage.fn(item)
+                self._record(stage.name, started)
+            except BaseException as error:
+                self._put(out_q, _Failure(error))
+                return
+            if result is not None and not self._put(out_q, result):
+                return
+
+        if isinstance(item, _Failure):
+            self._put(out_q, item)  # Pass the upstream failure on
+            return
+        if stage.flush is not None and not self._stop.is_set():
+            try:
+                for result in stage.flush():
+                    if result is not None:
+                        self._put(out_q, result)
+            except BaseException as error:
+                self._put(out_q, _Failure(error))
+                return
+        self._put(out_q, _END)
+
+    def _run_parallel_stage(self, stage, in_q, out_q):
+        # Futures are queued in submission order and resolved in that order, which keeps the output ordered;
+        # the bounded futures queue also caps how many items are in flight
+        futures_q = queue.Queue(maxsize=self.queue_size + stage.workers)
+
+        def timed(item):
+            started = time.perf_counter()
+            result = stage.fn(item)
+            self._record(stage.name, started)
+            return result
+
+        def collect():
+            while True:
+                future = self._get(futures_q)
+                if future is _END or isinstance(future, _Failure):
+                    self._put(out_q, future)
+                    return
+                try:
+                    result = future.result()
+                except BaseException as error:
+                    self._put(out_q, _Failure(error))
+                    return
+                if result is not None and not self._put(out_q, result):
+                    return
+
+        collector = threading.Thread(target=collect, name=f"{stage.name}-collect", daemon=True)
+        collector.start()
+        with ThreadPoolExecutor(max_workers=stage.workers, thread_name_prefix=stage.name) as pool:
+            while True:
+                item = self._get(in_q)
+                if item is _END or isinstance(item, _Failure):
+                    self._put(futures_q, item)
+                    break
+                if not self._put(futures_q, pool.submit(timed, item)):
+                    break
+            collector.join()
+
+    def run(self, source):
+        self._stop.clear()
+        self.stats = {name: {"items": 0, "busy": 0.0} for name in ["source"] + [stage.name for stage in self.stages]}
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+
+        threads = [threading.Thread(target=self._run_source, args=(source, queues[0]), name="source", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            target = self._run_parallel_stage if stage.workers > 1 else self._run_stage
+            threads.append(threading.Thread(target=target, args=(stage, queues[index], queues[index + 1]), name=stage.name, daemon=True))
+        for thread in threads:
+            thread.start()
+
+        started = time.perf_counter()
+        try:
+            while True:
+                item = self._get(queues[-1])
+                if item is _END:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            self._stop.set()  # Unblocks every stage if the consumer stopped early or a stage failed
+            for thread in threads:
+                thread.join()
+            self.wall_time = time.perf_counter() - started
+
+    def report(self):
+        # Busy time per stage next to the end-to-end wall time
+        lines = [f"{'stage':<12}{'items':>8}{'busy (s)':>10}"]
+        for name, stats in self.stats.items():
+            lines.append(f"{name:<12}{stats['items']:>8}{stats['busy']:>10.2f}")
+        lines.append(f"{'wall time':<20}{self.wall_time:>10.2f}")
+        return "\n".join(lines)
@@ -0,0 +1,247 @@
+import collections
+import threading
+import time
+import numpy as np
+import sys
+sys.path.append('../')
+from tools import VIDEO_BACKENDS
+from camera_movement import CameraMovementEstimator
+from view import ViewTransformer
+from speed_distance import SpeedAndDistance_Estimator
+from team_assigner import TeamAssigner
+from player_ball_assigner import PlayerBallAssigner
+from trackers import TrackTable
+from renderer import FrameRenderer
+
+class LiveSource():
+    # Frames of a live feed (camera, RTSP/HTTP stream or a growing file) as (frame_num, capture_time, frame).
+    # A capture thread keeps reading at the feed's pace and only the newest buffer_size frames are kept, so a
+    # slow consumer skips frames instead of falling further and further behind; skipped frames are counted
+    # in dropped. realtime=True replays a local file at its frame rate to stand in for a live feed
+    def __init__(self, source, realtime=False, buffer_size=2, backend='opencv'):
+        self.decoder = VIDEO_BACKENDS[backend](source)
+        self.fps = self.decoder.info()["fps"]
+        self.realtime = realtime
+        self.buffer = collections.deque(maxlen=buffer_size)
+        self.dropped = 0  # Frames overwritten in the buffer before the consumer got to them
+        self.captured = 0
+        self._ready = threading.Condition()
+        self._done = False
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = None
+
+    def _capture(self):
+        try:
+            started = time.perf_counter()
+            while not self._stop.is_set():
+                if self.realtime:  # Frame i of the replayed file is only "captured" at i / fps
+                    delay = started + self.captured / self.fps - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                frame = self.decoder.read()
+                if frame is None:
+                    break
+                with self._ready:
+                    if len(self.buffer) == self.buffer.maxlen:
+                        self.dropped += 1  # The oldest buffered frame is pushed out
+                    self.buffer.append((self.captured, time.perf_counter(), frame))
+                    self._ready.notify()
+                self.captured += 1
+        except Exception as error:
+            self._error = error
+        finally:
+            with self._ready:
+                self._done = True
+                self._ready.notify()
+
+    def __iter__(self):
+        if self._thread is not None:
+            raise RuntimeError("A LiveSource can only be iterated once")
+        self._thread = threading.Thread(target=self._capture, daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                with self._ready:
+                    while not self.buffer and not self._done:
+                        self._ready.wait()
+                    if not self.buffer:
+                        break
+                    item = self.buffer.popleft()
+                yield item
+            if self._error is not None:
+                raise self._error
+        finally:
+            self.close()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.decoder.release()
+
+class OnlineBallInterpolator():
+    # Online replacement for Tracker.interpolate_ball_positions. Frames wait in a short delay line of
+    # `lookahead` frames: a ball gap that closes while the frames are still waiting is filled linearly
+    # (like interpolate_boxes), longer gaps get the BallTracker's prediction for the frame when it had one
+    # and otherwise hold the last ball bbox (like the end of a streamed window). Frames before the first
+    # ball detection stay without a ball, there is nothing to backfill from online
+    def __init__(self, lookahead=2):
+        self.lookahead = lookahead
+        self.delay_line = collections.deque()  # Frame records waiting for a possible ball detection
+        self.last_ball = None  # (frame_num, bbox) of the last frame that had a ball
+
+    def push(self, frame_num, ball_track, record, prediction=None):
+        # ball_track is the frame's {1: {"bbox": ...}} ball dict and is filled in place, prediction the ball
+        # tracker's bbox for a frame without a detection; returns the records that leave the delay line
+        if 1 in ball_track:
+            bbox = np.asarray(ball_track[1]["bbox"], dtype=np.float64)
+            if self.last_ball is not None:
+                last_frame, last_bbox = self.last_ball
+                for waiting_frame, waiting_ball, _, _ in self.delay_line:
+                    if 1 not in waiting_ball and waiting_frame > last_frame:  # Frame numbers, so dropped frames are spaced right
+                        weight = (waiting_frame - last_frame) / (frame_num - last_frame)
+                        waiting_ball[1] = {"bbox": (last_bbox + weight * (bbox - last_bbox)).tolist()}
+            self.last_ball = (frame_num, bbox)
+        self.delay_line.append((frame_num, ball_track, record, prediction))
+
+        ready = []
+        while len(self.delay_line) > self.lookahead:
+            ready.append(self.release())
+        return ready
+
+    def release(self):
+        frame_num, ball_track, record, prediction = self.delay_line.popleft()
+        if 1 not in ball_track and prediction is not None:
+            ball_track[1] = {"bbox": prediction}  # Gap still open: where the ball tracker expects the ball
+        elif 1 not in ball_track and self.last_ball is not None and self.last_ball[0] < frame_num:
+            ball_track[1] = {"bbox": self.last_ball[1].tolist()}  # Lost for longer: hold the last bbox
+        return record
+
+    def flush(self):
+        return [self.release() for _ in range(len(self.delay_line))]
+
+class LatencyMonitor():
+    # End-to-end latency per frame, from capture to the annotated frame being handed out, and why frames were
+    # dropped. Keeps the last `history` latencies for percentiles
+    def __init__(self, history=1000):
+        self.latencies = collections.deque(maxlen=history)
+        self.emitted = 0
+        self.dropped_late = 0  # Frames skipped because they could not be finished within the budget
+
+    def record(self, latency):
+        self.latencies.append(latency)
+        self.emitted += 1
+
+    def summary(self, dropped_source=0):
+        latencies = np.array(self.latencies) * 1000
+        summary = {"emitted": self.emitted, "dropped_late": self.dropped_late, "dropped_source": dropped_source}
+        if len(latencies):
+            summary.update(p50_ms=float(np.percentile(latencies, 50)), p95_ms=float(np.percentile(latencies, 95)),
+                           max_ms=float(latencies.max()))
+        return summary
+
+    def report(self, dropped_source=0):
+        summary = self.summary(dropped_source)
+        if not self.emitted:
+            return "no frames emitted"
+        return (f"{summary['emitted']} frames, latency p50 {summary['p50_ms']:.0f} ms / p95 {summary['p95_ms']:.0f} ms / "
+                f"max {summary['max_ms']:.0f} ms, dropped {summary['dropped_late']} late + {summary['dropped_source']} at the source")
+
+class LiveAnalyzer():
+    # Frame-by-frame analysis of a live feed within a latency budget (seconds from capture to the annotated
+    # frame). Every stage keeps its state between frames like the streamed windows do; the ball is delayed by
+    # ball_lookahead frames for interpolation, which the budget has to leave room for. A frame that would not
+    # be finished in time is dropped before its analysis (judged from the recent analysis time), and a frame
+    # that comes out of the delay line too late is not rendered; its tracks and possession are still counted
+    def __init__(self, tracker, latency_budget=0.25, frame_rate=24, ball_lookahead=2, min_possession_frames=1):
+        self.tracker = tracker
+        self.latency_budget = latency_budget
+
+        self.camera_movement_estimator = None  # Built from the first frame, which fixes the feature mask
+        self.view_transformer = ViewTransformer()
+        self.speed_and_distance_estimator = SpeedAndDistance_Estimator(frame_rate=frame_rate)
+        self.team_assigner = TeamAssigner()
+        self.player_assigner = PlayerBallAssigner(min_possession_frames)
+        self.ball_interpolator = OnlineBallInterpolator(ball_lookahead)
+        self.renderer = FrameRenderer()
+        self.monitor = LatencyMonitor()
+
+        self.ball_control_counts = np.zeros(2, dtype=np.int64)  # Frames controlled by team 1 and team 2 so far
+        self.analysis_seconds = None  # Moving average of the time one frame takes to analyse
+        self.last_frame_num = None
+
+    def analyze_frame(self, frame_num, frame):
+        # Everything up to speed for one frame; frame_num is the feed's frame number, so dropped frames
+        # leave gaps and speeds stay in real time
+        detections = self.tracker.inference.predict([frame])
+        if self.last_frame_num is not None:
+            self.tracker.ball_tracker.skip(frame_num - self.last_frame_num - 1)  # Frames dropped since the last one
+        self.last_frame_num = frame_num
+        track_table = TrackTable.from_tracks(self.tracker.track_detections(detections))
+        self.tracker.add_position_to_table(track_table)
+
+        if self.camera_movement_estimator is None:
+            self.camera_movement_estimator = CameraMovementEstimator(frame)
+        camera_movement = self.camera_movement_estimator.get_camera_movement_window([frame])
+        self.camera_movement_estimator.add_adjust_positions_to_table(track_table, camera_movement)
+
+        self.view_transformer.add_transformed_position_to_table(track_table)
+        self.team_assigner.assign_teams_to_table([frame], track_table)
+        tracks = track_table.to_tracks()
+        self.speed_and_distance_estimator.update_tracks(tracks, start_frame=frame_num)
+        return tracks, camera_movement[0]
+
+    def finish_frame(self, record):
+        # Possession, stats and rendering once the ball is final; returns the emitted frame or None if it was late
+        tracks = record["tracks"]
+        team = int(self.player_assigner.assign_ball_to_tracks(tracks)[0])
+        if team in (1, 2):
+            self.ball_control_counts[team - 1] += 1
+
+        if time.perf_counter() - record["capture_time"] > self.latency_budget:
+            self.monitor.dropped_late += 1
+            return None
+
+        players = tracks["players"][0]
+        frame = self.renderer.render_frame(record["frame"], players, tracks["referees"][0], tracks["ball"][0],
+                                           self.ball_control_counts.tolist(), record["camera_movement"])
+        team_1_num_frames, team_2_num_frames = self.ball_control_counts.tolist()
+        total = max(team_1_num_frames + team_2_num_frames, 1)
+        emitted = {
+            "frame_num": record["frame_num"],
+            "frame": frame,
+            "ball_control": (team_1_num_frames / total * 100, team_2_num_frames / total * 100),  # Percent of frames so far
+            "team_in_control": team,
+            "players": {
+                track_id: {name: player[name] for name in ("team", "speed", "distance") if name in player}
+                for track_id, player in players.items()
+            },
+            "latency": time.perf_counter() - record["capture_time"]
+        }
+        self.monitor.record(emitted["latency"])
+        return emitted
+
+    def process(self, frame_num, capture_time, frame):
+        # Returns the frames (as dicts, see finish_frame) that are ready, possibly none
+        started = time.perf_counter()
+        if self.analysis_seconds is not None and started - capture_time + self.analysis_seconds > self.latency_budget:
+            self.monitor.dropped_late += 1
+            return []
+
+        tracks, camera_movement = self.analyze_frame(frame_num, frame)
+        elapsed = time.perf_counter() - started
+        self.analysis_seconds = elapsed if self.analysis_seconds is None else 0.8 * self.analysis_seconds + 0.2 * elapsed
+
+        record = {"frame_num": frame_num, "capture_time": capture_time, "frame": frame, "tracks": tracks, "camera_movement": camera_movement}
+        ready = self.ball_interpolator.push(frame_num, tracks["ball"][0], record, self.tracker.ball_tracker.prediction)
+        return [emitted for emitted in map(self.finish_frame, ready) if emitted is not None]
+
+    def flush(self):
+        return [emitted for emitted in map(self.finish_frame, self.ball_interpolator.flush()) if emitted is not None]
+
+    def run(self, source):
+        # Generator of emitted frames for an iterable of (frame_num, capture_time, frame), e.g. a LiveSource
+        for frame_num, capture_time, frame in source:
+            yield from self.process(frame_num, capture_time, frame)
+        yield from self.flush()
@@ -0,0 +1,168 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import numpy as np
+import sys
+sys.path.append('../')
+from tools import read_video_chunks, count_video_frames, match_boxes
+from trackers import Tracker, TrackTable, OBJECT_CLASSES
+from camera_movement import CameraMovementEstimator
+from view import ViewTransformer
+from team_assigner import TeamAssigner
+
+STITCHED_CLASSES = (OBJECT_CLASSES.index("players"), OBJECT_CLASSES.index("referees"))  # The ball always has track id 1
+
+def analyze_shard(video_path, model_path, start, stop, overlap, chunk_size, tracker_options, camera_options):
+    # Runs in a worker process: tracks, positions, camera movement and teams of frames [start - overlap, stop).
+    # The overlap frames warm up ByteTrack and the optical flow and are used to stitch track ids
+    first = max(start - overlap, 0)
+    tracker = Tracker(model_path, **tracker_options)
+    view_transformer = ViewTransformer()
+    team_assigner = TeamAssigner()
+    camera_movement_estimator = None
+
+    chunks, camera_movement, computed = [], [], set()
+    frame_num = first
+    for frames in read_video_chunks(video_path, chunk_size, first, stop):
+        if camera_movement_estimator is None:
+            camera_movement_estimator = CameraMovementEstimator(frames[0], **camera_options)
+        table = TrackTable.from_tracks(tracker.track_detections(tracker.detect_frames(frames)))
+        tracker.add_position_to_table(table)
+        movement = camera_movement_estimator.get_camera_movement_window(frames)
+        camera_movement_estimator.add_adjust_positions_to_table(table, movement)
+        view_transformer.add_transformed_position_to_table(table)
+        team_assigner.assign_teams_to_table(frames, table)
+
+        columns = table.to_columns()
+        columns["frame"] = columns["frame"] + frame_num  # Clip frame numbers
+        chunks.append(columns)
+        camera_movement += movement
+        computed |= table.computed
+        frame_num += len(frames)
+
+    return {
+        "start": start,
+        "first": first,
+        "columns": {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]} if chunks else TrackTable([], [], [], []).to_columns(),
+        "camera_movement": np.array(camera_movement, dtype=np.float64).reshape(-1, 2),
+        "team_colors": dict(team_assigner.team_colors),
+        "computed": computed
+    }
+
+def align_teams(result, reference_colors):
+    # Team ids 1/2 come from a k-means fit per shard and may be swapped; follow the reference shard's colors
+    colors = result["team_colors"]
+    if not colors or not reference_colors:
+        return
+    same = np.linalg.norm(colors[1] - reference_colors[1]) + np.linalg.norm(colors[2] - reference_colors[2])
+    swapped = np.linalg.norm(colors[1] - reference_colors[2]) + np.linalg.norm(colors[2] - reference_colors[1])
+    if swapped < same:
+        team = result["columns"]["team"]
+        result["columns"]["team"] = np.where(team > 0, 3 - team, 0).astype(team.dtype)
+        result["team_colors"] = {1: colors[2], 2: colors[1]}
+
+def match_track_ids(previous, current, frames, iou_threshold=0.5, min_votes=3):
+    # Votes for (class, current id, previous id) pairs whose boxes match by IoU in the shared frames;
+    # boxes of players the two shards put in different teams never vote. Pairs are accepted greedily,
+    # most votes first and ties broken by id, so the result does not depend on worker timing
+    votes = {}
+    for frame_num in frames:
+        previous_rows = previous["frame"] == frame_num
+        current_rows = current["frame"] == frame_num
+        for cls in STITCHED_CLASSES:
+            a = np.flatnonzero(previous_rows & (previous["cls"] == cls))
+            b = np.flatnonzero(current_rows & (current["cls"] == cls))
+            if len(a) == 0 or len(b) == 0:
+                continue
+            for i, j, _ in match_boxes(previous["bbox"][a], current["bbox"][b], iou_threshold):
+                previous_team, current_team = previous["team"][a[i]], current["team"][b[j]]
+                if previous_team and current_team and previous_team != current_team:
+                    continue
+                key = (cls, int(current["track_id"][b[j]]), int(previous["track_id"][a[i]]))
+                votes[key] = votes.get(key, 0) + 1
+
+    mapping, used = {}, set()
+    for (cls, current_id, previous_id), count in sorted(votes.items(), key=lambda item: (-item[1], item[0])):
+        if count < min_votes:
+            break
+        if (cls, current_id) in mapping or (cls, previous_id) in used:
+            continue
+        mapping[(cls, current_id)] = previous_id
+        used.add((cls, previous_id))
+    return mapping
+
+def merge_shards(results, num_frames=None, iou_threshold=0.5, min_votes=3):
+    # One TrackTable and one camera movement array for the whole clip. Every frame is taken from the shard
+    # that owns it (frames from its start up to the next shard's start); track ids are renumbered so a track
+    # that crosses a shard boundary keeps the id it had in the earlier shard
+    results = sorted(results, key=lambda result: result["start"])
+    reference_colors = next((result["team_colors"] for result in results if result["team_colors"]), {})
+    next_id = 1
+    previous = None
+    owned_columns, camera_movement, computed = [], [], set()
+
+    for index, result in enumerate(results):
+        align_teams(result, reference_colors)
+        columns = result["columns"]
+        end = results[index + 1]["start"] if index + 1 < len(results) else result["first"] + len(result["camera_movement"])
+
+        mapping = {}
+        if previous is not None:
+            mapping = match_track_ids(previous, columns, range(result["first"], result["start"]), iou_threshold, min_votes)
+
+        keys = columns["cls"].astype(np.int64) * 2 ** 32 + columns["track_id"]
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        global_ids = np.empty(len(unique_keys), dtype=np.int64)
+        for key_index, key in enumerate(unique_keys.tolist()):
+            cls, track_id = divmod(key, 2 ** 32)
+            if cls not in STITCHED_CLASSES:
+                global_ids[key_index] = track_id
+            elif (cls, track_id) in mapping:
+                global_ids[key_index] = mapping[(cls, track_id)]
+            else:  # New track (or one that could not be matched): next unused id
+                global_ids[key_index] = next_id
+                next_id += 1
+        columns = dict(columns, track_id=global_ids[inverse.reshape(-1)])
+
+        owned = (columns["frame"] >= result["start"]) & (columns["frame"] < end)
+        owned_columns.append({name: column[owned] for name, column in columns.items()})
+        camera_movement.append(result["camera_movement"][result["start"] - result["first"]:end - result["first"]])
+        computed |= result["computed"]
+        previous = columns
+
+    if num_frames is None:
+        num_frames = sum(len(movement) for movement in camera_movement)
+    table = TrackTable.from_columns(
+        {name: np.concatenate([columns[name] for columns in owned_columns]) for name in owned_columns[0]},
+        num_frames
+    )
+    table.team_colors.update(reference_colors)
+    table.computed |= computed
+    return table, np.concatenate(camera_movement)
+
+def run_sharded(video_path, model_path, workers=None, shard_size=1500, overlap=48, chunk_size=120,
+                tracker_options=None, camera_options=None, iou_threshold=0.5, min_votes=3):
+    # Whole-match analysis split by time over worker processes; returns (TrackTable, camera movement)
+    # with positions, camera-adjusted and transformed positions and teams. Ball interpolation, speed and
+    # possession need the whole clip and are cheap, so they run on the merged result
+    workers = workers or os.cpu_count()
+    num_frames = count_video_frames(video_path)
+    starts = list(range(0, max(num_frames, 1), shard_size))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                analyze_shard,
+                video_path,
+                model_path,
+                start,
+                start + shard_size if index < len(starts) - 1 else None,  # The last shard reads to the real end of the video
+                overlap,
+                chunk_size,
+                tracker_options or {},
+                camera_options or {}
+            )
+            for index, start in enumerate(starts)
+        ]
+        results = [future.result() for future in futures]
+
+    return merge_shards(results, iou_threshold=iou_threshold, min_votes=min_votes)
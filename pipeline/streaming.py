@@ -0,0 +1,133 @@
+import numpy as np
+import sys
+sys.path.append('../')
+from tools import profile_stage
+from camera_movement import CameraMovementEstimator
+from view import ViewTransformer
+from speed_distance import SpeedAndDistance_Estimator
+from team_assigner import TeamAssigner
+from player_ball_assigner import PlayerBallAssigner
+from trackers import TrackTable
+from renderer import FrameRenderer
+
+class StreamingAnalyzer():
+    # Runs the whole analysis over bounded windows of frames instead of the full clip.
+    # Only the window being analysed and the one waiting for speed lookahead are kept in memory.
+    def __init__(self, tracker, window_size=120, min_possession_frames=1, render_workers=1, frame_rate=24, exporter=None, start_frame=0,
+                 homography=None):
+        self.tracker = tracker
+        self.window_size = window_size
+
+        self.camera_movement_estimator = None  # Built from the first frame, which fixes the feature mask
+        self.view_transformer = ViewTransformer()
+        self.homography = homography  # view.ShotHomography estimating the pitch per shot instead of the fixed quad
+        self.speed_and_distance_estimator = SpeedAndDistance_Estimator(frame_rate=frame_rate)
+        self.team_assigner = TeamAssigner()
+        self.player_assigner = PlayerBallAssigner(min_possession_frames)
+        self.renderer = FrameRenderer(render_workers)
+
+        if window_size < self.speed_and_distance_estimator.frame_window:
+            raise ValueError(f"window_size must be at least {self.speed_and_distance_estimator.frame_window} frames")
+
+        self.ball_control_counts = np.zeros(2, dtype=np.int64)  # Frames controlled by team 1 and team 2 so far
+        self.pending = None  # Analysed window still waiting for the next window's first frames
+        self.next_frame = start_frame  # Clip index of the first frame of the next window
+        self.exporter = exporter  # analytics.TrackExporter receiving every finished window
+
+    def analyze_window(self, frames, detections=None):
+        if detections is None:
+            track_table = self.tracker.get_object_tracks(frames, as_table=True)
+        else:  # Detection already ran in an earlier pipeline stage
+            track_table = TrackTable.from_tracks(self.tracker.track_detections(detections))
+        num_frames = len(frames)
+        with profile_stage('positions', num_frames):
+            self.tracker.add_position_to_table(track_table)
+
+        if self.camera_movement_estimator is None:
+            self.camera_movement_estimator = CameraMovementEstimator(frames[0])
+        with profile_stage('camera_movement', num_frames):
+            camera_movement_per_frame = self.camera_movement_estimator.get_camera_movement_window(frames)
+            self.camera_movement_estimator.add_adjust_positions_to_table(track_table, camera_movement_per_frame)
+
+        with profile_stage('view_transform', num_frames):
+            if self.homography is not None:
+                clip_start = self.homography.update(frames, camera_movement_per_frame)
+                self.homography.add_transformed_position_to_table(track_table, clip_start)
+            else:
+                self.view_transformer.add_transformed_position_to_table(track_table)
+        with profile_stage('team_assignment', num_frames):
+            self.team_assigner.assign_teams_to_table(frames, track_table)
+        tracks = track_table.to_tracks()
+        with profile_stage('ball_interpolation', num_frames):
+            tracks["ball"] = self.tracker.interpolate_ball_window(tracks["ball"])
+
+        with profile_stage('possession', num_frames):
+            team_ball_control = self.player_assigner.assign_ball_to_tracks(tracks)
+
+        window = {
+            "start_frame": self.next_frame,
+            "frames": frames,
+            "tracks": tracks,
+            "camera_movement": camera_movement_per_frame,
+            "team_ball_control": team_ball_control,
+            "ball_control_start": self.ball_control_counts.copy()  # Windows may be rendered on other threads
+        }
+        self.ball_control_counts += [np.sum(team_ball_control == 1), np.sum(team_ball_control == 2)]
+        self.next_frame += len(frames)
+
+        ready = self.finish_window(self.pending, tracks)  # The new window is the lookahead of the pending one
+        self.pending = window
+        return ready
+
+    def finish_window(self, window, lookahead=None):
+        if window is None:
+            return None
+
+        tracks = window["tracks"]
+        if lookahead is not None:
+            frame_window = self.speed_and_distance_estimator.frame_window
+            tracks = {object: tracks[object] + lookahead[object][:frame_window] for object in tracks}  # Shares the per-frame dicts
+
+        with profile_stage('speed_distance', len(window["frames"])):
+            self.speed_and_distance_estimator.add_speed_and_distance_to_window(
+                tracks,
+                start_frame=window["start_frame"],
+                num_frames=len(window["frames"])
+            )
+        if self.exporter is not None:
+            with profile_stage('export', len(window["frames"])):
+                self.exporter.write_tracks(window["tracks"], window["start_frame"], window["team_ball_control"], window["camera_movement"])
+        return window
+
+    def flush(self):
+        window = self.finish_window(self.pending)  # The last window has no lookahead, like the end of a clip
+        self.pending = None
+        return window
+
+    def render_window(self, window):
+        with profile_stage('render', len(window["frames"])):
+            return self.renderer.render(
+                window["frames"],
+                window["tracks"],
+                self.tracker.ball_control_counts(window["team_ball_control"], window["ball_control_start"]),
+                window["camera_movement"]
+            )
+
+    def run(self, frame_windows):
+        # Generator of annotated frames, suitable for save_video
+        for frames in frame_windows:
+            window = self.analyze_window(frames)
+            if window is not None:
+                yield from self.render_window(window)
+
+        window = self.flush()
+        if window is not None:
+            yield from self.render_window(window)
+
+    def analyze(self, frame_windows):
+        # Headless run: every window is analysed (and exported) but nothing is drawn or encoded.
+        # Returns the clip's ball control counts per team
+        for frames in frame_windows:
+            self.analyze_window(frames)
+        self.flush()
+        return self.ball_control_counts
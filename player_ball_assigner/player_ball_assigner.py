@@ -1,10 +1,14 @@
 import sys 
 sys.path.append('../')  # Add the parent directory to the system path
-from tools import get_center_of_bbox, measure_distance  # Import utility functions
+import numpy as np
+from tools import get_center_of_bbox, get_centers_of_bboxes, measure_distance  # Import utility functions
 
 class PlayerBallAssigner():  # Define the PlayerBallAssigner class
-    def __init__(self):  # Initialize the class
+    def __init__(self, min_possession_frames=1):  # Initialize the class
         self.max_player_ball_distance = 70  # Set the maximum distance to assign the ball to a player
+        self.team_in_control = 0  # Team that last had the ball, carried between streamed windows (0 = nobody yet)
+        self.min_possession_frames = min_possession_frames  # A team must keep the ball this many assigned frames in a row to take control
+        self.candidate_run = (0, 0)  # (team, frames) of a possession run at the end of the last window that is still too short
 
     def assign_ball_to_player(self, players, ball_bbox):  # Define method to assign ball to a player
         ball_position = get_center_of_bbox(ball_bbox)  # Get the center position of the ball
@@ -24,4 +28,94 @@ class PlayerBallAssigner():  # Define the PlayerBallAssigner class
                     miniumum_distance = distance  # Update minimum distance
                     assigned_player = player_id  # Assign player ID
 
-        return assigned_player  # Return the assigned player's ID
\ No newline at end of file
+        return assigned_player  # Return the assigned player's ID
+
+    def assign_ball_batch(self, player_frames, player_bboxes, ball_bboxes):
+        # Nearest player to the ball for many frames at once. Players are rows (frame, bbox); ball_bboxes has one
+        # row per frame with NaN where there is no ball. Each player is only compared with the ball of its own frame,
+        # so plain broadcasting is linear in the number of rows. Returns the assigned player row per frame (-1 = none)
+        player_frames = np.asarray(player_frames, dtype=np.int64)
+        player_bboxes = np.asarray(player_bboxes, dtype=np.float64).reshape(-1, 4)
+        ball_positions = get_centers_of_bboxes(np.asarray(ball_bboxes, dtype=np.float64).reshape(-1, 4))
+        num_frames = len(ball_positions)
+
+        ball = ball_positions[player_frames]  # Ball position in the frame of every player row
+        distance_left = np.hypot(player_bboxes[:, 0] - ball[:, 0], player_bboxes[:, 3] - ball[:, 1])  # Distance from left foot to ball
+        distance_right = np.hypot(player_bboxes[:, 2] - ball[:, 0], player_bboxes[:, 3] - ball[:, 1])  # Distance from right foot to ball
+        distance = np.minimum(distance_left, distance_right)  # Choose the smaller distance
+        distance = np.where(distance < self.max_player_ball_distance, distance, np.inf)  # NaN (no ball) compares False
+
+        assigned_rows = np.full(num_frames, -1, dtype=np.int64)
+        order = np.lexsort((distance, player_frames))  # Stable, so ties go to the first player like the per-frame loop
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = player_frames[order][1:] != player_frames[order][:-1]
+        nearest = order[first]  # Closest row of every frame that has players
+        nearest = nearest[np.isfinite(distance[nearest])]
+        assigned_rows[player_frames[nearest]] = nearest
+        return assigned_rows
+
+    def smooth_possession(self, possession):
+        # Team in control per frame from the raw team of the ball holder (0 = nobody / unknown team).
+        # Runs shorter than min_possession_frames do not change control, so flickers do not count as turnovers;
+        # the last run of a window is carried into the next one until it is long enough
+        possession = np.asarray(possession, dtype=np.int64)
+        assigned = np.flatnonzero(possession > 0)
+        accepted = np.zeros(len(possession), dtype=np.int64)
+        if len(assigned):
+            teams = possession[assigned]
+            starts = np.flatnonzero(np.r_[True, teams[1:] != teams[:-1]])  # Runs of the same team over assigned frames
+            lengths = np.diff(np.r_[starts, len(teams)])
+            if teams[0] == self.candidate_run[0]:
+                lengths[0] += self.candidate_run[1]
+            self.candidate_run = (int(teams[starts[-1]]), int(lengths[-1]))
+
+            long_enough = lengths >= self.min_possession_frames
+            run_of_frame = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(teams)]))
+            keep = long_enough[run_of_frame]
+            accepted[assigned[keep]] = teams[keep]
+
+        # Forward fill the accepted team, starting from the team in control at the end of the last window
+        filled = np.maximum.accumulate(np.where(accepted > 0, np.arange(len(accepted)), -1))
+        team_ball_control = np.where(filled >= 0, accepted[np.maximum(filled, 0)], self.team_in_control)
+        if len(team_ball_control):
+            self.team_in_control = int(team_ball_control[-1])
+        return team_ball_control
+
+    def assign_ball_to_tracks(self, tracks):  # Assign the ball in every frame of a window of tracks
+        player_frames, player_ids, player_bboxes, player_teams = [], [], [], []
+        for frame_num, player_track in enumerate(tracks['players']):
+            for player_id, player in player_track.items():
+                player_frames.append(frame_num)
+                player_ids.append(player_id)
+                player_bboxes.append(player['bbox'])
+                player_teams.append(player.get('team', 0))
+        ball_bboxes = np.full((len(tracks['ball']), 4), np.nan)
+        for frame_num, ball_track in enumerate(tracks['ball']):
+            if 1 in ball_track:  # The ball may not have been seen yet
+                ball_bboxes[frame_num] = ball_track[1]['bbox']
+
+        assigned_rows = self.assign_ball_batch(player_frames, player_bboxes, ball_bboxes)
+        has_ball = np.flatnonzero(assigned_rows >= 0)
+        for frame_num, row in zip(has_ball.tolist(), assigned_rows[has_ball].tolist()):
+            tracks['players'][frame_num][player_ids[row]]['has_ball'] = True  # Mark that the player has the ball
+
+        possession = np.zeros(len(ball_bboxes), dtype=np.int64)
+        possession[has_ball] = np.asarray(player_teams, dtype=np.int64)[assigned_rows[has_ball]]
+        return self.smooth_possession(possession)  # Unassigned frames keep the last known team
+
+    def assign_ball_to_table(self, table, ball_bboxes=None):
+        # Same as assign_ball_to_tracks for a TrackTable; ball_bboxes can override the table's ball rows
+        # (e.g. with an interpolated trajectory). Sets has_ball and returns the per-frame team control
+        players = np.flatnonzero(table.object_mask('players'))
+        if ball_bboxes is None:
+            ball_bboxes = np.full((table.num_frames, 4), np.nan)
+            ball = table.object_mask('ball')
+            ball_bboxes[table.frame[ball]] = table.bbox[ball]
+
+        assigned_rows = self.assign_ball_batch(table.frame[players], table.bbox[players], ball_bboxes)
+        has_ball = np.flatnonzero(assigned_rows >= 0)
+        table.has_ball[players[assigned_rows[has_ball]]] = True
+
+        possession = np.zeros(len(ball_bboxes), dtype=np.int64)
+        possession[has_ball] = table.team[players[assigned_rows[has_ball]]]
+        return self.smooth_possession(possession)
@@ -0,0 +1,2 @@
+from .frame_renderer import FrameRenderer
+from .render_later import render_export
\ No newline at end of file
@@ -0,0 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+import sys
+sys.path.append('../')
+from tools import get_center_of_bbox, get_bbox_width, get_foot_position
+
+class FrameRenderer():
+    # Draws everything the output video shows (player/referee ellipses with track id labels, ball and
+    # possession triangles, ball control and camera movement panels, speed and distance labels) in one
+    # pass per frame. Draws the same pixels as Tracker.draw_annotations, draw_ball_control_counts and
+    # SpeedAndDistance_Estimator.draw_speed_and_distance, but frames are drawn in place, panels are only
+    # blended over their own region and track id labels are rendered once and then copied
+    def __init__(self, workers=1):
+        self.workers = workers  # Frames rendered in parallel; OpenCV drawing releases the GIL
+        self.label_sprites = {}  # (track_id, color) -> (image, mask) of the filled label box with its id
+
+    def label_sprite(self, track_id, color):
+        key = (track_id, tuple(color))
+        sprite = self.label_sprites.get(key)
+        if sprite is None:
+            # Drawn exactly like draw_ellipse draws the label, with the label box's top-left corner at (pad, pad)
+            pad = 20
+            image = np.zeros((20 + 2 * pad + 1, 40 + 3 * pad + 1, 3), dtype=np.uint8)
+            mask = np.zeros(image.shape[:2], dtype=np.uint8)
+            x1_text = pad + 12
+            if track_id > 99:
+                x1_text -= 10  # Adjust text position for larger IDs
+            for canvas, fill, ink in ((image, color, (0, 0, 0)), (mask, 255, 255)):
+                cv2.rectangle(canvas, (pad, pad), (pad + 40, pad + 20), fill, cv2.FILLED)
+                cv2.putText(canvas, f"{track_id}", (x1_text, pad + 15), cv2.FONT_HERSHEY_SIMPLEX, 0.6, ink, 2)
+            rows, columns = np.nonzero(mask)
+            crop = (slice(rows.min(), rows.max() + 1), slice(columns.min(), columns.max() + 1))
+            sprite = (image[crop], mask[crop] > 0, int(columns.min()) - pad, int(rows.min()) - pad)
+            self.label_sprites[key] = sprite
+        return sprite
+
+    def blit(self, frame, sprite, x, y):
+        image, mask, dx, dy = sprite
+        x, y = x + dx, y + dy
+        height, width = mask.shape
+        x1, y1 = max(x, 0), max(y, 0)
+        x2, y2 = min(x + width, frame.shape[1]), min(y + height, frame.shape[0])
+        if x1 >= x2 or y1 >= y2:
+            return  # Entirely outside the frame
+        sprite_region = (slice(y1 - y, y2 - y), slice(x1 - x, x2 - x))
+        region = frame[y1:y2, x1:x2]
+        region_mask = mask[sprite_region]
+        region[region_mask] = image[sprite_region][region_mask]
+
+    def draw_ellipse(self, frame, bbox, color, track_id=None):
+        y2 = int(bbox[3])  # Get bottom y-coordinate of bounding box
+        x_center, _ = get_center_of_bbox(bbox)  # Get center x-coordinate
+        width = get_bbox_width(bbox)  # Get width of bounding box
+        cv2.ellipse(frame, center=(x_center, y2), axes=(int(width), int(0.35 * width)), angle=0.0,
+                    startAngle=-45, endAngle=235, color=color, thickness=2, lineType=cv2.LINE_4)
+        if track_id is not None:
+            self.blit(frame, self.label_sprite(track_id, color), x_center - 20, y2 + 5)
+
+    def draw_triangle(self, frame, bbox, color):
+        y = int(bbox[1])  # Get top y-coordinate of bounding box
+        x, _ = get_center_of_bbox(bbox)  # Get center x-coordinate
+        triangle_points = np.array([[x, y], [x - 10, y - 20], [x + 10, y - 20]])
+        cv2.drawContours(frame, [triangle_points], 0, color, cv2.FILLED)  # Draw filled triangle
+        cv2.drawContours(frame, [triangle_points], 0, (0, 0, 0), 2)       # Outline the triangle
+
+    def draw_panel(self, frame, top_left, bottom_right, alpha):
+        roi = frame[top_left[1]:bottom_right[1] + 1, top_left[0]:bottom_right[0] + 1]  # Rectangle corners are inclusive
+        cv2.addWeighted(roi, 1 - alpha, roi, 0, 255 * alpha, dst=roi)  # Same as blending a white rectangle over the frame
+
+    def render_frame(self, frame, players, referees, ball, ball_control_counts, camera_movement):
+        for track_id, player in players.items():
+            color = player.get("team_color", (0, 0, 255))  # Get team color or default to red
+            self.draw_ellipse(frame, player["bbox"], color, track_id)
+            if player.get('has_ball', False):
+                self.draw_triangle(frame, player["bbox"], (0, 255, 0))  # Draw triangle if player has ball
+
+        for referee in referees.values():
+            self.draw_ellipse(frame, referee["bbox"], (0, 255, 255))  # Draw ellipse around referee
+
+        for ball_info in ball.values():
+            self.draw_triangle(frame, ball_info["bbox"], (0, 0, 255))  # Draw triangle for the ball
+
+        # Ball control panel
+        self.draw_panel(frame, (1350, 850), (1900, 970), 0.4)
+        team_1_num_frames, team_2_num_frames = ball_control_counts
+        total_num_frames = max(team_1_num_frames + team_2_num_frames, 1)  # No team may have had the ball yet
+        cv2.putText(frame, f"Team 1 Ball Control: {team_1_num_frames / total_num_frames * 100:.2f}%", (1400, 900),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 3)
+        cv2.putText(frame, f"Team 2 Ball Control: {team_2_num_frames / total_num_frames * 100:.2f}%", (1400, 950),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 3)
+
+        # Camera movement panel
+        self.draw_panel(frame, (0, 0), (500, 100), 0.6)
+        x_movement, y_movement = camera_movement
+        cv2.putText(frame, f"Camera Movement X: {x_movement:.2f}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 3)
+        cv2.putText(frame, f"Camera Movement Y: {y_movement:.2f}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 3)
+
+        # Speed and distance labels
+        for player in players.values():
+            speed, distance = player.get('speed'), player.get('distance')
+            if speed is None or distance is None:
+                continue
+            x, y = get_foot_position(player['bbox'])
+            cv2.putText(frame, f"{speed:.2f} km/h", (x, y + 40), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
+            cv2.putText(frame, f"{distance:.2f} m", (x, y + 60), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
+        return frame
+
+    def render(self, frames, tracks, ball_control_counts, camera_movement_per_frame, copy=False):
+        # All arguments are aligned per frame (ball_control_counts from Tracker.ball_control_counts);
+        # returns the frames, drawn on in place, or drawn on copies with copy=True (read-only frames)
+        ball_control_counts = np.asarray(ball_control_counts).tolist()
+
+        def render_one(frame_num):
+            return self.render_frame(
+                frames[frame_num].copy() if copy else frames[frame_num],
+                tracks["players"][frame_num],
+                tracks["referees"][frame_num],
+                tracks["ball"][frame_num],
+                ball_control_counts[frame_num],
+                camera_movement_per_frame[frame_num]
+            )
+
+        if self.workers <= 1:
+            return [render_one(frame_num) for frame_num in range(len(frames))]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(render_one, range(len(frames))))
@@ -0,0 +1,47 @@
+import numpy as np
+import sys
+sys.path.append('../')
+from tools import read_video_chunks, save_video
+from trackers import TrackTable, OBJECT_CLASSES
+from analytics import load_track_table, load_export
+from .frame_renderer import FrameRenderer
+
+def window_table(table, start, stop):
+    # Rows of frames [start, stop) of a TrackTable as their own table, renumbered to start at 0
+    rows = slice(table.frame_class_offsets[start * len(OBJECT_CLASSES)], table.frame_class_offsets[stop * len(OBJECT_CLASSES)])
+    columns = {name: column[rows] for name, column in table.to_columns().items()}
+    columns["frame"] = columns["frame"] - start
+    window = TrackTable.from_columns(columns, stop - start)
+    window.team_colors.update(table.team_colors)
+    window.computed |= table.computed
+    return window
+
+def render_export(export_dir, output_path, start_frame=0, stop_frame=None, video_path=None, window_size=120, render_workers=2):
+    # Annotated video of clip frames [start_frame, stop_frame) drawn from an analytics export: only those frames of
+    # the source video (by default the one recorded in the export) are decoded, nothing is detected or analysed again.
+    # Ball control percentages still count from the start of the clip
+    table, _, manifest = load_track_table(export_dir, start_frame, stop_frame)
+    video_path = video_path or manifest["video_path"]
+    if video_path is None:
+        raise ValueError("the export does not record its source video; pass video_path")
+
+    per_frame, _ = load_export(export_dir, 'frames')
+    team_ball_control = np.zeros(manifest["num_frames"], dtype=np.int64)
+    camera_movement = np.zeros((manifest["num_frames"], 2))
+    if per_frame:
+        team_ball_control[per_frame["frame"]] = per_frame["team_ball_control"]
+        camera_movement[per_frame["frame"]] = per_frame["camera_movement"]
+    ball_control_counts = np.cumsum(np.stack([team_ball_control == 1, team_ball_control == 2], axis=1), axis=0)
+
+    renderer = FrameRenderer(render_workers)
+
+    def render():
+        start = 0
+        for frames in read_video_chunks(video_path, window_size, start_frame, start_frame + table.num_frames):
+            stop = start + len(frames)
+            clip = slice(start_frame + start, start_frame + stop)
+            tracks = window_table(table, start, stop).to_tracks()
+            yield from renderer.render(frames, tracks, ball_control_counts[clip], camera_movement[clip].tolist())
+            start = stop
+
+    save_video(render(), output_path, manifest["frame_rate"])
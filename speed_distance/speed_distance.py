@@ -1,22 +1,131 @@
 import cv2  
 import sys  
+from collections import deque
+import numpy as np
 sys.path.append('../')  # Add the parent directory to the system path
 from tools import measure_distance, get_foot_position  # Import specific functions from the utils module
 
 class SpeedAndDistance_Estimator():  # Define a class for estimating speed and distance
-    def __init__(self):  # Initialize the class
+    def __init__(self, mode='sliding', smoothing_window=1, frame_rate=24):  # Initialize the class
         self.frame_window = 5  # Set the frame window size
-        self.frame_rate = 24  # Set the frame rate
-    
+        self.frame_rate = frame_rate  # Frame rate of the source video (VideoReader.fps / get_video_fps)
+        self.mode = mode  # 'sliding': speed over the last frame_window frames at every frame; 'batch': the original non-overlapping batches
+        self.smoothing_window = smoothing_window  # Sliding speed is averaged over this many of the track's last speeds
+        self.total_distance = {}  # Total distances carried between streamed windows ('batch' mode)
+        self.track_state = {}  # (object, track_id) -> recent positions, speeds and total distance ('sliding' mode)
+
     def add_speed_and_distance_to_tracks(self, tracks):  # Define a method to add speed and distance to tracks
-        total_distance = {}  # Initialize a dictionary to store total distances
+        if self.mode == 'sliding':
+            self.track_state = {}  # The whole clip is a single window
+            self.update_tracks(tracks)
+            return
+        self.add_speed_and_distance_to_window(tracks, total_distance={})  # The whole clip is a single window
+
+    def update_track(self, object, track_id, frame_num, position):
+        # One new observation of a track: O(1) in the length of the clip. Returns (speed in km/h or None
+        # when the track has no earlier frame yet, total distance in meters). The distance is the path
+        # length over every observed frame, not the per-batch chord of 'batch' mode, so it reads higher
+        # than before (it includes small detection jitter). When a track reappears more than frame_window
+        # frames after its last observation the jump is not counted and its speed starts over
+        state = self.track_state.get((object, track_id))
+        if state is None:
+            state = {"history": deque(), "speeds": deque(maxlen=self.smoothing_window), "distance": 0.0}
+            self.track_state[(object, track_id)] = state
+
+        history = state["history"]
+        if history and frame_num - history[-1][0] > self.frame_window:  # Reappeared after a gap: restart the window
+            history.clear()
+            state["speeds"].clear()
+        if history:
+            state["distance"] += measure_distance(history[-1][1], position)  # Path length, frame to frame
+        history.append((frame_num, position))
+        while history[0][0] < frame_num - self.frame_window:  # Keep only the sliding window
+            history.popleft()
+
+        first_frame, first_position = history[0]
+        if first_frame == frame_num:
+            return None, state["distance"]
+        time_elapsed = (frame_num - first_frame) / self.frame_rate  # Calculate the time elapsed
+        speed_km_per_hour = measure_distance(first_position, position) / time_elapsed * 3.6
+        state["speeds"].append(speed_km_per_hour)
+        return sum(state["speeds"]) / len(state["speeds"]), state["distance"]
+
+    def update_tracks(self, tracks, start_frame=0, num_frames=None):
+        # Sliding mode over per-frame dicts; state carries over, so windows can be fed as they stream in
+        for object, object_tracks in tracks.items():
+            if object == "ball" or object == "referees":  # Skip if the object is "ball" or "referees"
+                continue
+            for frame_num, track in enumerate(object_tracks[:num_frames]):
+                for track_id, track_info in track.items():
+                    position = track_info.get('position_transformed')
+                    if position is None:
+                        continue
+                    speed, distance = self.update_track(object, track_id, start_frame + frame_num, np.asarray(position, dtype=np.float64))
+                    if speed is not None:
+                        track_info['speed'] = speed
+                    track_info['distance'] = distance
+
+    def add_speed_and_distance_to_table(self, table):
+        # Sliding mode for a whole TrackTable with NumPy: same results as update_tracks on the same clip
+        if self.mode != 'sliding':
+            self.add_speed_and_distance_to_tracks(table.as_tracks())
+            return
+
+        rows = np.flatnonzero(table.object_mask('players') & ~np.isnan(table.position_transformed[:, 0]))
+        rows = rows[np.lexsort((table.frame[rows], table.track_id[rows]))]  # Every track contiguous, in frame order
+        track_ids = table.track_id[rows].astype(np.int64)
+        frames = table.frame[rows].astype(np.int64)
+        positions = table.position_transformed[rows].astype(np.float64)
+        index = np.arange(len(rows))
+
+        new_track = np.r_[True, track_ids[1:] != track_ids[:-1]]
+        track_start = np.maximum.accumulate(np.where(new_track, index, 0))  # First row of each row's track
+        new_segment = new_track | np.r_[False, frames[1:] - frames[:-1] > self.frame_window]  # Track starts or reappears after a gap
+        segment_start = np.maximum.accumulate(np.where(new_segment, index, 0))
+
+        steps = np.r_[0.0, np.hypot(*(positions[1:] - positions[:-1]).T)]
+        steps[new_segment] = 0.0  # Jumps across gaps are not distance covered
+        path = np.cumsum(steps)
+        distance = path - path[track_start]
+
+        keys = track_ids * 2 ** 32 + frames  # Sorted
+        window_start = np.maximum(np.searchsorted(keys, keys - self.frame_window), segment_start)  # Oldest row still in the window
+        time_elapsed = (frames - frames[window_start]) / self.frame_rate
+        with np.errstate(divide='ignore', invalid='ignore'):
+            speed = np.where(time_elapsed > 0, np.hypot(*(positions - positions[window_start]).T) / time_elapsed * 3.6, np.nan)
+
+        has_speed = np.flatnonzero(~np.isnan(speed))
+        if self.smoothing_window > 1 and len(has_speed):
+            speeds = speed[has_speed]
+            speed_index = np.arange(len(has_speed))
+            speed_segments = segment_start[has_speed]
+            speed_start = np.maximum.accumulate(np.where(np.r_[True, speed_segments[1:] != speed_segments[:-1]], speed_index, 0))
+            low = np.maximum(speed_index - self.smoothing_window + 1, speed_start)
+            cumulative = np.r_[0.0, np.cumsum(speeds)]
+            speed[has_speed] = (cumulative[speed_index + 1] - cumulative[low]) / (speed_index + 1 - low)
+
+        table.speed[rows] = speed
+        table.distance[rows] = distance
+
+    def add_speed_and_distance_to_window(self, tracks, start_frame=0, num_frames=None, total_distance=None):
+        # tracks may carry up to frame_window lookahead frames after the first num_frames frames;
+        # batches are aligned on clip frame numbers (start_frame + index) so consecutive windows line up
+        if self.mode == 'sliding':  # Only looks back, so the lookahead frames are not needed
+            self.update_tracks(tracks, start_frame, num_frames)
+            return
+        if total_distance is None:
+            total_distance = self.total_distance  # Keep accumulating across windows
 
         for object, object_tracks in tracks.items():  # Iterate over each object and its tracks
             if object == "ball" or object == "referees":  # Skip if the object is "ball" or "referees"
                 continue 
             number_of_frames = len(object_tracks)  # Get the number of frames for the object
-            for frame_num in range(0, number_of_frames, self.frame_window):  # Iterate over frames in steps of frame_window
+            window_frames = number_of_frames if num_frames is None else num_frames  # Frames whose batches start in this window
+            first_batch = -start_frame % self.frame_window  # First frame that starts a batch
+            for frame_num in range(first_batch, window_frames, self.frame_window):  # Iterate over frames in steps of frame_window
                 last_frame = min(frame_num + self.frame_window, number_of_frames - 1)  # Calculate the last frame in the window
+                if last_frame == frame_num:  # A single trailing frame has no elapsed time
+                    continue
 
                 for track_id, _ in object_tracks[frame_num].items():  # Iterate over each track in the current frame
                     if track_id not in object_tracks[last_frame]:  # Skip if the track_id is not in the last frame
@@ -1,44 +1,75 @@
-from sklearn.cluster import KMeans  
+from sklearn.cluster import KMeans
+import numpy as np
+import cv2
 
 class TeamAssigner:
     def __init__(self):
         self.team_colors = {}  # Dictionary to store team colors
         self.player_team_dict = {}  # Dictionary to store player-team assignments
-    
-    def get_clustering_model(self, image):
-        image_2d = image.reshape(-1, 3)  # Reshape the image to a 2D array with 3 color channels
-
-        kmeans = KMeans(n_clusters=2, init="k-means++", n_init=1)  # Initialize KMeans with 2 clusters
-        kmeans.fit(image_2d)  # Fit the KMeans model to the image data
-
-        return kmeans  # Return the fitted KMeans model
+        self.player_team_history = {}  # player_id -> [(first frame, team), ...]; more than one entry after an ID switch
+        self.player_last_checked = {}  # player_id -> frame of the last jersey color check
+        self.player_votes = {}  # player_id -> teams predicted by the re-validation checks since the last change
+
+        self.crop_size = 16  # Jersey crops are resized to crop_size x crop_size before clustering
+        self.revalidate_every = 24  # Frames between two color checks of an already assigned track
+        self.votes_to_switch = 3  # Consecutive disagreeing checks needed to move a track to the other team
+        self.frame_count = 0  # Frames processed so far, so histories use clip frame numbers across windows
+
+    def get_player_colors(self, frame, bboxes):
+        # Jersey color of many players at once: every top-half crop is resized to the same size and all of
+        # them are split into 2 color clusters together; NaN for boxes with no pixels inside the frame
+        bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        size = self.crop_size
+        pixels = np.zeros((len(bboxes), size * size, 3), dtype=np.float32)
+        valid = np.zeros(len(bboxes), dtype=bool)
+        for i, bbox in enumerate(bboxes):
+            image = frame[max(int(bbox[1]), 0):int(bbox[3]), max(int(bbox[0]), 0):int(bbox[2])]  # Extract the bounding box region from the frame
+            top_half_image = image[0:int(image.shape[0] / 2), :]  # Get the top half of the bounding box image
+            if top_half_image.size == 0:
+                continue
+            pixels[i] = cv2.resize(top_half_image, (size, size), interpolation=cv2.INTER_AREA).reshape(-1, 3)
+            valid[i] = True
+
+        colors = np.full((len(bboxes), 3), np.nan)
+        if not np.any(valid):
+            return colors
+
+        centers, labels = self.two_means(pixels[valid])
+        corners = labels[:, [0, size - 1, size * (size - 1), size * size - 1]]  # Get the clusters of the corners
+        non_player_cluster = (corners.sum(axis=1) > 2).astype(int)  # Majority of the corners, ties go to cluster 0
+        player_cluster = 1 - non_player_cluster  # Determine the player cluster
+        colors[valid] = centers[np.arange(len(centers)), player_cluster]
+        return colors
+
+    def two_means(self, pixels, iterations=10):
+        # Batched 2-means over (crops, pixels, 3); one cluster starts at the mean corner color (background),
+        # the other at the pixel farthest from it
+        num_pixels = pixels.shape[1]
+        side = self.crop_size
+        corner_mean = pixels[:, [0, side - 1, side * (side - 1), num_pixels - 1]].mean(axis=1)
+        farthest = np.argmax(((pixels - corner_mean[:, None]) ** 2).sum(axis=2), axis=1)
+        centers = np.stack([corner_mean, pixels[np.arange(len(pixels)), farthest]], axis=1)  # (crops, 2, 3)
+
+        for _ in range(iterations):
+            distances = ((pixels[:, :, None, :] - centers[:, None, :, :]) ** 2).sum(axis=3)  # (crops, pixels, 2)
+            labels = np.argmin(distances, axis=2)
+            is_second = (labels == 1)[:, :, None]
+            counts = np.stack([num_pixels - is_second.sum(axis=1), is_second.sum(axis=1)], axis=1)  # (crops, 2, 1)
+            sums = np.stack([(pixels * ~is_second).sum(axis=1), (pixels * is_second).sum(axis=1)], axis=1)
+            centers = np.where(counts > 0, sums / np.maximum(counts, 1), centers)  # Empty clusters keep their center
+        return centers, labels
 
     def get_player_color(self, frame, bbox):
-        image = frame[int(bbox[1]):int(bbox[3]), int(bbox[0]):int(bbox[2])]  # Extract the bounding box region from the frame
-
-        top_half_image = image[0:int(image.shape[0] / 2), :]  # Get the top half of the bounding box image
-
-        kmeans = self.get_clustering_model(top_half_image)  # Get the clustering model for the top half image
-
-        labels = kmeans.labels_  # Get the cluster labels for each pixel
-
-        clustered_image = labels.reshape(top_half_image.shape[0], top_half_image.shape[1])  # Reshape the labels to the image shape
-
-        corner_clusters = [clustered_image[0, 0], clustered_image[0, -1], clustered_image[-1, 0], clustered_image[-1, -1]]  # Get the clusters of the corners
-        non_player_cluster = max(set(corner_clusters), key=corner_clusters.count)  # Determine the non-player cluster
-        player_cluster = 1 - non_player_cluster  # Determine the player cluster
+        return self.get_player_colors(frame, [bbox])[0]  # Return the player color
 
-        player_color = kmeans.cluster_centers_[player_cluster]  # Get the color of the player cluster
+    def assign_team_color(self, frame, player_detections):
+        bboxes = [player_detection["bbox"] for player_detection in player_detections.values()]  # Bounding boxes of the players
+        self.fit_team_colors(frame, bboxes)
 
-        return player_color  # Return the player color
+    def fit_team_colors(self, frame, bboxes):
+        player_colors = self.get_player_colors(frame, bboxes)  # Get the player colors
+        player_colors = player_colors[~np.isnan(player_colors).any(axis=1)]
 
-    def assign_team_color(self, frame, player_detections):
-        player_colors = []  # List to store player colors
-        for _, player_detection in player_detections.items():  # Iterate over player detections
-            bbox = player_detection["bbox"]  # Get the bounding box of the player
-            player_color = self.get_player_color(frame, bbox)  # Get the player color
-            player_colors.append(player_color)  # Append the player color to the list
-        
         kmeans = KMeans(n_clusters=2, init="k-means++", n_init=10)  # Initialize KMeans with 2 clusters
         kmeans.fit(player_colors)  # Fit the KMeans model to the player colors
 
@@ -47,18 +78,108 @@ class TeamAssigner:
         self.team_colors[1] = kmeans.cluster_centers_[0]  # Assign the first cluster center to team 1
         self.team_colors[2] = kmeans.cluster_centers_[1]  # Assign the second cluster center to team 2
 
-    def get_player_team(self, frame, player_bbox, player_id):
-        if player_id in self.player_team_dict:  # Check if the player is already assigned to a team
-            return self.player_team_dict[player_id]  # Return the assigned team
-
-        player_color = self.get_player_color(frame, player_bbox)  # Get the player color
+    def predict_teams(self, player_colors):
+        distances = ((player_colors[:, None, :] - self.kmeans.cluster_centers_[None]) ** 2).sum(axis=2)  # Nearest team color
+        return np.argmin(distances, axis=1) + 1  # Team ids match the team_colors dictionary
+
+    def update_player_teams(self, frame, player_ids, bboxes, frame_num):
+        # Classify new tracks and re-check tracks whose last check is revalidate_every frames old,
+        # with one batched color extraction for the whole frame
+        due = [
+            i for i, player_id in enumerate(player_ids)
+            if player_id not in self.player_team_dict or frame_num - self.player_last_checked[player_id] >= self.revalidate_every
+        ]
+        if not due:
+            return
+
+        colors = self.get_player_colors(frame, np.asarray(bboxes)[due])
+        valid = ~np.isnan(colors).any(axis=1)
+        teams = np.zeros(len(due), dtype=int)
+        if np.any(valid):
+            teams[valid] = self.predict_teams(colors[valid])
+
+        for i, team_id in zip(due, teams.tolist()):
+            player_id = int(player_ids[i])
+            if team_id == 0:
+                continue  # No pixels to look at; try again on a later frame
+            if player_id == 91:  # Special case for player ID 91
+                team_id = 1  # Assign team 1 to player ID 91
+            self.player_last_checked[player_id] = frame_num
+
+            if player_id not in self.player_team_dict:
+                self.player_team_dict[player_id] = team_id  # Store the player-team assignment
+                self.player_team_history[player_id] = [(frame_num, team_id)]
+                self.player_votes[player_id] = []
+                continue
+
+            votes = self.player_votes[player_id]
+            votes.append(team_id)
+            if team_id == self.player_team_dict[player_id]:
+                votes.clear()
+            elif len(votes) >= self.votes_to_switch:  # The track id most likely moved to another player
+                self.player_team_dict[player_id] = team_id
+                self.player_team_history[player_id].append((frame_num, team_id))
+                votes.clear()
 
-        team_id = self.kmeans.predict(player_color.reshape(1, -1))[0]  # Predict the team ID using the KMeans model
-        team_id += 1  # Increment the team ID to match the team_colors dictionary
-
-        if player_id == 91:  # Special case for player ID 91
-            team_id = 1  # Assign team 1 to player ID 91
-
-        self.player_team_dict[player_id] = team_id  # Store the player-team assignment
-
-        return team_id  # Return the team ID
+    def get_player_team(self, frame, player_bbox, player_id):
+        if player_id not in self.player_team_dict:  # Check if the player is already assigned to a team
+            self.update_player_teams(frame, [player_id], [player_bbox], self.frame_count)
+        return self.player_team_dict.get(player_id, 0)  # Return the team ID (0 if it could not be determined)
+
+    def assign_teams_to_tracks(self, frames, player_tracks):
+        if not self.team_colors:  # Fit the team colors on the first frame that shows both teams
+            for frame, player_track in zip(frames, player_tracks):
+                if len(player_track) >= 2:
+                    self.assign_team_color(frame, player_track)
+                    break
+            else:
+                self.frame_count += len(player_tracks)
+                return  # No usable frame in this window yet
+
+        for frame_num, player_track in enumerate(player_tracks):  # Assign team information to each player's track data
+            player_ids = list(player_track.keys())
+            bboxes = [track['bbox'] for track in player_track.values()]
+            self.update_player_teams(frames[frame_num], player_ids, bboxes, self.frame_count + frame_num)
+            for player_id, track in player_track.items():
+                team = self.player_team_dict.get(player_id)
+                if team is not None:
+                    track['team'] = team
+                    track['team_color'] = self.team_colors[team]
+        self.frame_count += len(player_tracks)
+
+    def assign_teams_to_table(self, frames, table):
+        # Same as assign_teams_to_tracks for a TrackTable: frames are only read where a track is new or
+        # due for re-validation, and the team column is then written for the whole clip at once
+        players = table.object_mask('players')
+        if not self.team_colors:
+            for frame_num in range(table.num_frames):
+                rows = table.frame_rows(frame_num, 'players')
+                if rows.stop - rows.start >= 2:
+                    self.fit_team_colors(frames[frame_num], table.bbox[rows])
+                    break
+            else:
+                self.frame_count += table.num_frames
+                return
+
+        for frame_num in range(table.num_frames):
+            rows = table.frame_rows(frame_num, 'players')
+            player_ids = table.track_id[rows].tolist()
+            clip_frame = self.frame_count + frame_num
+            if any(player_id not in self.player_team_dict or clip_frame - self.player_last_checked[player_id] >= self.revalidate_every for player_id in player_ids):
+                self.update_player_teams(frames[frame_num], player_ids, table.bbox[rows], clip_frame)
+
+        track_ids = table.track_id[players]
+        lookup = np.zeros(int(track_ids.max()) + 1 if len(track_ids) else 1, dtype=np.int8)
+        for player_id, history in self.player_team_history.items():
+            if player_id < len(lookup):
+                lookup[player_id] = history[0][1]
+        team = lookup[track_ids]
+
+        clip_frames = self.frame_count + table.frame[players]
+        for player_id, history in self.player_team_history.items():  # Only tracks that switched team
+            for first_frame, team_id in history[1:]:
+                team[(track_ids == player_id) & (clip_frames >= first_frame)] = team_id
+
+        table.team[players] = team
+        table.team_colors.update(self.team_colors)
+        self.frame_count += table.num_frames
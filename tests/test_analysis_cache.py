@@ -0,0 +1,80 @@
+import os
+import numpy as np
+import supervision as sv
+from tools import AnalysisCache
+from trackers import Tracker
+
+def test_key_depends_on_every_parameter(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    key = cache.key('tracks', video='a', params={"x": 1, "y": 2})
+    assert key == cache.key('tracks', params={"y": 2, "x": 1}, video='a')
+    assert key != cache.key('tracks', video='b', params={"x": 1, "y": 2})
+    assert key != cache.key('tracks', video='a', params={"x": 1, "y": 3})
+    assert key != cache.key('detections', video='a', params={"x": 1, "y": 2})
+    assert key != AnalysisCache(str(tmp_path), chunk_size=100).key('tracks', video='a', params={"x": 1, "y": 2})
+
+def test_file_digest_follows_content(tmp_path):
+    cache = AnalysisCache(str(tmp_path / 'cache'))
+    path = tmp_path / 'video.bin'
+    path.write_bytes(b'frame data')
+    digest = cache.file_digest(str(path))
+    assert cache.file_digest(str(path)) == digest
+    path.write_bytes(b'other frame data')
+    assert cache.file_digest(str(path)) != digest
+
+def test_chunks_and_completion(tmp_path):
+    cache = AnalysisCache(str(tmp_path), chunk_size=4)
+    assert cache.chunk_ranges(10) == [(0, 4), (4, 8), (8, 10)]
+    key = cache.key('camera_movement', video='a')
+    assert cache.load_chunk('camera_movement', key, 0) is None
+    movement = np.arange(8, dtype=np.float32).reshape(4, 2)
+    cache.save_chunk('camera_movement', key, 0, movement=movement)
+    np.testing.assert_array_equal(cache.load_chunk('camera_movement', key, 0)["movement"], movement)
+    assert cache.completed('camera_movement', key) is None
+    cache.mark_complete('camera_movement', key, 3, 10)
+    assert cache.completed('camera_movement', key) == {"num_chunks": 3, "num_frames": 10}
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_bytes=0)
+    old_key, new_key = cache.key('tracks', video='old'), cache.key('tracks', video='new')
+    cache.save_chunk('tracks', old_key, 0, bbox=np.zeros((100, 4)))
+    os.utime(os.path.join(str(tmp_path), 'tracks', old_key, 'last_used'), (0, 0))
+    cache.save_chunk('tracks', new_key, 0, bbox=np.zeros((100, 4)))
+    cache.mark_complete('tracks', new_key, 1, 1)
+    assert cache.load_chunk('tracks', old_key, 0) is None
+    assert cache.load_chunk('tracks', new_key, 0) is not None  # The most recent entry is always kept
+
+def fake_detections(frames):
+    # Two players walking right, a referee and a ball, the way the inference engine returns them
+    detections = []
+    for frame_num in frames:
+        x = 10.0 * frame_num
+        detections.append(sv.Detections(
+            xyxy=np.array([[x, 100, x + 40, 200], [x + 300, 100, x + 340, 200], [900, 50, 940, 150], [x + 45, 190, x + 55, 200]], dtype=np.float32),
+            confidence=np.array([0.9, 0.8, 0.9, 0.7], dtype=np.float32),
+            class_id=np.array([2, 1, 3, 0]),
+            data={"class_name": np.array(['player', 'goalkeeper', 'referee', 'ball'])}
+        ))
+    return detections
+
+def test_cached_tracks_never_load_the_model(tmp_path):
+    video_path, model_path = tmp_path / 'clip.avi', tmp_path / 'best.pt'
+    video_path.write_bytes(b'video')
+    model_path.write_bytes(b'weights')
+    frames = list(range(10))  # Stand-ins for the frames: the fake detector only needs the frame numbers
+    cache = AnalysisCache(str(tmp_path / 'cache'), chunk_size=4)
+
+    tracker = Tracker(str(model_path))
+    tracker.detect_frames = fake_detections
+    tracks = tracker.get_object_tracks(frames, cache=cache, video_path=str(video_path))
+    assert [len(frame) for frame in tracks["players"]] == [2] * 10
+    assert [len(frame) for frame in tracks["referees"]] == [1] * 10
+
+    tracker = Tracker(str(model_path))  # Same parameters: the tracks themselves come from the cache
+    assert tracker.get_object_tracks(frames, cache=cache, video_path=str(video_path)) == tracks
+    assert tracker._model is None
+
+    tracker = Tracker(str(model_path))  # Other tracker parameters: ByteTrack runs again on the cached detections
+    tracker.tracker_params = {"lost_track_buffer": 10}
+    assert tracker.get_object_tracks(frames, cache=cache, video_path=str(video_path)) == tracks
+    assert tracker._model is None
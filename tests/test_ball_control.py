@@ -0,0 +1,25 @@
+import numpy as np
+from trackers import Tracker
+
+def test_counts_match_counting_every_prefix():
+    team_ball_control = np.random.default_rng(0).integers(0, 3, 200)
+    counts = Tracker('models/best.pt').ball_control_counts(team_ball_control)
+    for frame_num in range(len(team_ball_control)):
+        till_frame = team_ball_control[:frame_num + 1]
+        assert counts[frame_num].tolist() == [(till_frame == 1).sum(), (till_frame == 2).sum()]
+
+def test_counts_continue_across_windows():
+    tracker = Tracker('models/best.pt')
+    team_ball_control = np.random.default_rng(1).integers(0, 3, 90)
+    first = tracker.ball_control_counts(team_ball_control[:40])
+    second = tracker.ball_control_counts(team_ball_control[40:], first[-1])
+    np.testing.assert_array_equal(np.concatenate([first, second]), tracker.ball_control_counts(team_ball_control))
+
+def test_frame_num_signature_draws_the_same_panel():
+    tracker = Tracker('models/best.pt')
+    team_ball_control = np.random.default_rng(2).integers(0, 3, 50)
+    counts = tracker.ball_control_counts(team_ball_control)
+    frame = np.random.default_rng(3).integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    for frame_num in (0, 17, 49):
+        expected = tracker.draw_ball_control_counts(frame.copy(), *counts[frame_num].tolist())
+        np.testing.assert_array_equal(tracker.draw_team_ball_control(frame.copy(), frame_num, team_ball_control), expected)
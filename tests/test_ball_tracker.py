@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from trackers import BallTracker, interpolate_boxes, ball_boxes
+
+def ball_at(x, y, size=10.0):
+    return [x - size / 2, y - size / 2, x + size / 2, y + size / 2]
+
+def test_picks_the_ball_on_its_path_over_a_confident_false_positive():
+    tracker = BallTracker()
+    for frame_num in range(10):
+        assert tracker.update([ball_at(100 + 8 * frame_num, 300)], [0.4]) == ball_at(100 + 8 * frame_num, 300)
+    chosen = tracker.update([ball_at(900, 100), ball_at(180, 300)], [0.45, 0.3])  # A second, slightly more confident "ball"
+    assert chosen == ball_at(180, 300)
+
+def test_coasts_through_short_occlusions_and_drops_the_track_after_max_coast():
+    tracker = BallTracker(max_coast=3)
+    for frame_num in range(6):
+        tracker.update([ball_at(100 + 10 * frame_num, 300)])
+    assert tracker.update([]) is None
+    assert tracker.prediction == pytest.approx(ball_at(160, 300), abs=2.0)  # Keeps moving on the prediction
+    for _ in range(3):
+        tracker.update([])
+    assert tracker.state is None and tracker.prediction is None
+
+def test_false_positive_outside_the_gate_is_ignored_once():
+    tracker = BallTracker()
+    for frame_num in range(6):
+        tracker.update([ball_at(100 + 10 * frame_num, 300)], [0.3])
+    assert tracker.update([ball_at(1500, 800)], [0.3]) is None
+    assert tracker.update([ball_at(170, 300)], [0.3]) == ball_at(170, 300)
+
+def test_kicked_ball_restarts_the_track():
+    tracker = BallTracker(restart_after=2)
+    for frame_num in range(6):
+        tracker.update([ball_at(100 + 10 * frame_num, 300)], [0.3])
+    assert tracker.update([ball_at(600, 300)], [0.3]) is None  # Could be a false positive
+    assert tracker.update([ball_at(660, 300)], [0.3]) == ball_at(660, 300)  # Still only there: the ball was kicked
+    tracker = BallTracker()
+    for frame_num in range(6):
+        tracker.update([ball_at(100 + 10 * frame_num, 300)], [0.3])
+    assert tracker.update([ball_at(600, 300)], [0.9]) == ball_at(600, 300)  # Confident detections restart at once
+
+def test_skipped_frames_advance_the_prediction():
+    tracker = BallTracker()
+    for frame_num in range(6):
+        tracker.update([ball_at(100 + 10 * frame_num, 300)])
+    tracker.skip(4)
+    assert tracker.update([ball_at(200, 300)]) == ball_at(200, 300)  # Where the ball went meanwhile, inside the gate
+    assert tracker.hits == 7
+
+def pandas_interpolation(boxes):
+    # How Tracker.interpolate_ball_positions filled the ball gaps before interpolate_boxes replaced pandas
+    pd = pytest.importorskip("pandas")
+    return pd.DataFrame(boxes).interpolate().bfill().to_numpy()
+
+def test_interpolation_matches_pandas():
+    rng = np.random.default_rng(1)
+    for _ in range(500):
+        num_frames = rng.integers(1, 30)
+        boxes = rng.random((num_frames, 4)) * 100
+        boxes[rng.random(num_frames) < rng.random()] = np.nan  # Gaps of any density, including clips without a ball
+        np.testing.assert_allclose(interpolate_boxes(boxes), pandas_interpolation(boxes), equal_nan=True)
+
+def test_chunks_join_like_the_whole_clip():
+    boxes = np.random.default_rng(2).random((40, 4)) * 100
+    boxes[[0, 1, 5, 6, 7, 19, 20, 21, 22, 39]] = np.nan
+    whole = interpolate_boxes(boxes)
+    chunks = [interpolate_boxes(boxes[:20])]
+    chunks.append(interpolate_boxes(boxes[20:], anchor=chunks[-1][-1]))
+    np.testing.assert_allclose(np.concatenate(chunks)[:19], whole[:19])  # The first chunk cannot see past its end
+    np.testing.assert_allclose(np.concatenate(chunks)[23:], whole[23:])
+
+def test_ball_boxes():
+    boxes = ball_boxes([{1: {"bbox": [1, 2, 3, 4]}}, {}, {1: {"bbox": [5, 6, 7, 8]}}])
+    np.testing.assert_array_equal(boxes, [[1, 2, 3, 4], [np.nan] * 4, [5, 6, 7, 8]])
@@ -0,0 +1,52 @@
+import types
+import numpy as np
+import torch
+from trackers import BatchInferenceEngine
+
+class BrightSquareModel:
+    # Stands in for the YOLO model: "detects" the bright pixels of every input image as one 'ball'
+    names = {0: 'ball', 1: 'player'}
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, batch, conf=0.25, verbose=True):
+        self.batch_sizes.append(len(batch))
+        results = []
+        for image in batch:
+            rows, columns = torch.nonzero(image[0] > 0.9, as_tuple=True)
+            xyxy = torch.tensor([[columns.min(), rows.min(), columns.max() + 1, rows.max() + 1]], dtype=torch.float32)
+            boxes = types.SimpleNamespace(xyxy=xyxy, cls=torch.zeros(1), conf=torch.ones(1))
+            results.append(types.SimpleNamespace(boxes=boxes, names=self.names))
+        return results
+
+def make_frame(frame_num, shape=(720, 1280)):
+    frame = np.zeros(shape + (3,), dtype=np.uint8)
+    x, y = 40 + 12 * frame_num, 100 + 5 * frame_num
+    frame[y:y + 64, x:x + 64] = 255
+    return frame, [x, y, x + 64, y + 64]
+
+def test_boxes_come_back_in_frame_coordinates_and_order():
+    frames, boxes = zip(*[make_frame(frame_num) for frame_num in range(20)])
+    engine = BatchInferenceEngine(BrightSquareModel(), batch_size=4)
+    detections = engine.predict(frames)
+    assert len(detections) == 20
+    for detection, box in zip(detections, boxes):
+        np.testing.assert_allclose(detection.xyxy[0], box, atol=2.5)  # One input pixel is two frame pixels
+        assert detection.data["class_name"].tolist() == ['ball']
+    assert engine.model.batch_sizes == [4] * 5
+
+def test_frame_size_changes_flush_the_batch():
+    frames = [make_frame(0)[0], make_frame(1)[0], make_frame(2, (360, 640))[0], make_frame(3)[0]]
+    model = BrightSquareModel()
+    detections = BatchInferenceEngine(model, batch_size=4).predict_stream(frames)
+    assert [len(detection) for detection in detections] == [1, 1, 1, 1]
+    assert model.batch_sizes == [2, 1, 1]
+
+def test_batch_size_is_tuned_from_the_candidates():
+    model = BrightSquareModel()
+    engine = BatchInferenceEngine(model, candidate_batch_sizes=(1, 2, 4), trials_per_size=1)
+    engine.predict(make_frame(frame_num % 30)[0] for frame_num in range(40))
+    assert engine.batch_size in (1, 2, 4)
+    assert set(model.batch_sizes[:4]) <= {1, 2, 4}
+    assert sum(model.batch_sizes) == 40
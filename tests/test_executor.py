@@ -0,0 +1,70 @@
+import random
+import time
+import threading
+import pytest
+from pipeline import Stage, StagePipeline
+
+def jittered(fn):
+    def run(item):
+        time.sleep(random.uniform(0, 0.002))  # Workers finish out of order
+        return fn(item)
+    return run
+
+def test_output_keeps_input_order():
+    pipeline = StagePipeline([
+        Stage("double", jittered(lambda item: item * 2), workers=4),
+        Stage("increment", lambda item: item + 1),
+        Stage("square", jittered(lambda item: item * item), workers=3)
+    ])
+    assert list(pipeline.run(range(100))) == [(item * 2 + 1) ** 2 for item in range(100)]
+    assert pipeline.stats["double"]["items"] == 100
+    assert pipeline.stats["square"]["items"] == 100
+
+def test_buffering_stage_flushes():
+    buffer = []
+    def batch(item):
+        buffer.append(item)
+        if len(buffer) == 3:
+            batch_items = list(buffer)
+            buffer.clear()
+            return batch_items
+        return None
+
+    pipeline = StagePipeline([Stage("batch", batch, flush=lambda: [list(buffer)] if buffer else [])])
+    assert list(pipeline.run(range(8))) == [[0, 1, 2], [3, 4, 5], [6, 7]]
+
+def test_buffering_stage_needs_one_worker():
+    with pytest.raises(ValueError):
+        Stage("batch", lambda item: item, workers=2, flush=lambda: [])
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_stage_error_reaches_consumer(workers):
+    def fail(item):
+        if item == 5:
+            raise RuntimeError("bad frame")
+        return item
+
+    pipeline = StagePipeline([Stage("fail", fail, workers=workers), Stage("identity", lambda item: item)])
+    seen = []
+    with pytest.raises(RuntimeError, match="bad frame"):
+        for item in pipeline.run(range(20)):
+            seen.append(item)
+    assert seen == list(range(len(seen))) and len(seen) <= 5
+
+def test_source_error_reaches_consumer():
+    def source():
+        yield 1
+        raise OSError("decode failed")
+
+    with pytest.raises(OSError, match="decode failed"):
+        list(StagePipeline([Stage("identity", lambda item: item)]).run(source()))
+
+def test_consumer_stopping_early_stops_the_threads():
+    before = threading.active_count()
+    pipeline = StagePipeline([Stage("identity", lambda item: item, workers=2)])
+    items = pipeline.run(iter(range(10 ** 9)))
+    for item in items:
+        if item == 10:
+            break
+    items.close()
+    assert threading.active_count() <= before
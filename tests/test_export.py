@@ -0,0 +1,70 @@
+import json
+import os
+import numpy as np
+import pytest
+from analytics import TrackExporter, load_export, load_track_table, player_summaries, team_summaries
+from trackers import TrackTable
+
+def make_table(num_frames=40, start=0):
+    tracks = {"players": [], "referees": [], "ball": []}
+    for frame_num in range(start, start + num_frames):
+        tracks["players"].append({
+            track_id: {"bbox": [10.0 * track_id, 20.0, 10.0 * track_id + 8, 40.0], "team": 1 + track_id % 2,
+                       "position_transformed": np.array([frame_num * 0.5, track_id], dtype=np.float32),
+                       "speed": float(20 + track_id * (frame_num % 7)), "distance": frame_num * 0.5 * track_id,
+                       "has_ball": frame_num % 4 == track_id % 4}
+            for track_id in (1, 2, 3)
+        })
+        tracks["referees"].append({9: {"bbox": [0.0, 0.0, 5.0, 5.0]}})
+        tracks["ball"].append({1: {"bbox": [1.0, 1.0, 2.0, 2.0]}} if frame_num % 3 else {})
+    return TrackTable.from_tracks(tracks)
+
+def test_player_summaries_match_a_loop():
+    columns = make_table().to_columns()
+    summaries = player_summaries(columns, frame_rate=20, sprint_speed=30.0, min_sprint_frames=2)
+    assert summaries["track_id"].tolist() == [1, 2, 3]
+    for index, track_id in enumerate([1, 2, 3]):
+        rows = (columns["cls"] == 0) & (columns["track_id"] == track_id)
+        speed = columns["speed"][rows]
+        assert summaries["frames"][index] == rows.sum()
+        assert summaries["team"][index] == 1 + track_id % 2
+        assert summaries["distance_m"][index] == pytest.approx(columns["distance"][rows].max())
+        assert summaries["top_speed_kmh"][index] == pytest.approx(speed.max())
+        assert summaries["mean_speed_kmh"][index] == pytest.approx(speed.mean())
+        assert summaries["possession_s"][index] == pytest.approx(columns["has_ball"][rows].sum() / 20)
+        fast = np.r_[speed >= 30.0, False]
+        run_starts = np.flatnonzero(fast & ~np.r_[False, fast[:-1]])
+        run_lengths = np.array([np.argmin(fast[start:]) for start in run_starts])
+        assert summaries["sprints"][index] == (run_lengths >= 2).sum()
+
+def test_team_summaries():
+    summary = team_summaries([0, 1, 1, 2, 1, 2, 2, 2], frame_rate=2)
+    assert summary["control_frames"].tolist() == [3, 4]
+    assert summary["control_s"].tolist() == [1.5, 2.0]
+    assert summary["control_percent"].tolist() == pytest.approx([300 / 7, 400 / 7])
+
+def test_export_roundtrip(tmp_path):
+    first, second = make_table(40), make_table(25, start=40)
+    control = np.random.default_rng(0).integers(1, 3, 65)
+    with TrackExporter(str(tmp_path), frame_rate=20, chunk_frames=16) as exporter:
+        exporter.write_table(first, 0, control[:40], np.zeros((40, 2)))
+        exporter.write_tracks(second.to_tracks(), 40, control[40:], np.ones((25, 2)))
+
+    with open(os.path.join(str(tmp_path), "manifest.json")) as f:
+        manifest = json.load(f)
+    assert manifest["num_frames"] == 65 and manifest["num_chunks"] == 5
+    tracks, _ = load_export(str(tmp_path))
+    assert len(tracks["frame"]) == len(first) + len(second)
+    frames, _ = load_export(str(tmp_path), 'frames')
+    assert frames["frame"].tolist() == list(range(65)) and frames["team_ball_control"].tolist() == control.tolist()
+
+    table, per_frame, _ = load_track_table(str(tmp_path), 30, 50)
+    assert table.num_frames == 20 and per_frame["frame"].tolist() == list(range(30, 50))
+    expected = make_table(20, start=30)
+    for name in ("track_id", "cls", "bbox", "position_transformed", "team", "speed", "distance", "has_ball"):
+        np.testing.assert_array_equal(getattr(table, name), getattr(expected, name))
+
+    with np.load(os.path.join(str(tmp_path), "player_summary.npz")) as player_summary:
+        assert player_summary["frames"].tolist() == [65, 65, 65]
+    with np.load(os.path.join(str(tmp_path), "team_summary.npz")) as team_summary:
+        assert team_summary["control_frames"].tolist() == [(control == 1).sum(), (control == 2).sum()]
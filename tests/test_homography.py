@@ -0,0 +1,72 @@
+import numpy as np
+import cv2
+import pytest
+from view import ShotHomography, ViewTransformer, PITCH_KEYPOINTS, pitch_line_points, apply_homography
+from camera_movement import CameraMovementEstimator
+from trackers import TrackTable
+
+# A camera looking at the left 60 m of the pitch
+PITCH_TO_PIXELS = cv2.getPerspectiveTransform(np.float32([[0, 0], [60, 0], [60, 68], [0, 68]]),
+                                              np.float32([[300, 200], [1700, 200], [1900, 1000], [100, 1000]]))
+PIXELS_TO_PITCH = np.linalg.inv(PITCH_TO_PIXELS)
+PLAYERS = np.array([[10.0, 10.0], [30.0, 50.0], [55.0, 34.0]])  # Pitch positions in meters
+
+def render(shift=(0, 0), grass=(40, 150, 40)):
+    # The pitch markings seen by the camera after it panned by `shift` pixels
+    frame = np.full((1080, 1920, 3), grass, dtype=np.uint8)
+    for x, y in apply_homography(PITCH_TO_PIXELS, pitch_line_points(0.2)) - np.asarray(shift):
+        if 0 <= x < 1920 and 0 <= y < 1080:
+            cv2.circle(frame, (int(x), int(y)), 2, (255, 255, 255), -1)
+    return frame
+
+def keypoint_detector(frame):
+    # Every keypoint of the first frame's view
+    pixels = apply_homography(PITCH_TO_PIXELS, PITCH_KEYPOINTS)
+    visible = (pixels[:, 0] >= 0) & (pixels[:, 0] < 1920) & (pixels[:, 1] >= 0) & (pixels[:, 1] < 1080)
+    return pixels[visible].astype(np.float32), PITCH_KEYPOINTS[visible]
+
+def test_homography_follows_the_camera_between_keyframes():
+    shifts = np.array([[0, 0], [12, 0], [20, 5], [26, 9]])
+    homography = ShotHomography(keypoint_detector, refine_lines=False)
+    homography.update([render(shift) for shift in shifts], np.diff(shifts, axis=0, prepend=0))
+    assert homography.summary()["keyframes"] == 1
+    for frame_num, shift in enumerate(shifts):
+        pixels = apply_homography(PITCH_TO_PIXELS, PLAYERS) - shift
+        np.testing.assert_allclose(homography.transform_points(pixels, [frame_num] * len(pixels)), PLAYERS, atol=1e-3)
+
+def test_lines_refine_an_estimate():
+    initial = PIXELS_TO_PITCH @ np.array([[1, 0, 15], [0, 1, -10], [0, 0, 1.0]])  # 15 and 10 pixels off
+    homography = ShotHomography(initial_homography=initial)
+    homography.update([render()], [[0, 0]])
+    assert homography.summary()["sources"] == {"motion+lines": 1}
+    pixels = apply_homography(PITCH_TO_PIXELS, PLAYERS)
+    error = np.abs(homography.transform_points(pixels, [0, 0, 0]) - PLAYERS).max()
+    assert error < 0.2 < np.abs(apply_homography(initial, pixels) - PLAYERS).max()
+
+def test_scene_cuts_start_new_shots():
+    frames = [render()] * 3 + [render(grass=(120, 40, 160))] * 3 + [render()] * 2  # A replay in other colors, then back
+    homography = ShotHomography(keypoint_detector, refine_lines=False)
+    homography.update(frames[:4], np.zeros((4, 2)))
+    homography.update(frames[4:], np.zeros((4, 2)))  # Streamed windows continue the clip
+    assert homography.summary()["shots"] == 3 and homography.num_frames == 8
+    assert homography.anchor_per_frame.tolist() == [0, 0, 0, 1, 1, 1, 2, 2]
+
+def test_fallback_is_the_fixed_quad_on_adjusted_positions():
+    rng = np.random.default_rng(0)
+    tracks = {"players": [{track_id: {"bbox": rng.integers(200, 1500, 4).tolist()} for track_id in range(1, 6)} for _ in range(6)]}
+    camera_movement = rng.normal(0, 8, (6, 2)).tolist()
+    estimator = CameraMovementEstimator(np.zeros((1080, 1920, 3), dtype=np.uint8))
+
+    expected = TrackTable.from_tracks(tracks)
+    expected.position[:] = expected.bbox[:, 2:]
+    estimator.add_adjust_positions_to_table(expected, camera_movement)
+    ViewTransformer().add_transformed_position_to_table(expected)
+
+    table = TrackTable.from_tracks(tracks)
+    table.position[:] = table.bbox[:, 2:]
+    homography = ShotHomography(refine_lines=False)  # Nothing to estimate from
+    homography.update([np.zeros((1080, 1920, 3), dtype=np.uint8)] * 6, camera_movement)
+    homography.add_transformed_position_to_table(table)
+    assert homography.summary()["sources"] == {"default": 1}
+    assert np.isfinite(expected.position_transformed).any()
+    np.testing.assert_array_equal(table.position_transformed, expected.position_transformed)
@@ -0,0 +1,58 @@
+import numpy as np
+from player_ball_assigner import PlayerBallAssigner
+from trackers import TrackTable
+
+def make_tracks(num_frames=60, seed=0):
+    # Four players, two per team, and a ball that is missing now and then
+    rng = np.random.default_rng(seed)
+    tracks = {"players": [], "referees": [], "ball": []}
+    for _ in range(num_frames):
+        players = {}
+        for player_id in rng.permutation([3, 5, 8, 13]).tolist():  # Insertion order varies, like ByteTrack output
+            x, y = rng.integers(0, 400, 2).tolist()  # Whole pixels, so the float32 table holds the same boxes
+            players[player_id] = {"bbox": [x, y, x + 30, y + 80], "team": 1 if player_id < 6 else 2}
+        tracks["players"].append(players)
+        tracks["referees"].append({})
+        x, y = rng.integers(0, 430, 2).tolist()
+        tracks["ball"].append({} if rng.random() < 0.2 else {1: {"bbox": [x, y, x + 8, y + 8]}})
+    return tracks
+
+def per_frame_control(tracks):
+    # The per-frame loop main.py ran before: nearest player within range, else the last team keeps control
+    assigner = PlayerBallAssigner()
+    holders, team_ball_control = [], []
+    for frame_num, player_track in enumerate(tracks["players"]):
+        assigned_player = assigner.assign_ball_to_player(player_track, tracks["ball"][frame_num][1]["bbox"]) if tracks["ball"][frame_num] else -1
+        holders.append(assigned_player)
+        if assigned_player != -1:
+            team_ball_control.append(player_track[assigned_player]["team"])
+        else:
+            team_ball_control.append(team_ball_control[-1] if team_ball_control else 0)
+    return holders, team_ball_control
+
+def test_batch_matches_per_frame_loop():
+    tracks = make_tracks()
+    holders, expected = per_frame_control(tracks)
+    team_ball_control = PlayerBallAssigner().assign_ball_to_tracks(tracks)
+    assert team_ball_control.tolist() == expected
+    for frame_num, player_track in enumerate(tracks["players"]):
+        assert [player_id for player_id, player in player_track.items() if player.get("has_ball")] == ([holders[frame_num]] if holders[frame_num] != -1 else [])
+
+def test_table_matches_tracks():
+    tracks = make_tracks(seed=1)
+    table = TrackTable.from_tracks(tracks)
+    team_ball_control = PlayerBallAssigner().assign_ball_to_table(table)
+    assert team_ball_control.tolist() == PlayerBallAssigner().assign_ball_to_tracks(tracks).tolist()
+    assert table.to_tracks()["players"] == tracks["players"]
+
+def test_windows_match_whole_clip():
+    tracks = make_tracks(seed=2)
+    assigner = PlayerBallAssigner()
+    windows = []
+    for start in range(0, 60, 16):
+        windows.append(assigner.assign_ball_to_tracks({object: object_tracks[start:start + 16] for object, object_tracks in tracks.items()}))
+    assert np.concatenate(windows).tolist() == PlayerBallAssigner().assign_ball_to_tracks(tracks).tolist()
+
+def test_short_possession_runs_are_ignored():
+    assigner = PlayerBallAssigner(min_possession_frames=3)
+    assert assigner.smooth_possession([1, 1, 1, 2, 0, 2, 1, 1, 2, 2, 2, 0]).tolist() == [1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2]
@@ -0,0 +1,48 @@
+import numpy as np
+from pipeline import merge_shards
+from trackers import TrackTable
+
+def walk(track_id, frame_num):
+    x = 100 * track_id + 3 * frame_num
+    return [x, 200, x + 40, 280]
+
+def shard_result(start, first, stop, id_offset, present=lambda track_id, frame_num: True, team_colors=None, teams=None):
+    # What analyze_shard returns for frames [first, stop) when it numbers the tracks 1, 2, 3 + id_offset
+    tracks = {"players": [], "referees": [], "ball": []}
+    for frame_num in range(first, stop):
+        tracks["players"].append({track_id + id_offset: {"bbox": walk(track_id, frame_num), "team": (teams or {}).get(track_id, 0)}
+                                  for track_id in (1, 2, 3) if present(track_id, frame_num)})
+        tracks["referees"].append({})
+        tracks["ball"].append({1: {"bbox": [500, 500, 510, 510]}})
+    columns = TrackTable.from_tracks(tracks).to_columns()
+    columns["frame"] = columns["frame"] + first
+    return {"start": start, "first": first, "columns": columns, "camera_movement": np.full((stop - first, 2), float(start)),
+            "team_colors": team_colors or {}, "computed": set()}
+
+def player_ids(table, frame_num):
+    return sorted(table.as_tracks()["players"][frame_num].keys())
+
+def test_tracks_keep_their_id_across_shards():
+    results = [shard_result(50, 40, 100, 10), shard_result(0, 0, 50, 0)]  # Any order, as the workers finish
+    table, camera_movement = merge_shards(results)
+    assert table.num_frames == 100
+    assert all(player_ids(table, frame_num) == [1, 2, 3] for frame_num in range(100))
+    for frame_num in (49, 50):  # Each frame comes from the shard that owns it
+        assert table.as_tracks()["players"][frame_num][2]["bbox"] == walk(2, frame_num)
+    np.testing.assert_array_equal(camera_movement[:, 0], [0.0] * 50 + [50.0] * 50)
+
+def test_unmatched_tracks_get_new_ids():
+    gone = lambda track_id, frame_num: track_id != 3 or frame_num < 30  # Track 3 ends before the overlap
+    late = lambda track_id, frame_num: track_id != 3 or frame_num >= 70
+    table, _ = merge_shards([shard_result(0, 0, 50, 0, gone), shard_result(50, 40, 100, 10, late)])
+    assert player_ids(table, 20) == [1, 2, 3]
+    assert player_ids(table, 60) == [1, 2]
+    assert player_ids(table, 80) == [1, 2, 4]  # Never seen in the overlap: a new player
+
+def test_swapped_team_ids_are_aligned():
+    red, blue = np.array([0.0, 0.0, 220.0]), np.array([220.0, 0.0, 0.0])
+    first = shard_result(0, 0, 50, 0, team_colors={1: red, 2: blue}, teams={1: 1, 2: 1, 3: 2})
+    second = shard_result(50, 40, 100, 10, team_colors={1: blue, 2: red}, teams={1: 2, 2: 2, 3: 1})
+    table, _ = merge_shards([first, second])
+    teams = {track_id: player["team"] for track_id, player in table.to_tracks()["players"][80].items()}
+    assert teams == {1: 1, 2: 1, 3: 2}
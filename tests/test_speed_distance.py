@@ -0,0 +1,72 @@
+import copy
+import numpy as np
+import pytest
+from speed_distance import SpeedAndDistance_Estimator
+from trackers import TrackTable
+
+def make_tracks(num_frames=80, seed=0):
+    # Players walking with detection jitter, some leaving the view for a while or stepping off the pitch
+    rng = np.random.default_rng(seed)
+    tracks = {"players": [{} for _ in range(num_frames)], "referees": [{} for _ in range(num_frames)], "ball": [{} for _ in range(num_frames)]}
+    for track_id in range(1, 9):
+        position = rng.uniform(0, 60, 2)
+        velocity = rng.uniform(-0.3, 0.3, 2)
+        absent = set(rng.choice(num_frames, rng.integers(0, 25), replace=False).tolist())
+        if track_id == 1:
+            absent |= set(range(30, 45))  # A gap longer than the frame window
+        for frame_num in range(num_frames):
+            position = position + velocity + rng.normal(0, 0.05, 2)
+            if frame_num in absent:
+                continue
+            off_pitch = rng.random() < 0.05
+            transformed = None if off_pitch else np.round(position, 2).astype(np.float32)
+            tracks["players"][frame_num][track_id] = {"bbox": [0, 0, 10, 10], "position_transformed": transformed}
+    return tracks
+
+def speeds_and_distances(tracks):
+    return [{track_id: (track.get("speed"), track.get("distance")) for track_id, track in frame.items()} for frame in tracks["players"]]
+
+@pytest.mark.parametrize("smoothing_window", [1, 3])
+def test_table_matches_dicts(smoothing_window):
+    tracks = make_tracks()
+    table = TrackTable.from_tracks(tracks)
+    table.computed.add(("position_transformed", 0))
+    SpeedAndDistance_Estimator(smoothing_window=smoothing_window).add_speed_and_distance_to_table(table)
+    SpeedAndDistance_Estimator(smoothing_window=smoothing_window).add_speed_and_distance_to_tracks(tracks)
+    expected = speeds_and_distances(tracks)
+    for frame, expected_frame in zip(speeds_and_distances(table.to_tracks()), expected):
+        assert frame.keys() == expected_frame.keys()
+        for track_id, (speed, distance) in frame.items():
+            expected_speed, expected_distance = expected_frame[track_id]
+            assert (speed is None) == (expected_speed is None)
+            if speed is not None:
+                assert speed == pytest.approx(expected_speed, rel=1e-5, abs=1e-3)
+            if distance is not None:
+                assert distance == pytest.approx(expected_distance, rel=1e-5, abs=1e-3)
+
+def test_windows_match_whole_clip():
+    tracks = make_tracks(seed=1)
+    windowed = copy.deepcopy(tracks)
+    SpeedAndDistance_Estimator().add_speed_and_distance_to_tracks(tracks)
+    estimator = SpeedAndDistance_Estimator()
+    for start in range(0, 80, 25):
+        estimator.add_speed_and_distance_to_window({object: object_tracks[start:start + 25] for object, object_tracks in windowed.items()}, start_frame=start)
+    assert speeds_and_distances(windowed) == speeds_and_distances(tracks)
+
+def test_jump_after_a_gap_is_not_distance():
+    estimator = SpeedAndDistance_Estimator()
+    tracks = {"players": [{} for _ in range(30)]}
+    for frame_num in list(range(10)) + list(range(20, 30)):
+        x = frame_num if frame_num < 10 else 50.0 + frame_num  # Reappears 10 frames later, 40 m further on
+        tracks["players"][frame_num][7] = {"bbox": [0, 0, 1, 1], "position_transformed": np.array([x, 0.0], dtype=np.float32)}
+    estimator.add_speed_and_distance_to_tracks(tracks)
+    players = tracks["players"]
+    assert players[9][7]["distance"] == pytest.approx(9.0)
+    assert "speed" not in players[20][7] and players[20][7]["distance"] == pytest.approx(9.0)
+    assert players[29][7]["distance"] == pytest.approx(18.0)
+    assert players[29][7]["speed"] == pytest.approx(1.0 * estimator.frame_rate * 3.6)
+
+    table = TrackTable.from_tracks({"players": [{track_id: {"bbox": track["bbox"]} for track_id, track in frame.items()} for frame in players]})
+    table.position_transformed[:] = [frame[7]["position_transformed"] for frame in players if frame]
+    estimator.add_speed_and_distance_to_table(table)
+    assert table.distance.tolist() == pytest.approx([players[frame_num][7]["distance"] for frame_num in range(30) if players[frame_num]])
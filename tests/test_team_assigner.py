@@ -0,0 +1,55 @@
+import numpy as np
+from team_assigner import TeamAssigner
+from trackers import TrackTable
+
+SHIRTS = {1: (0, 0, 220), 2: (0, 0, 220), 3: (220, 0, 0), 4: (220, 0, 0)}  # BGR: players 1 and 2 red, 3 and 4 blue
+
+def player_bbox(player_id):
+    x = 100 * player_id
+    return [x, 100, x + 40, 200]
+
+def make_frame(shirts):
+    frame = np.full((300, 600, 3), (40, 160, 40), dtype=np.uint8)  # Grass
+    for player_id, color in shirts.items():
+        x1, y1, x2, y2 = player_bbox(player_id)
+        frame[y1 + 10:y1 + 50, x1 + 8:x2 - 8] = color  # Shirt, with grass around it in the top half of the box
+        frame[y1 + 50:y2, x1 + 8:x2 - 8] = (30, 30, 30)
+    return frame
+
+def make_tracks(num_frames):
+    return {"players": [{player_id: {"bbox": player_bbox(player_id)} for player_id in SHIRTS} for _ in range(num_frames)],
+            "referees": [{} for _ in range(num_frames)], "ball": [{} for _ in range(num_frames)]}
+
+def teams_of(player_track):
+    return {player_id: track["team"] for player_id, track in player_track.items()}
+
+def test_players_are_split_by_shirt_color():
+    tracks = make_tracks(3)
+    TeamAssigner().assign_teams_to_tracks([make_frame(SHIRTS)] * 3, tracks["players"])
+    teams = teams_of(tracks["players"][0])
+    assert teams[1] == teams[2] != teams[3] == teams[4]
+    assert all(teams_of(player_track) == teams for player_track in tracks["players"])
+
+def test_table_matches_tracks():
+    frames = [make_frame(SHIRTS)] * 4
+    tracks = make_tracks(4)
+    TeamAssigner().assign_teams_to_tracks(frames, tracks["players"])
+    table = TrackTable.from_tracks(make_tracks(4))
+    TeamAssigner().assign_teams_to_table(frames, table)
+    table_teams = teams_of(table.to_tracks()["players"][0])
+    track_teams = teams_of(tracks["players"][0])
+    swapped = table_teams[1] != track_teams[1]  # Both runs fit their own k-means; team ids may be swapped
+    assert table_teams == {player_id: 3 - team if swapped else team for player_id, team in track_teams.items()}
+
+def test_track_moving_to_the_other_team_is_reassigned():
+    team_assigner = TeamAssigner()
+    num_frames = team_assigner.revalidate_every * (team_assigner.votes_to_switch + 2)
+    switch = team_assigner.revalidate_every
+    frames = [make_frame(SHIRTS if frame_num < switch else {**SHIRTS, 1: SHIRTS[3]}) for frame_num in range(num_frames)]
+    tracks = make_tracks(num_frames)
+    team_assigner.assign_teams_to_tracks(frames, tracks["players"])
+
+    first, last = teams_of(tracks["players"][0]), teams_of(tracks["players"][-1])
+    assert first[1] == first[2] and last[1] == last[3]  # Player 1's id now follows a blue shirt
+    assert len(team_assigner.player_team_history[1]) == 2
+    assert teams_of(tracks["players"][switch])[1] == first[1]  # One disagreeing check is not enough
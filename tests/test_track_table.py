@@ -0,0 +1,51 @@
+import numpy as np
+from trackers import TrackTable
+
+def make_tracks(num_frames=6):
+    rng = np.random.default_rng(0)
+    tracks = {"players": [], "referees": [], "ball": []}
+    for frame_num in range(num_frames):
+        tracks["players"].append({track_id: {"bbox": rng.uniform(0, 500, 4).astype(np.float32).tolist()} for track_id in (1, 4, 7) if (frame_num + track_id) % 5})
+        tracks["referees"].append({2: {"bbox": rng.uniform(0, 500, 4).astype(np.float32).tolist()}})
+        tracks["ball"].append({1: {"bbox": rng.uniform(0, 500, 4).astype(np.float32).tolist()}} if frame_num % 2 else {})
+    return tracks
+
+def test_tracks_roundtrip():
+    tracks = make_tracks()
+    tracks["players"][3][4]["speed"] = 12.5
+    tracks["players"][3][4]["has_ball"] = True
+    table = TrackTable.from_tracks(tracks)
+    assert len(table) == sum(len(track) for object_tracks in tracks.values() for track in object_tracks)
+    assert table.to_tracks() == tracks
+
+def test_view_matches_dicts():
+    tracks = make_tracks()
+    view = TrackTable.from_tracks(tracks).as_tracks()
+    for object, object_tracks in tracks.items():
+        assert len(view[object]) == len(object_tracks)
+        for frame_num, track in enumerate(object_tracks):
+            assert sorted(view[object][frame_num].keys()) == sorted(track.keys())
+            for track_id, track_info in track.items():
+                assert view[object][frame_num][track_id]["bbox"] == track_info["bbox"]
+
+def test_view_writes_to_columns():
+    table = TrackTable.from_tracks(make_tracks())
+    view = table.as_tracks()
+    view["players"][2][1]["team"] = 2
+    row = table.frame_rows(2, "players").start
+    assert table.track_id[row] == 1 and table.team[row] == 2
+
+def test_columns_roundtrip():
+    table = TrackTable.from_tracks(make_tracks())
+    columns = table.to_columns()
+    order = np.random.default_rng(1).permutation(len(table))  # Any row order, e.g. concatenated shards
+    restored = TrackTable.from_columns({name: column[order] for name, column in columns.items()}, table.num_frames)
+    assert restored.to_tracks() == table.to_tracks()
+
+def test_empty_frames_are_kept():
+    tracks = make_tracks(3)
+    for object_tracks in tracks.values():
+        object_tracks.append({})
+    table = TrackTable.from_tracks(tracks)
+    assert table.num_frames == 4
+    assert table.to_tracks() == tracks
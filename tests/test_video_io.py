@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from tools import VideoReader, probe_video, save_video, read_video, read_video_chunks
+
+@pytest.fixture
+def video_path(tmp_path):
+    # 30 small frames at 12 fps whose brightness is 8 times the frame number plus 4, so decoded frames can be identified
+    path = str(tmp_path / 'clip.avi')
+    save_video([np.full((64, 96, 3), 8 * frame_num + 4, dtype=np.uint8) for frame_num in range(30)], path, fps=12)
+    return path
+
+def frame_numbers(frames):
+    return [int(frame.mean() // 8) for frame in frames]
+
+def test_probe(video_path):
+    info = probe_video(video_path)
+    assert info["fps"] == 12 and info["num_frames"] == 30
+    assert (info["width"], info["height"]) == (96, 64)
+
+def test_frame_range(video_path):
+    reader = VideoReader(video_path, start_frame=7, stop_frame=19)
+    assert len(reader) == 12
+    assert frame_numbers(reader) == list(range(7, 19))
+    assert frame_numbers(read_video(video_path, stop_frame=4)) == [0, 1, 2, 3]
+
+def test_time_range(video_path):
+    reader = VideoReader(video_path, start_time=0.5, end_time=1.5)
+    assert (reader.start_frame, reader.stop_frame) == (6, 18)
+    assert frame_numbers(reader) == list(range(6, 18))
+
+def test_seeked_chunks_match_full_decode(video_path):
+    frames = read_video(video_path)
+    chunks = list(read_video_chunks(video_path, 8, start_frame=10))
+    assert [len(chunk) for chunk in chunks] == [8, 8, 4]
+    assert all(np.array_equal(frame, expected) for frame, expected in zip([frame for chunk in chunks for frame in chunk], frames[10:]))
+
+def test_scale(video_path):
+    frame = next(iter(VideoReader(video_path, scale=0.5)))
+    assert frame.shape == (32, 48, 3)
+
+def test_reader_is_iterated_once(video_path):
+    reader = VideoReader(video_path)
+    for _ in reader:
+        break  # Stopping early closes the reader and its decode thread
+    assert reader._stop.is_set()
+    with pytest.raises(RuntimeError):
+        next(iter(reader))
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from tools import save_video, read_video, read_video_chunks
+
+@pytest.fixture
+def video_path(tmp_path):
+    # 20 small frames whose brightness is 10 times the frame number plus 5, so decoded frames can be identified
+    path = str(tmp_path / 'clip.avi')
+    save_video([np.full((64, 96, 3), 10 * frame_num + 5, dtype=np.uint8) for frame_num in range(20)], path)
+    return path
+
+def frame_numbers(frames):
+    return [int(frame.mean() // 10) for frame in frames]
+
+def test_read_video(video_path):
+    frames = read_video(video_path)
+    assert frame_numbers(frames) == list(range(20))
+    assert frames[0].shape == (64, 96, 3)
+
+@pytest.mark.parametrize("chunk_size", [1, 6, 20, 32])
+def test_chunks_cover_the_clip_once(video_path, chunk_size):
+    chunks = list(read_video_chunks(video_path, chunk_size))
+    assert [len(chunk) for chunk in chunks[:-1]] == [chunk_size] * (len(chunks) - 1)
+    assert 0 < len(chunks[-1]) <= chunk_size
+    frames = [frame for chunk in chunks for frame in chunk]
+    assert all(np.array_equal(frame, expected) for frame, expected in zip(frames, read_video(video_path)))
+    assert frame_numbers(frames) == list(range(20))
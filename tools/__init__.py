@@ -1,2 +1,7 @@
-from .bbox_tools import get_center_of_bbox, measure_distance, measure_xy_distance, get_foot_position, get_bbox_width
-from .video_tools import save_video, read_video
\ No newline at end of file
+from .bbox_tools import get_center_of_bbox, measure_distance, measure_xy_distance, get_foot_position, get_bbox_width, get_centers_of_bboxes, get_foot_positions
+from .video_tools import save_video, read_video, read_video_frames, read_video_chunks, count_video_frames, get_video_fps
+from .video_io import VideoReader, VideoWriter, probe_video, VIDEO_BACKENDS
+from .frame_store import FrameStore
+from .analysis_cache import AnalysisCache
+from .track_metrics import box_iou, match_boxes, compare_tracks
+from .profiling import Profiler, profile_stage, profiled
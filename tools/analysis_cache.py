@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+
+class AnalysisCache:
+    # Content-addressed cache for expensive stage outputs (detections, tracks, camera movement).
+    # An entry is keyed by a hash of everything that can change its result: the video bytes, the model
+    # weights and the stage parameters. Entries are stored as one compressed .npz file per chunk of frames,
+    # so a run can reuse the chunks that exist and compute only the missing ones. Least recently used
+    # entries are evicted once the cache grows past max_bytes.
+    def __init__(self, root='stubs/cache', max_bytes=5 * 1024 ** 3, chunk_size=250):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        os.makedirs(root, exist_ok=True)
+        self._digest_index_path = os.path.join(root, 'file_digests.json')
+
+    def file_digest(self, path):
+        # Hash of the file content; remembered per (path, size, mtime) so large videos are hashed only once
+        stat = os.stat(path)
+        index_key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        index = self._read_json(self._digest_index_path) or {}
+        if index_key in index:
+            return index[index_key]
+
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(8 * 1024 ** 2), b''):
+                digest.update(block)
+        index[index_key] = digest.hexdigest()
+        self._write_json(self._digest_index_path, index)
+        return index[index_key]
+
+    def array_digest(self, array):
+        return hashlib.blake2b(np.ascontiguousarray(array).tobytes(), digest_size=16).hexdigest()
+
+    def key(self, stage, **params):
+        # Parameters must be JSON serialisable; nested keys of earlier stages can be passed as plain strings
+        payload = json.dumps({"stage": stage, "chunk_size": self.chunk_size, **params}, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def _entry_dir(self, stage, key):
+        return os.path.join(self.root, stage, key)
+
+    def _chunk_path(self, stage, key, index):
+        return os.path.join(self._entry_dir(stage, key), f"chunk_{index:06d}.npz")
+
+    def load_chunk(self, stage, key, index):
+        path = self._chunk_path(stage, key, index)
+        if not os.path.exists(path):
+            return None
+        self._touch(stage, key)
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+
+    def save_chunk(self, stage, key, index, **arrays):
+        os.makedirs(self._entry_dir(stage, key), exist_ok=True)
+        path = self._chunk_path(stage, key, index)
+        temporary_path = path + '.tmp.npz'
+        np.savez_compressed(temporary_path, **arrays)
+        os.replace(temporary_path, path)  # Never leave a half-written chunk behind
+        self._touch(stage, key)
+
+    def mark_complete(self, stage, key, num_chunks, num_frames):
+        self._write_json(os.path.join(self._entry_dir(stage, key), 'complete.json'), {"num_chunks": num_chunks, "num_frames": num_frames})
+        self.evict()
+
+    def completed(self, stage, key):
+        # {"num_chunks": .., "num_frames": ..} when every chunk of the entry has been stored, else None
+        return self._read_json(os.path.join(self._entry_dir(stage, key), 'complete.json'))
+
+    def chunk_ranges(self, num_frames):
+        return [(start, min(start + self.chunk_size, num_frames)) for start in range(0, num_frames, self.chunk_size)]
+
+    def _touch(self, stage, key):
+        with open(os.path.join(self._entry_dir(stage, key), 'last_used'), 'w') as f:
+            f.write(str(time.time()))  # The file's mtime is the entry's LRU timestamp
+
+    def entries(self):
+        # (last used, size in bytes, directory) of every entry
+        entries = []
+        for stage in os.listdir(self.root):
+            stage_dir = os.path.join(self.root, stage)
+            if not os.path.isdir(stage_dir):
+                continue
+            for key in os.listdir(stage_dir):
+                entry_dir = os.path.join(stage_dir, key)
+                last_used_path = os.path.join(entry_dir, 'last_used')
+                last_used = os.path.getmtime(last_used_path) if os.path.exists(last_used_path) else 0
+                size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+                entries.append((last_used, size, entry_dir))
+        return entries
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in entries[:-1]:  # Never evict the most recently used entry
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+    def _read_json(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_json(self, path, data):
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(temporary_path, path)
@@ -1,3 +1,5 @@
+import numpy as np
+
 def get_center_of_bbox(bbox):
     x1, y1, x2, y2 = bbox  # Unpack the bounding box coordinates
     return int((x1 + x2) / 2), int((y1 + y2) / 2)  # Calculate and return the center point of the bounding box
@@ -13,4 +15,14 @@ def measure_xy_distance(p1, p2):
 
 def get_foot_position(bbox):
     x1, y1, x2, y2 = bbox  # Unpack the bounding box coordinates
-    return int((x1 + x2) / 2), int(y2)  # Calculate and return the foot position (center of the bottom edge) of the bounding box
\ No newline at end of file
+    return int((x1 + x2) / 2), int(y2)  # Calculate and return the foot position (center of the bottom edge) of the bounding box
+
+def get_centers_of_bboxes(bboxes):
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)  # (N, 4) x1, y1, x2, y2; float64 like the scalar helpers
+    centers = np.stack([(bboxes[:, 0] + bboxes[:, 2]) / 2, (bboxes[:, 1] + bboxes[:, 3]) / 2], axis=1)
+    return np.trunc(centers)  # Truncate like int() in get_center_of_bbox
+
+def get_foot_positions(bboxes):
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)  # (N, 4) x1, y1, x2, y2; float64 like the scalar helpers
+    feet = np.stack([(bboxes[:, 0] + bboxes[:, 2]) / 2, bboxes[:, 3]], axis=1)
+    return np.trunc(feet)  # Truncate like int() in get_foot_position
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import weakref
+import numpy as np
+from .video_io import VideoReader
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class FrameStore():
+    # Decodes a video once into a raw frame file on local disk and maps it back as one (frames, height, width, 3)
+    # array, so stages that need the frames again (team colors, camera movement, rendering) read them from the
+    # page cache instead of keeping the clip in RAM or decoding it twice. Indexing returns NumPy views into the
+    # mapping, without copies. The mapping is read-only, so its pages can always be dropped from RAM again:
+    # whoever draws on a frame copies it first (a copy-on-write mapping would keep every page drawn on as a
+    # private copy until the file is unmapped). The file is deleted by close(), when the store is garbage
+    # collected or when the interpreter exits, whichever comes first
+    def __init__(self, video_path, directory=None, start_frame=0, stop_frame=None, scale=1.0):
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        reader = VideoReader(video_path, start_frame, stop_frame, scale=scale)
+        self.fps = reader.fps
+        descriptor, self.path = tempfile.mkstemp(prefix='frames_', suffix='.raw', dir=directory)
+        self._finalizer = weakref.finalize(self, _remove_file, self.path)
+
+        shape, num_frames = (0, 0, 3), 0
+        with os.fdopen(descriptor, 'wb') as f:
+            for frame in reader:
+                shape = frame.shape
+                f.write(np.ascontiguousarray(frame).data)  # Decoded frames are contiguous already
+                num_frames += 1
+
+        if num_frames:
+            self.frames = np.memmap(self.path, dtype=np.uint8, mode='r', shape=(num_frames,) + shape)
+        else:
+            self.frames = np.zeros((0,) + shape, dtype=np.uint8)  # An empty file cannot be mapped
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        return self.frames[index]  # A view for integer indexes and slices
+
+    def __iter__(self):
+        return iter(self.frames)
+
+    @property
+    def nbytes(self):
+        return self.frames.nbytes
+
+    def close(self):
+        # Views handed out stay valid; the file is unlinked and its disk space freed once they are gone
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,173 @@
+import functools
+import json
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+_active = None  # Profiler receiving the measurements of profile_stage, None when profiling is off
+
+class _NullStage():
+    # Returned while profiling is off: entering and leaving it does nothing
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+def profile_stage(name, frames=0):
+    # Context manager timing one run of a stage over `frames` frames. Costs a global lookup when profiling is off
+    if _active is None:
+        return _NULL_STAGE
+    return _active.stage(name, frames)
+
+def profiled(name):
+    # Decorator form of profile_stage; the frame count is the length of the first argument when it has one
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(self, *args, **kwargs):
+            if _active is None:
+                return function(self, *args, **kwargs)
+            frames = len(args[0]) if args and hasattr(args[0], '__len__') else 0
+            with _active.stage(name, frames):
+                return function(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports KiB, macOS bytes
+
+class _Stage():
+    def __init__(self, profiler, name, frames):
+        self.profiler = profiler
+        self.name = name
+        self.frames = frames
+
+    def __enter__(self):
+        # The tracemalloc peak is process-wide: resetting it from a per-frame thread stage (decode, encode) would
+        # wipe the peak of whatever runs at the same time, so only outermost main-thread stages touch it
+        self.main_thread = threading.current_thread() is threading.main_thread()
+        self.outermost = self.main_thread and self.profiler._main_depth == 0
+        if self.main_thread:
+            self.profiler._main_depth += 1
+        self.clock = time.process_time if self.main_thread else time.thread_time
+        if self.outermost and self.profiler.trace_allocations:
+            tracemalloc.reset_peak()
+            self.traced = tracemalloc.get_traced_memory()[0]
+        self.blocks = sys.getallocatedblocks()
+        self.cpu = self.clock()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall
+        cpu = self.clock() - self.cpu
+        traced_peak = None  # Not measured
+        if self.outermost and self.profiler.trace_allocations:
+            traced_peak = tracemalloc.get_traced_memory()[1] - self.traced  # Bytes above the start of the stage
+        if self.main_thread:
+            self.profiler._main_depth -= 1
+        self.profiler.record(self.name, self.frames, wall, cpu, sys.getallocatedblocks() - self.blocks, traced_peak,
+                             'process' if self.main_thread else 'thread')
+        return False
+
+class Profiler():
+    # Per-stage wall time, CPU time, frames/s, peak RSS and allocations (net Python memory blocks, and with
+    # trace_allocations the traced peak in bytes). cpu_clock says what a stage's CPU time covers: 'process' for
+    # stages on the main thread (their worker threads count, but so do the decode and encode threads running
+    # meanwhile), 'thread' for stages on other threads (only that thread). The traced peak is only measured for
+    # outermost stages on the main thread and is None for the others. Measurements come from profile_stage calls
+    # in the stages while the profiler is active (inside `with Profiler():`). Nested stages are measured in both.
+    # With enabled=False nothing is activated and the stages cost nothing
+    def __init__(self, enabled=True, trace_allocations=False):
+        self.enabled = enabled
+        self.trace_allocations = trace_allocations
+        self.stages = {}  # Stage name -> totals, in the order the stages first ran
+        self.wall = 0.0
+        self._lock = threading.Lock()  # Stages may finish on worker threads
+        self._main_depth = 0  # Main-thread stages currently open
+        self._previous = None
+
+    def stage(self, name, frames=0):
+        return _Stage(self, name, frames)
+
+    def record(self, name, frames, wall, cpu, blocks, traced_peak=None, cpu_clock='process'):
+        with self._lock:
+            stats = self.stages.setdefault(name, {"calls": 0, "frames": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "cpu_clock": cpu_clock,
+                                                  "allocated_blocks": 0, "peak_traced_bytes": None, "peak_rss_bytes": 0})
+            stats["calls"] += 1
+            stats["frames"] += frames
+            stats["wall_seconds"] += wall
+            stats["cpu_seconds"] += cpu
+            if stats["cpu_clock"] != cpu_clock:
+                stats["cpu_clock"] = 'mixed'  # The stage ran on the main thread and on other threads
+            stats["allocated_blocks"] += blocks
+            if traced_peak is not None:
+                stats["peak_traced_bytes"] = max(stats["peak_traced_bytes"] or 0, traced_peak)
+            stats["peak_rss_bytes"] = peak_rss_bytes()  # Process peak so far, as of the end of this stage
+
+    def __enter__(self):
+        global _active
+        if self.enabled:
+            if self.trace_allocations:
+                tracemalloc.start()
+            self._previous, _active = _active, self
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        if self.enabled:
+            self.wall += time.perf_counter() - self._started
+            _active = self._previous
+            if self.trace_allocations:
+                tracemalloc.stop()
+        return False
+
+    def report(self):
+        stages = {}
+        for name, stats in self.stages.items():
+            stages[name] = dict(stats, frames_per_second=stats["frames"] / stats["wall_seconds"] if stats["frames"] and stats["wall_seconds"] else None)
+        return {"wall_seconds": self.wall, "peak_rss_bytes": peak_rss_bytes(), "stages": stages}
+
+    def save_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def prometheus_text(self, prefix='soccer_analysis'):
+        # Prometheus text exposition format, for a node_exporter textfile collector or a push gateway
+        report = self.report()
+        metrics = [
+            ("stage_wall_seconds_total", "counter", "Wall time spent in the stage", "wall_seconds"),
+            ("stage_cpu_seconds_total", "counter", "CPU time in the stage (see cpu_clock in the JSON report)", "cpu_seconds"),
+            ("stage_frames_total", "counter", "Frames processed by the stage", "frames"),
+            ("stage_calls_total", "counter", "Times the stage ran", "calls"),
+            ("stage_allocated_blocks", "gauge", "Net Python memory blocks allocated by the stage", "allocated_blocks"),
+            ("stage_frames_per_second", "gauge", "Frames per second of wall time", "frames_per_second"),
+        ]
+        lines = []
+        for metric, kind, description, key in metrics:
+            lines += [f"# HELP {prefix}_{metric} {description}", f"# TYPE {prefix}_{metric} {kind}"]
+            for name, stats in report["stages"].items():
+                if stats[key] is not None:
+                    lines.append(f'{prefix}_{metric}{{stage="{name}"}} {stats[key]}')
+        lines += [f"# HELP {prefix}_peak_rss_bytes Peak resident set size of the process",
+                  f"# TYPE {prefix}_peak_rss_bytes gauge", f"{prefix}_peak_rss_bytes {report['peak_rss_bytes']}"]
+        return "\n".join(lines) + "\n"
+
+    def save_prometheus(self, path):
+        with open(path, 'w') as f:
+            f.write(self.prometheus_text())
+
+    def summary(self):
+        lines = [f"{'stage':<20}{'calls':>7}{'frames':>8}{'wall s':>9}{'cpu s':>9}{'cpu of':>9}{'frames/s':>10}{'blocks':>10}"]
+        for name, stats in self.report()["stages"].items():
+            fps = f"{stats['frames_per_second']:.1f}" if stats['frames_per_second'] is not None else "-"
+            lines.append(f"{name:<20}{stats['calls']:>7}{stats['frames']:>8}{stats['wall_seconds']:>9.2f}"
+                         f"{stats['cpu_seconds']:>9.2f}{stats['cpu_clock']:>9}{fps:>10}{stats['allocated_blocks']:>10}")
+        lines.append(f"total wall {self.wall:.2f} s, peak RSS {peak_rss_bytes() / 1024 ** 2:.0f} MiB")
+        return "\n".join(lines)
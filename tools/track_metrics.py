@@ -0,0 +1,49 @@
+import numpy as np
+
+def box_iou(boxes_a, boxes_b):
+    boxes_a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)  # (N, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)  # (M, 4)
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.where(union > 0, union, 1), 0.0)  # (N, M)
+
+def match_boxes(boxes_a, boxes_b, iou_threshold=0.5):
+    # Greedy one-to-one matching by descending IoU; returns (index in a, index in b, iou) triples
+    iou = box_iou(boxes_a, boxes_b)
+    matches = []
+    used_a, used_b = set(), set()
+    for flat_index in np.argsort(-iou, axis=None):
+        a, b = (int(i) for i in np.unravel_index(flat_index, iou.shape))
+        if iou[a, b] < iou_threshold:
+            break
+        if a in used_a or b in used_b:
+            continue
+        matches.append((a, b, float(iou[a, b])))
+        used_a.add(a)
+        used_b.add(b)
+    return matches
+
+def compare_tracks(reference, candidate, iou_threshold=0.5):
+    # Frame-by-frame agreement of two tracks structures (e.g. full detection vs frame skipping),
+    # ignoring track ids: recall and precision of boxes at the IoU threshold, and the mean IoU of matches
+    report = {}
+    for object in reference:
+        matched, reference_count, candidate_count, iou_sum = 0, 0, 0, 0.0
+        for reference_frame, candidate_frame in zip(reference[object], candidate[object]):
+            reference_boxes = [track["bbox"] for track in reference_frame.values()]
+            candidate_boxes = [track["bbox"] for track in candidate_frame.values()]
+            matches = match_boxes(reference_boxes, candidate_boxes, iou_threshold)
+            matched += len(matches)
+            iou_sum += sum(iou for _, _, iou in matches)
+            reference_count += len(reference_boxes)
+            candidate_count += len(candidate_boxes)
+        report[object] = {
+            "recall": matched / reference_count if reference_count else 1.0,
+            "precision": matched / candidate_count if candidate_count else 1.0,
+            "mean_iou": iou_sum / matched if matched else 0.0
+        }
+    return report
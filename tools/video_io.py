@@ -0,0 +1,183 @@
+import queue
+import threading
+import cv2
+from .profiling import profile_stage
+
+class OpenCVBackend():
+    # Decoder backed by cv2.VideoCapture; hardware decoding is requested when OpenCV can use it and
+    # silently falls back to software otherwise
+    def __init__(self, video_path, hw_acceleration=True):
+        params = [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY] if hw_acceleration else []
+        self.cap = cv2.VideoCapture(video_path, cv2.CAP_ANY, params)
+        if not self.cap.isOpened():
+            raise IOError(f"Cannot open video {video_path}")
+
+    def info(self):
+        return {
+            "fps": self.cap.get(cv2.CAP_PROP_FPS) or 24.0,  # Some containers do not store a rate
+            "num_frames": int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)),  # From the container header, may be approximate
+            "width": int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        }
+
+    def seek(self, frame_num):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
+
+    def read(self):
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def release(self):
+        self.cap.release()
+
+VIDEO_BACKENDS = {"opencv": OpenCVBackend}  # Other decoders can be registered with the same four methods
+
+def probe_video(video_path, backend='opencv'):
+    decoder = VIDEO_BACKENDS[backend](video_path, hw_acceleration=False)
+    info = decoder.info()
+    decoder.release()
+    return info
+
+class VideoReader():
+    # Iterates over the frames of [start_frame, stop_frame) (or [start_time, end_time) in seconds) while a
+    # background thread decodes up to `prefetch` frames ahead. scale < 1 downscales every frame right after
+    # decoding, in the decode thread. fps and the frame range are known before the first frame is read
+    def __init__(self, video_path, start_frame=0, stop_frame=None, start_time=None, end_time=None,
+                 scale=1.0, prefetch=8, backend='opencv', hw_acceleration=True):
+        self.video_path = video_path
+        self.decoder = VIDEO_BACKENDS[backend](video_path, hw_acceleration=hw_acceleration)
+        self.info = self.decoder.info()
+        self.fps = self.info["fps"]
+
+        if start_time is not None:
+            start_frame = round(start_time * self.fps)
+        if end_time is not None:
+            stop_frame = round(end_time * self.fps)
+        self.start_frame = start_frame
+        self.stop_frame = stop_frame
+        self.scale = scale
+        self.prefetch = prefetch
+
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def __len__(self):
+        stop = self.info["num_frames"] if self.stop_frame is None else min(self.stop_frame, self.info["num_frames"])
+        return max(stop - self.start_frame, 0)  # From the header, the real count can differ slightly
+
+    def _decode(self):
+        try:
+            if self.start_frame > 0:
+                self.decoder.seek(self.start_frame)
+            frame_num = self.start_frame
+            while not self._stop.is_set() and (self.stop_frame is None or frame_num < self.stop_frame):
+                with profile_stage('decode', 1):
+                    frame = self.decoder.read()
+                    if frame is not None and self.scale != 1.0:
+                        frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+                if frame is None:
+                    break
+                self._put(frame)
+                frame_num += 1
+            self._put(None)  # End of the range
+        except Exception as error:
+            self._put(error)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self):
+        if self._thread is not None:
+            raise RuntimeError("A VideoReader can only be iterated once")
+        self._queue = queue.Queue(maxsize=self.prefetch)
+        self._thread = threading.Thread(target=self._decode, daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.close()
+
+    def chunks(self, chunk_size):
+        chunk = []
+        for frame in self:
+            chunk.append(frame)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.decoder.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class VideoWriter():
+    # Encodes frames on a background thread so callers only pay for handing frames over. The encoder is
+    # opened from the first frame's size; fps should be the source rate (VideoReader.fps)
+    def __init__(self, video_path, fps=24, fourcc='XVID', queue_size=16):
+        self.video_path = video_path
+        self.fps = fps
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.frames_written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._encode, daemon=True)
+        self._thread.start()
+
+    def _encode(self):
+        out = None
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is None:
+                    break
+                with profile_stage('encode', 1):
+                    if out is None:
+                        out = cv2.VideoWriter(self.video_path, self.fourcc, self.fps, (frame.shape[1], frame.shape[0]))
+                    out.write(frame)
+                self.frames_written += 1
+        except Exception as error:
+            self._error = error
+            while self._queue.get() is not None:  # Keep draining so write() and close() never block
+                pass
+        finally:
+            if out is not None:
+                out.release()
+
+    def write(self, frame):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(frame)  # The frame must not be modified after this call
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,25 +1,30 @@
-import cv2  
-def read_video(video_path):
-    cap = cv2.VideoCapture(video_path)  # Create a VideoCapture object to read the video file
-    frames = []  # Initialize an empty list to store video frames
-    while True:
-        ret, frame = cap.read()  # Read a frame from the video
-        if not ret:
-            break  # If no frame is returned, end of video is reached
-        frames.append(frame)  # Add the frame to the list of frames
-    return frames  # Return the list of frames
+from .video_io import VideoReader, VideoWriter, probe_video
 
-def save_video(output_video_frames, output_video_path):
-    fourcc = cv2.VideoWriter_fourcc(*'XVID')  # Define the codec using 'XVID' fourcc code
-    out = cv2.VideoWriter(
-        output_video_path,                  # Output file path
-        fourcc,                             # Codec
-        24,                                 # Frames per second
-        (
-            output_video_frames[0].shape[1],  # Frame width
-            output_video_frames[0].shape[0]   # Frame height
-        )
-    )  # Create a VideoWriter object to write the video
-    for frame in output_video_frames:
-        out.write(frame)  # Write each frame to the output video
-    out.release()  # Release the VideoWriter object
+def read_video_frames(video_path, start_frame=0, stop_frame=None, scale=1.0):
+    # Frames are decoded ahead on a background thread; the reader is closed even if the caller stops iterating early
+    yield from VideoReader(video_path, start_frame, stop_frame, scale=scale)
+
+def read_video_chunks(video_path, chunk_size, start_frame=0, stop_frame=None, scale=1.0):
+    chunk = []  # Frames of the window currently being filled
+    for frame in read_video_frames(video_path, start_frame, stop_frame, scale):
+        chunk.append(frame)
+        if len(chunk) == chunk_size:
+            yield chunk  # Emit a full window of frames
+            chunk = []
+    if chunk:
+        yield chunk  # Emit the last, possibly shorter, window
+
+def count_video_frames(video_path):
+    return probe_video(video_path)["num_frames"]  # From the container header, no decoding
+
+def get_video_fps(video_path):
+    return probe_video(video_path)["fps"]
+
+def read_video(video_path, start_frame=0, stop_frame=None, scale=1.0):
+    return list(read_video_frames(video_path, start_frame, stop_frame, scale))  # Return the list of frames
+
+def save_video(output_video_frames, output_video_path, fps=24):
+    # Frames are encoded on a background thread while the caller produces the next ones
+    with VideoWriter(output_video_path, fps) as writer:
+        for frame in output_video_frames:
+            writer.write(frame)  # Write each frame to the output video as soon as it arrives
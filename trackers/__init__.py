@@ -1 +1,5 @@
-from .tracker import Tracker
\ No newline at end of file
+from .tracker import Tracker
+from .track_table import TrackTable, OBJECT_CLASSES
+from .batch_inference import BatchInferenceEngine
+from .region_inference import RegionInference, REGION_MODES
+from .ball_tracker import BallTracker, ball_boxes, interpolate_boxes
\ No newline at end of file
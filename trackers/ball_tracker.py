@@ -0,0 +1,149 @@
+import numpy as np
+
+def ball_boxes(ball_positions):
+    # Per-frame ball dicts ({1: {"bbox": ...}} or {}) as an (N, 4) array with NaN rows where there is no ball
+    boxes = np.full((len(ball_positions), 4), np.nan)
+    for frame_num, ball in enumerate(ball_positions):
+        if 1 in ball:
+            boxes[frame_num] = ball[1]["bbox"]
+    return boxes
+
+def interpolate_boxes(boxes, anchor=None):
+    # Fills the NaN rows of an (N, 4) box array: linearly between detections, held at the last box after the
+    # last one and at the first box before the first one (pandas interpolate() + bfill(), column by column).
+    # `anchor` is the box of the frame just before the array (the end of the previous chunk), so consecutive
+    # chunks join up like a single clip. Arrays without any box (and no anchor) are returned as they are
+    boxes = np.asarray(boxes, dtype=np.float64)
+    if anchor is not None:
+        boxes = np.vstack([np.asarray(anchor, dtype=np.float64).reshape(1, 4), boxes])
+    known = np.flatnonzero(~np.isnan(boxes).any(axis=1))
+    if len(known) == 0 or len(known) == len(boxes):
+        filled = boxes.copy()
+    else:
+        frames = np.arange(len(boxes))
+        filled = np.stack([np.interp(frames, known, boxes[known, column]) for column in range(4)], axis=1)
+    return filled[1:] if anchor is not None else filled
+
+class BallTracker():
+    # Single-target tracker for the ball: a constant-acceleration Kalman filter on the bbox center (pixels,
+    # one step per frame) and the last measured bbox size. Of several ball detections in a frame it keeps the
+    # one that best fits the predicted position (Mahalanobis distance, with detector confidence breaking near
+    # ties). Detections outside the gate of a confirmed track are taken for false positives, unless the ball has
+    # left the prediction (a hard kick): a confident detection, or a lone one that stays outside the gate for
+    # restart_after frames in a row, restarts the track on it. Frames without a usable detection coast on the
+    # prediction for up to max_coast frames, after which the track is lost and the next detection starts a new one
+    def __init__(self, process_noise=2.0, measurement_noise=2.0, gate=9.21, max_coast=12, confirm_hits=3,
+                 restart_after=2, restart_confidence=0.5):
+        self.process_noise = process_noise  # Jerk noise, pixels per frame^3
+        self.measurement_noise = measurement_noise  # Pixels
+        self.gate = gate  # Squared Mahalanobis distance; 9.21 keeps 99% of true measurements (2 degrees of freedom)
+        self.max_coast = max_coast
+        self.confirm_hits = confirm_hits  # Detections before the track can reject candidates
+        self.restart_after = restart_after  # Frames in a row a lone detection may stay outside the gate
+        self.restart_confidence = restart_confidence  # Detections at least this confident are never rejected
+
+        axis_transition = np.array([[1.0, 1.0, 0.5], [0.0, 1.0, 1.0], [0.0, 0.0, 1.0]])  # Position, velocity, acceleration
+        axis_noise = process_noise ** 2 * np.array([[1 / 36, 1 / 12, 1 / 6], [1 / 12, 1 / 4, 1 / 2], [1 / 6, 1 / 2, 1.0]])
+        self.transition = np.kron(axis_transition, np.eye(2))  # State [x, y, vx, vy, ax, ay]
+        self.noise = np.kron(axis_noise, np.eye(2))
+        self.observation = np.hstack([np.eye(2), np.zeros((2, 4))])
+        self.measurement_covariance = measurement_noise ** 2 * np.eye(2)
+        self.reset()
+
+    @property
+    def params(self):
+        return {"process_noise": self.process_noise, "measurement_noise": self.measurement_noise, "gate": self.gate,
+                "max_coast": self.max_coast, "confirm_hits": self.confirm_hits, "restart_after": self.restart_after,
+                "restart_confidence": self.restart_confidence}
+
+    def reset(self):
+        self.state = None
+        self.covariance = None
+        self.size = None  # Width and height of the last measured bbox
+        self.hits = 0
+        self.missed = 0
+        self.outside = 0  # Frames in a row with only a detection outside the gate
+        self.prediction = None  # Predicted bbox of the last frame when it had no usable detection, else None
+
+    def box(self):
+        center = self.state[:2]
+        return np.r_[center - self.size / 2, center + self.size / 2]
+
+    def start(self, bbox):
+        bbox = np.asarray(bbox, dtype=np.float64)
+        self.state = np.r_[(bbox[:2] + bbox[2:]) / 2, np.zeros(4)]
+        self.covariance = np.diag([self.measurement_noise ** 2] * 2 + [400.0] * 2 + [25.0] * 2)  # Unknown motion
+        self.size = bbox[2:] - bbox[:2]
+        self.hits = 1
+        self.missed = 0
+        self.outside = 0
+
+    def predict(self):
+        self.state = self.transition @ self.state
+        self.covariance = self.transition @ self.covariance @ self.transition.T + self.noise
+
+    def correct(self, bbox):
+        bbox = np.asarray(bbox, dtype=np.float64)
+        innovation = (bbox[:2] + bbox[2:]) / 2 - self.observation @ self.state
+        innovation_covariance = self.observation @ self.covariance @ self.observation.T + self.measurement_covariance
+        gain = self.covariance @ self.observation.T @ np.linalg.inv(innovation_covariance)
+        self.state = self.state + gain @ innovation
+        self.covariance = (np.eye(6) - gain @ self.observation) @ self.covariance
+        self.size = bbox[2:] - bbox[:2]
+        self.hits += 1
+        self.missed = 0
+        self.outside = 0
+
+    def skip(self, frames):
+        # Frames that were never seen (dropped from a live feed) only advance the prediction
+        if self.state is None or frames <= 0:
+            return
+        for _ in range(frames):
+            self.predict()
+        self.missed += frames
+        if self.missed > self.max_coast:
+            self.reset()
+
+    def distances(self, boxes):
+        # Squared Mahalanobis distance of every candidate center to the predicted position
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        innovations = centers - self.observation @ self.state
+        innovation_covariance = self.observation @ self.covariance @ self.observation.T + self.measurement_covariance
+        return np.einsum('ni,ij,nj->n', innovations, np.linalg.inv(innovation_covariance), innovations)
+
+    def update(self, boxes, confidences=None):
+        # One frame: the ball candidates as an (M, 4) array (M may be 0) and their confidences. Returns the
+        # chosen detection's bbox as a list, or None; a coasting track leaves its predicted bbox in self.prediction
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        confidences = np.ones(len(boxes)) if confidences is None else np.asarray(confidences, dtype=np.float64)
+        self.prediction = None
+
+        if self.state is not None:
+            self.predict()
+            outside = 0
+            if len(boxes):
+                distances = self.distances(boxes)
+                if (distances <= self.gate).any():
+                    cost = np.where(distances <= self.gate, distances - 2 * np.log(np.clip(confidences, 1e-3, 1.0)), np.inf)
+                    candidate = int(np.argmin(cost))
+                    self.correct(boxes[candidate])
+                    return boxes[candidate].tolist()
+                candidate = int(np.argmax(confidences))
+                outside = self.outside + 1 if len(boxes) == 1 else 0
+                # Unconfirmed (the track may have started on a false positive), or the ball really is elsewhere
+                if self.hits < self.confirm_hits or confidences[candidate] >= self.restart_confidence or outside >= self.restart_after:
+                    self.start(boxes[candidate])
+                    return boxes[candidate].tolist()
+            self.outside = outside
+            self.missed += 1
+            if self.missed > self.max_coast:
+                self.reset()
+                return None
+            self.prediction = self.box().tolist()
+            return None
+
+        if len(boxes) == 0:
+            return None
+        candidate = int(np.argmax(confidences))
+        self.start(boxes[candidate])
+        return boxes[candidate].tolist()
@@ -0,0 +1,138 @@
+import math
+import time
+import numpy as np
+import cv2
+import torch
+import supervision as sv
+
+class BatchInferenceEngine:
+    # Batched YOLO inference over any iterable of BGR frames.
+    # Frames are letterboxed into input tensors that are allocated once and reused for every batch,
+    # and, unless batch_size is fixed, the batch size is tuned from measured throughput on the first batches.
+    def __init__(self, model, conf=0.1, batch_size=None, candidate_batch_sizes=(1, 2, 4, 8, 16, 32), imgsz=640, trials_per_size=2, input_scale=None):
+        self.model = model
+        self.conf = conf
+        self.imgsz = imgsz
+        self.input_scale = input_scale  # Fixed resize factor instead of fitting the long side to imgsz; input size then follows the frame size
+        self.stride = 32  # YOLO input sides must be a multiple of the model stride
+        self.trials_per_size = trials_per_size
+
+        self.candidate_batch_sizes = sorted(candidate_batch_sizes) if batch_size is None else [batch_size]
+        self.batch_size = batch_size  # None until tuning has picked one
+        self._trials = {}  # Candidate batch size -> measured input pixels/s of its full batches (comparable across input sizes)
+        self._warm = False  # The first batch pays for model warm-up and is not used for tuning
+
+        self.batch_stats = []  # (batch size, latency in seconds) of every batch
+        self._frame_buffer = None  # (max batch, H, W, 3) uint8 letterboxed frames
+        self._input_tensor = None  # (max batch, 3, H, W) float32 model input
+        self._frame_shape = None
+        self._buffers = {}  # Frame shape -> its geometry and buffers, kept so alternating shapes (crops) reuse them
+
+    def _allocate(self, frame_shape):
+        # Input geometry only depends on the frame size, so buffers are built once per frame size
+        if frame_shape not in self._buffers:
+            height, width = frame_shape[:2]
+            scale = self.input_scale or min(self.imgsz / height, self.imgsz / width)
+            resized_size = (round(width * scale), round(height * scale))
+            input_height = math.ceil(resized_size[1] / self.stride) * self.stride
+            input_width = math.ceil(resized_size[0] / self.stride) * self.stride
+
+            max_batch = max(self.candidate_batch_sizes)
+            frame_buffer = np.full((max_batch, input_height, input_width, 3), 114, dtype=np.uint8)  # YOLO pad color
+            input_tensor = torch.empty((max_batch, 3, input_height, input_width), dtype=torch.float32)
+            self._buffers[frame_shape] = (scale, resized_size, frame_buffer, input_tensor)
+        self.scale, self.resized_size, self._frame_buffer, self._input_tensor = self._buffers[frame_shape]
+        self._frame_shape = frame_shape
+
+    def _current_batch_size(self):
+        if self.batch_size is not None:
+            return self.batch_size
+        for candidate in self.candidate_batch_sizes:  # Next candidate that still needs measurements
+            if len(self._trials.get(candidate, [])) < self.trials_per_size:
+                return candidate
+        return self.candidate_batch_sizes[-1]
+
+    def _record(self, batch_size, latency, full_batch):
+        self.batch_stats.append((batch_size, latency))
+        if self.batch_size is not None or not full_batch:
+            return
+        if not self._warm:
+            self._warm = True
+            return
+
+        input_pixels = self._input_tensor.shape[2] * self._input_tensor.shape[3]
+        self._trials.setdefault(batch_size, []).append(batch_size * input_pixels / latency)
+        if len(self._trials[batch_size]) < self.trials_per_size:
+            return
+
+        throughput = {size: np.median(rates) for size, rates in self._trials.items() if len(rates) >= self.trials_per_size}
+        best = max(throughput, key=throughput.get)
+        done = len(throughput) == len(self.candidate_batch_sizes)
+        if throughput[batch_size] < 0.9 * throughput[best]:
+            done = True  # Throughput is falling again, larger batches will not help
+        if done:
+            self.batch_size = best
+
+    def _run_batch(self, count, full_batch):
+        source = torch.from_numpy(self._frame_buffer[:count])  # Shares memory with the frame buffer
+        batch = self._input_tensor[:count]
+        for channel in range(3):
+            batch[:, channel].copy_(source[..., 2 - channel])  # BGR -> RGB without temporaries
+        batch.mul_(1 / 255)
+
+        started = time.perf_counter()
+        results = self.model.predict(batch, conf=self.conf, verbose=False)
+        latency = time.perf_counter() - started
+        self._record(count, latency, full_batch)
+
+        detections = []
+        height, width = self._frame_shape[:2]
+        for result in results:
+            boxes = result.boxes
+            xyxy = boxes.xyxy.cpu().numpy() / self.scale  # Padding is only on the bottom/right, so only the scale is undone
+            xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width)
+            xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height)
+            class_id = boxes.cls.cpu().numpy().astype(int)
+            detections.append(sv.Detections(
+                xyxy=xyxy,
+                confidence=boxes.conf.cpu().numpy(),
+                class_id=class_id,
+                data={"class_name": np.array([result.names[i] for i in class_id])}
+            ))
+        return detections
+
+    def predict_stream(self, frames):
+        # Yields one sv.Detections per frame, in order, as soon as its batch has run
+        count = 0  # Frames waiting in the frame buffer
+        for frame in frames:
+            if frame.shape != self._frame_shape:
+                if count:
+                    yield from self._run_batch(count, full_batch=False)
+                    count = 0
+                self._allocate(frame.shape)
+
+            resized = cv2.resize(frame, self.resized_size)
+            self._frame_buffer[count, :resized.shape[0], :resized.shape[1]] = resized
+            count += 1
+
+            if count == self._current_batch_size():
+                yield from self._run_batch(count, full_batch=True)
+                count = 0
+
+        if count:
+            yield from self._run_batch(count, full_batch=False)
+
+    def predict(self, frames):
+        return list(self.predict_stream(frames))
+
+    def frames_per_second(self):
+        frames = sum(size for size, _ in self.batch_stats)
+        seconds = sum(latency for _, latency in self.batch_stats)
+        return frames / seconds if seconds else 0.0
+
+    def report(self):
+        latencies = np.array([latency for _, latency in self.batch_stats]) * 1000
+        if len(latencies) == 0:
+            return "no batches run"
+        return (f"batch size {self.batch_size or 'tuning'}: {self.frames_per_second():.1f} frames/s over {len(latencies)} batches, "
+                f"batch latency p50 {np.percentile(latencies, 50):.0f} ms / p95 {np.percentile(latencies, 95):.0f} ms")
@@ -0,0 +1,210 @@
+import math
+from collections import deque
+import numpy as np
+import supervision as sv
+from .batch_inference import BatchInferenceEngine
+
+REGION_MODES = ('pitch', 'dynamic')
+
+class RegionInference:
+    # Detector inference on the part of the frame that can hold players, at a fixed scale, so a smaller region means
+    # a smaller input tensor. region='pitch' crops every frame to the bounding box of `polygon` (the pitch outline
+    # in pixels) plus a margin; region='dynamic' crops to the boxes detected in the last batch plus a margin that
+    # grows with the observed box speed times the frames since those boxes were found (a region can be up to two
+    # batches old), going back to the full frame every refresh_every frames so players entering the view are found.
+    # Dynamic crops are rounded up to quarter-frame sizes aligned to the model stride, so the engine sees a few input
+    # shapes and reuses their buffers, and batches are capped at max_batch to keep the regions recent. imgsz is the size
+    # the full frame's long side would be resized to (below 640 downscales). With ball_tiles, frames where this pass
+    # finds no ball are searched again at full resolution in tiles, first around the last ball and then over the
+    # whole region, and only ball detections of that pass are kept. Detections are returned in full-frame coordinates
+    def __init__(self, model, conf=0.1, batch_size=None, region=None, polygon=None, imgsz=640, margin=96,
+                 refresh_every=48, ball_tiles=False, tile_size=640, ball_class='ball', max_batch=8):
+        if region is not None and region not in REGION_MODES:
+            raise ValueError(f"unknown region '{region}', expected one of {REGION_MODES}")
+        if region == 'pitch' and polygon is None:
+            raise ValueError("region='pitch' needs the pitch polygon")
+        self.region_mode = region
+        self.polygon = None if polygon is None else np.asarray(polygon, dtype=np.float64)
+        self.conf = conf
+        self.imgsz = imgsz
+        self.margin = margin
+        self.refresh_every = refresh_every
+        self.ball_tiles = ball_tiles
+        self.tile_size = tile_size
+        self.ball_class = ball_class
+        candidate_batch_sizes = (1, 2, 4, 8, 16, 32)
+        if region == 'dynamic':
+            candidate_batch_sizes = tuple(size for size in candidate_batch_sizes if size <= max_batch)
+        self.engine = BatchInferenceEngine(model, conf=conf, batch_size=batch_size, candidate_batch_sizes=candidate_batch_sizes, imgsz=imgsz)
+        self.tile_engine = BatchInferenceEngine(model, conf=conf, batch_size=batch_size, imgsz=tile_size, input_scale=1.0) if ball_tiles else None
+
+        self.max_batch = max_batch
+        self.extent = None  # Dynamic mode: (x1, y1, x2, y2) around the last detections, None for the full frame
+        self.extent_frame = 0  # Frame the extent was found on
+        self.speed = 0.0  # Pixels per frame the extent's edges have been moving, decaying
+        self.crop_size = None  # (width, height) of the current dynamic crop
+        self.frames_since_refresh = 0
+        self.last_ball = None  # Center of the last detected ball, full-frame coordinates
+
+        self.frames = 0
+        self.full_pixels = 0
+        self.region_pixels = 0
+        self.tile_frames = 0  # Frames the tiled ball pass ran on
+        self.tiles = 0
+        self.balls_recovered = 0
+        self.crop_shapes = set()  # Distinct crop sizes handed to the engine
+
+    @property
+    def params(self):
+        # Everything that changes the detections; part of the detections cache key
+        return self.describe(self.region_mode, self.margin, self.refresh_every, self.ball_tiles, self.tile_size, self.max_batch)
+
+    @staticmethod
+    def describe(region=None, margin=96, refresh_every=48, ball_tiles=False, tile_size=640, max_batch=8):
+        # params of a RegionInference built with these options, without building it (or loading its model)
+        return {"region": region, "margin": margin, "refresh_every": refresh_every,
+                "ball_tiles": ball_tiles, "tile_size": tile_size, "max_batch": max_batch}
+
+    @property
+    def batch_size(self):
+        return self.engine.batch_size
+
+    def clip(self, box, shape):
+        height, width = shape[:2]
+        x1, y1, x2, y2 = box
+        return (int(max(x1, 0)), int(max(y1, 0)), int(min(x2, width)), int(min(y2, height)))
+
+    def bucket_sizes(self, length):
+        # Crop side lengths for a frame side: quarters of it whose input size is a multiple of the model stride
+        scale, stride = self.engine.input_scale, self.engine.stride
+        return sorted({min(int(math.ceil(length * quarter / 4 * scale / stride) * stride / scale), length) for quarter in range(1, 5)})
+
+    def frame_region(self, shape, frame_num=0):
+        if self.region_mode == 'pitch':
+            x1, y1 = self.polygon.min(axis=0) - self.margin
+            x2, y2 = self.polygon.max(axis=0) + self.margin
+            return self.clip((x1, y1, x2, y2), shape)
+        height, width = shape[:2]
+        if self.extent is None:
+            self.crop_size = (width, height)
+            return (0, 0, width, height)
+
+        # Sized for the oldest a region gets (frames keep being queued while the next batch runs), so the frames
+        # cropped from one extent share one crop size
+        age = max(frame_num - self.extent_frame, 2 * self.engine._current_batch_size())
+        grow = self.margin + self.speed * age
+        x1, y1, x2, y2 = self.clip(self.extent + np.array([-grow, -grow, grow, grow]), shape)
+        needed = (next(size for size in self.bucket_sizes(width) if size >= x2 - x1),
+                  next(size for size in self.bucket_sizes(height) if size >= y2 - y1))
+        # Moving a crop is free, changing its size is not: a smaller size is only adopted when it is well below the current one
+        current = self.crop_size or (width, height)
+        if needed[0] > current[0] or needed[1] > current[1] or needed[0] * needed[1] < 0.6 * current[0] * current[1]:
+            self.crop_size = needed
+        crop_width, crop_height = self.crop_size
+        left = min(max((x1 + x2 - crop_width) // 2, 0), width - crop_width)
+        top = min(max((y1 + y2 - crop_height) // 2, 0), height - crop_height)
+        return (left, top, left + crop_width, top + crop_height)
+
+    def update_region(self, detection, shape, frame_num=0):
+        # Dynamic mode: the next frames are cropped around the boxes just found; how far their edges moved since the
+        # previous extent gives the speed the margin grows with
+        if self.region_mode != 'dynamic':
+            return
+        self.frames_since_refresh += 1
+        if len(detection) == 0 or self.frames_since_refresh >= self.refresh_every:
+            self.extent = None
+            self.frames_since_refresh = 0
+            return
+        extent = np.r_[detection.xyxy[:, :2].min(axis=0), detection.xyxy[:, 2:].max(axis=0)]
+        self.speed *= 0.9
+        if self.extent is not None:
+            self.speed = max(self.speed, np.abs(extent - self.extent).max() / max(frame_num - self.extent_frame, 1))
+        self.extent = extent
+        self.extent_frame = frame_num
+
+    def ball_mask(self, detection):
+        return detection.data["class_name"] == self.ball_class
+
+    def tile_origins(self, region, shape):
+        # Tile corners covering the region, overlapping so a ball on a tile border is whole in one of them
+        x1, y1, x2, y2 = region
+        size_x, size_y = min(self.tile_size, shape[1]), min(self.tile_size, shape[0])
+        step = self.tile_size - 64
+        xs = np.unique(np.clip(np.r_[np.arange(x1, max(x2 - size_x, x1) + 1, step), x2 - size_x], 0, shape[1] - size_x))
+        ys = np.unique(np.clip(np.r_[np.arange(y1, max(y2 - size_y, y1) + 1, step), y2 - size_y], 0, shape[0] - size_y))
+        return [(int(x), int(y)) for y in ys for x in xs]
+
+    def detect_ball(self, frame, origins):
+        # Most confident ball over the tiles, in frame coordinates, or None
+        size_x, size_y = min(self.tile_size, frame.shape[1]), min(self.tile_size, frame.shape[0])
+        tiles = [frame[y:y + size_y, x:x + size_x] for x, y in origins]
+        self.tiles += len(tiles)
+        best = None
+        for (x, y), detection in zip(origins, self.tile_engine.predict(tiles)):
+            balls = detection[self.ball_mask(detection)]
+            if len(balls) == 0:
+                continue
+            ball = balls[[int(np.argmax(balls.confidence))]]
+            if best is None or ball.confidence[0] > best.confidence[0]:
+                ball.xyxy = ball.xyxy + np.array([x, y, x, y], dtype=ball.xyxy.dtype)
+                best = ball
+        return best
+
+    def recover_ball(self, frame, region, detection):
+        self.tile_frames += 1
+        ball = None
+        if self.last_ball is not None:
+            half = self.tile_size // 2
+            x, y = self.last_ball.astype(int)
+            origin = self.clip((x - half, y - half, x + half, y + half), frame.shape)
+            ball = self.detect_ball(frame, self.tile_origins(origin, frame.shape)[:1])
+        if ball is None:
+            ball = self.detect_ball(frame, self.tile_origins(region, frame.shape))
+        if ball is None:
+            return detection
+        self.balls_recovered += 1
+        return sv.Detections.merge([detection, ball])
+
+    def predict_stream(self, frames):
+        # Yields one sv.Detections per frame in full-frame coordinates; in dynamic mode the crop of a frame depends
+        # on the last batch that finished before it was queued
+        queued = deque()  # (frame number, frame, region) of every frame handed to the engine and not yet returned
+
+        def crops():
+            for frame in frames:
+                if self.engine.input_scale is None:
+                    self.engine.input_scale = self.imgsz / max(frame.shape[:2])  # Every crop keeps the full frame's scale
+                region = self.frame_region(frame.shape, self.frames)
+                x1, y1, x2, y2 = region
+                queued.append((self.frames, frame, region))
+                self.crop_shapes.add((x2 - x1, y2 - y1))
+                self.frames += 1
+                self.full_pixels += frame.shape[0] * frame.shape[1]
+                self.region_pixels += (x2 - x1) * (y2 - y1)
+                yield frame[y1:y2, x1:x2]
+
+        for detection in self.engine.predict_stream(crops()):
+            frame_num, frame, region = queued.popleft()
+            x1, y1 = region[:2]
+            detection.xyxy = detection.xyxy + np.array([x1, y1, x1, y1], dtype=detection.xyxy.dtype)
+            if self.ball_tiles and not self.ball_mask(detection).any():
+                detection = self.recover_ball(frame, region, detection)
+            balls = detection.xyxy[self.ball_mask(detection)]
+            if len(balls):
+                self.last_ball = (balls[0, :2] + balls[0, 2:]) / 2
+            self.update_region(detection, frame.shape, frame_num)
+            yield detection
+
+    def predict(self, frames):
+        return list(self.predict_stream(frames))
+
+    def frames_per_second(self):
+        return self.engine.frames_per_second()
+
+    def report(self):
+        area = self.region_pixels / self.full_pixels if self.full_pixels else 1.0
+        scale = self.engine.input_scale or 0.0
+        report = f"region {self.region_mode or 'full frame'}: {area:.0%} of the frame area in {len(self.crop_shapes)} crop sizes at {scale:.2f}x scale; {self.engine.report()}"
+        if self.ball_tiles:
+            report += f"; ball tiles ran on {self.tile_frames} of {self.frames} frames ({self.tiles} tiles), recovering {self.balls_recovered} balls"
+        return report
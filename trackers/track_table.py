@@ -0,0 +1,381 @@
+import numpy as np
+
+OBJECT_CLASSES = ("players", "referees", "ball")  # Class codes are the index in this tuple
+CLASS_IDS = {name: class_id for class_id, name in enumerate(OBJECT_CLASSES)}
+
+class TrackTable:
+    # Column store for all tracks of a clip: one row per (frame, object, track id).
+    # Rows are sorted by frame then class, so every frame/class is a contiguous slice.
+    def __init__(self, frame, track_id, cls, bbox, num_frames=None):
+        rows = len(frame)
+        columns = {
+            "frame": np.asarray(frame, dtype=np.int32),
+            "track_id": np.asarray(track_id, dtype=np.int32),
+            "cls": np.asarray(cls, dtype=np.int8),
+            "bbox": np.asarray(bbox, dtype=np.float32).reshape(-1, 4),
+            "position": np.full((rows, 2), np.nan, dtype=np.float32),
+            "position_adjusted": np.full((rows, 2), np.nan, dtype=np.float32),
+            "position_transformed": np.full((rows, 2), np.nan, dtype=np.float32),
+            "team": np.zeros(rows, dtype=np.int8),  # 0 means no team assigned
+            "speed": np.full(rows, np.nan, dtype=np.float32),
+            "distance": np.full(rows, np.nan, dtype=np.float32),
+            "has_ball": np.zeros(rows, dtype=bool)
+        }
+        if num_frames is None:
+            num_frames = int(columns["frame"].max()) + 1 if rows else 0
+
+        self.team_colors = {}  # Team id -> color, instead of one color per row
+        self.computed = set()  # (column, class) pairs whose missing value means None rather than "not set"
+        self._set_rows(columns, num_frames)
+
+    def _set_rows(self, columns, num_frames):
+        order = np.lexsort((columns["cls"], columns["frame"]))  # Stable, keeps insertion order inside a frame/class
+        for name, column in columns.items():
+            setattr(self, name, column[order])
+        self.num_frames = num_frames
+
+        self._build_frame_index()
+        self._track_index = None  # Built on first per-track lookup
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _build_frame_index(self):
+        key = self.frame.astype(np.int64) * len(OBJECT_CLASSES) + self.cls  # Sorted by construction
+        bounds = np.arange(self.num_frames * len(OBJECT_CLASSES) + 1)
+        self.frame_class_offsets = np.searchsorted(key, bounds)  # Start row of every (frame, class) slice
+
+    def frame_rows(self, frame_num, object=None):
+        if object is None:
+            start = frame_num * len(OBJECT_CLASSES)
+            return slice(self.frame_class_offsets[start], self.frame_class_offsets[start + len(OBJECT_CLASSES)])
+        key = frame_num * len(OBJECT_CLASSES) + CLASS_IDS[object]
+        return slice(self.frame_class_offsets[key], self.frame_class_offsets[key + 1])
+
+    def _build_track_index(self):
+        order = np.lexsort((self.frame, self.track_id, self.cls))  # Rows of a track are contiguous and in frame order
+        cls, track_id = self.cls[order], self.track_id[order]
+        starts = np.flatnonzero(np.r_[True, (cls[1:] != cls[:-1]) | (track_id[1:] != track_id[:-1])])
+        stops = np.r_[starts[1:], len(order)]
+        self._track_order = order
+        self._track_index = {
+            (OBJECT_CLASSES[cls[start]], int(track_id[start])): (start, stop)
+            for start, stop in zip(starts, stops)
+        }
+
+    def track_rows(self, object, track_id):
+        if self._track_index is None:
+            self._build_track_index()
+        start, stop = self._track_index.get((object, track_id), (0, 0))
+        return self._track_order[start:stop]  # Row numbers of the track, in frame order
+
+    def track_keys(self, object=None):
+        if self._track_index is None:
+            self._build_track_index()
+        return [key for key in self._track_index if object is None or key[0] == object]
+
+    def object_mask(self, object):
+        return self.cls == CLASS_IDS[object]
+
+    def nbytes(self):
+        return sum(column.nbytes for column in self._columns().values())
+
+    def _columns(self):
+        return {
+            "frame": self.frame, "track_id": self.track_id, "cls": self.cls, "bbox": self.bbox,
+            "position": self.position, "position_adjusted": self.position_adjusted,
+            "position_transformed": self.position_transformed, "team": self.team,
+            "speed": self.speed, "distance": self.distance, "has_ball": self.has_ball
+        }
+
+    def to_columns(self):
+        # Plain dict of the column arrays, e.g. to send a table to another process
+        return dict(self._columns())
+
+    @classmethod
+    def from_columns(cls, columns, num_frames=None):
+        # Inverse of to_columns; the column arrays may be concatenated from several tables in any row order
+        table = cls([], [], [], [], num_frames=0)
+        columns = {
+            name: np.asarray(columns[name], dtype=column.dtype).reshape((-1,) + column.shape[1:])
+            for name, column in table._columns().items()
+        }
+        if num_frames is None:
+            num_frames = int(columns["frame"].max()) + 1 if len(columns["frame"]) else 0
+        table._set_rows(columns, num_frames)
+        return table
+
+    @classmethod
+    def from_tracks(cls, tracks):
+        # Build the table from the nested {"players": [{track_id: {...}}, ...], ...} structure
+        frames, track_ids, classes, bboxes = [], [], [], []
+        num_frames = max(len(object_tracks) for object_tracks in tracks.values())
+        for object in OBJECT_CLASSES:
+            for frame_num, track in enumerate(tracks.get(object, [])):
+                for track_id, track_info in track.items():
+                    frames.append(frame_num)
+                    track_ids.append(track_id)
+                    classes.append(CLASS_IDS[object])
+                    bboxes.append(track_info["bbox"])
+
+        table = cls(frames, track_ids, classes, bboxes, num_frames=num_frames)
+        view = table.as_tracks()
+        for object in OBJECT_CLASSES:  # Copy over whatever the later stages already added
+            for frame_num, track in enumerate(tracks.get(object, [])):
+                frame_view = view[object][frame_num]
+                for track_id, track_info in track.items():
+                    row = frame_view[track_id]
+                    for key, value in track_info.items():
+                        if key != "bbox":
+                            row[key] = value
+        return table
+
+    def to_tracks(self):
+        # Materialise plain nested dicts (same keys as the view), e.g. for the dict-based stages or old stubs
+        tracks = {object: [{} for _ in range(self.num_frames)] for object in OBJECT_CLASSES}
+        columns = {name: column.tolist() for name, column in self._columns().items()}
+        frames, track_ids, classes = columns["frame"], columns["track_id"], columns["cls"]
+        transformed_classes = {class_id for key, class_id in self.computed if key == "position_transformed"}
+
+        for row in range(len(self)):
+            track_info = {"bbox": columns["bbox"][row]}
+            position = columns["position"][row]
+            if position[0] == position[0]:  # NaN marks a missing value
+                track_info["position"] = (int(position[0]), int(position[1]))
+            position_adjusted = columns["position_adjusted"][row]
+            if position_adjusted[0] == position_adjusted[0]:
+                track_info["position_adjusted"] = tuple(position_adjusted)
+            position_transformed = columns["position_transformed"][row]
+            if position_transformed[0] == position_transformed[0]:
+                track_info["position_transformed"] = position_transformed
+            elif classes[row] in transformed_classes:
+                track_info["position_transformed"] = None
+            team = columns["team"][row]
+            if team > 0:
+                track_info["team"] = team
+                if team in self.team_colors:
+                    track_info["team_color"] = self.team_colors[team]
+            for key in ("speed", "distance"):
+                value = columns[key][row]
+                if value == value:
+                    track_info[key] = value
+            if columns["has_ball"][row]:
+                track_info["has_ball"] = True
+            tracks[OBJECT_CLASSES[classes[row]]][frames[row]][track_ids[row]] = track_info
+        return tracks
+
+    def as_tracks(self):
+        return TrackTableView(self)
+
+    def replace_object(self, object, object_tracks):
+        # Swap all rows of one object class, e.g. for interpolated ball positions
+        frames, track_ids, bboxes = [], [], []
+        for frame_num, track in enumerate(object_tracks):
+            for track_id, track_info in track.items():
+                frames.append(frame_num)
+                track_ids.append(track_id)
+                bboxes.append(track_info["bbox"])
+        new_rows = TrackTable(frames, track_ids, np.full(len(frames), CLASS_IDS[object]), bboxes)._columns()
+
+        keep = ~self.object_mask(object)
+        columns = {name: np.concatenate([column[keep], new_rows[name]]) for name, column in self._columns().items()}
+        self._set_rows(columns, max(self.num_frames, len(object_tracks)))
+
+        view = self.as_tracks()[object]
+        for frame_num, track in enumerate(object_tracks):  # Carry over extra keys of the new rows
+            frame_view = view[frame_num]
+            for track_id, track_info in track.items():
+                row = frame_view[track_id]
+                for key, value in track_info.items():
+                    if key != "bbox":
+                        row[key] = value
+
+class TrackTableView:
+    # Dict-like view with the same shape as the tracks returned by Tracker.get_object_tracks
+    def __init__(self, table):
+        self.table = table
+
+    def __getitem__(self, object):
+        if object not in CLASS_IDS:
+            raise KeyError(object)
+        return ObjectTracksView(self.table, object)
+
+    def __setitem__(self, object, object_tracks):
+        self.table.replace_object(object, object_tracks)
+
+    def __contains__(self, object):
+        return object in CLASS_IDS
+
+    def __iter__(self):
+        return iter(OBJECT_CLASSES)
+
+    def __len__(self):
+        return len(OBJECT_CLASSES)
+
+    def keys(self):
+        return list(OBJECT_CLASSES)
+
+    def items(self):
+        return [(object, self[object]) for object in OBJECT_CLASSES]
+
+    def values(self):
+        return [self[object] for object in OBJECT_CLASSES]
+
+class ObjectTracksView:
+    # List-like view: one mapping of track id -> track info per frame
+    def __init__(self, table, object):
+        self.table = table
+        self.object = object
+
+    def __len__(self):
+        return self.table.num_frames
+
+    def __getitem__(self, frame_num):
+        if isinstance(frame_num, slice):
+            return [self[i] for i in range(*frame_num.indices(len(self)))]
+        if frame_num < 0:
+            frame_num += len(self)
+        if not 0 <= frame_num < len(self):
+            raise IndexError(frame_num)
+        return FrameTracksView(self.table, self.table.frame_rows(frame_num, self.object))
+
+    def __iter__(self):
+        for frame_num in range(len(self)):
+            yield self[frame_num]
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+class FrameTracksView:
+    # Mapping of track id -> row view for a single frame and object class
+    def __init__(self, table, rows):
+        self.table = table
+        self.rows = rows
+
+    def _row(self, track_id):
+        matches = np.flatnonzero(self.table.track_id[self.rows] == track_id)
+        if len(matches) == 0:
+            raise KeyError(track_id)
+        return self.rows.start + matches[0]
+
+    def __getitem__(self, track_id):
+        return TrackRowView(self.table, self._row(track_id))
+
+    def __setitem__(self, track_id, track_info):
+        row = TrackRowView(self.table, self._row(track_id))  # Rows cannot be added through a view
+        for key, value in track_info.items():
+            row[key] = value
+
+    def __contains__(self, track_id):
+        return bool(np.any(self.table.track_id[self.rows] == track_id))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self.rows.stop - self.rows.start
+
+    def keys(self):
+        return [int(track_id) for track_id in self.table.track_id[self.rows]]
+
+    def items(self):
+        return [(int(self.table.track_id[row]), TrackRowView(self.table, row)) for row in range(self.rows.start, self.rows.stop)]
+
+    def values(self):
+        return [TrackRowView(self.table, row) for row in range(self.rows.start, self.rows.stop)]
+
+    def get(self, track_id, default=None):
+        return self[track_id] if track_id in self else default
+
+class TrackRowView:
+    # Dict-like access to one row; missing values behave like missing keys
+    KEYS = ("bbox", "position", "position_adjusted", "position_transformed", "team", "team_color", "speed", "distance", "has_ball")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __contains__(self, key):
+        table, row = self.table, self.row
+        if key == "bbox":
+            return True
+        if key in ("position", "position_adjusted"):
+            return not np.isnan(getattr(table, key)[row, 0])
+        if key == "position_transformed":
+            return (key, int(table.cls[row])) in table.computed or not np.isnan(table.position_transformed[row, 0])
+        if key == "team":
+            return table.team[row] > 0
+        if key == "team_color":
+            return table.team[row] in table.team_colors
+        if key in ("speed", "distance"):
+            return not np.isnan(getattr(table, key)[row])
+        if key == "has_ball":
+            return bool(table.has_ball[row])
+        return False
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        table, row = self.table, self.row
+        if key == "bbox":
+            return table.bbox[row].tolist()
+        if key == "position":
+            return tuple(int(v) for v in table.position[row])  # Pixel positions are integers
+        if key == "position_adjusted":
+            return tuple(table.position_adjusted[row].tolist())
+        if key == "position_transformed":
+            position = table.position_transformed[row]
+            return None if np.isnan(position[0]) else position.tolist()
+        if key == "team":
+            return int(table.team[row])
+        if key == "team_color":
+            return table.team_colors[int(table.team[row])]
+        if key in ("speed", "distance"):
+            return float(getattr(table, key)[row])
+        return True  # has_ball
+
+    def __setitem__(self, key, value):
+        table, row = self.table, self.row
+        if key == "bbox":
+            table.bbox[row] = value
+        elif key in ("position", "position_adjusted"):
+            getattr(table, key)[row] = value
+        elif key == "position_transformed":
+            table.computed.add((key, int(table.cls[row])))
+            table.position_transformed[row] = np.nan if value is None else np.ravel(value)
+        elif key == "team":
+            table.team[row] = value
+        elif key == "team_color":
+            table.team_colors[int(table.team[row])] = value  # Colors are stored per team
+        elif key in ("speed", "distance"):
+            getattr(table, key)[row] = value
+        elif key == "has_ball":
+            table.has_ball[row] = bool(value)
+        else:
+            raise KeyError(f"TrackTable has no column for '{key}'")
+
+    def __delitem__(self, key):
+        table, row = self.table, self.row
+        if key in ("position", "position_adjusted", "position_transformed", "speed", "distance"):
+            getattr(table, key)[row] = np.nan
+        elif key == "team":
+            table.team[row] = 0
+        elif key == "has_ball":
+            table.has_ball[row] = False
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        return [key for key in self.KEYS if key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
@@ -1,20 +1,61 @@
-from ultralytics import YOLO  
 import supervision as sv       
 import pickle                  
 import os                      
 import numpy as np             
-import pandas as pd            
 import cv2                     
 import sys                    
 import gc        
 
 sys.path.append('../')         # Add the parent directory to the system path
-from tools import get_center_of_bbox, get_bbox_width, get_foot_position  # Import utility functions
+from tools import get_center_of_bbox, get_bbox_width, get_foot_position, get_centers_of_bboxes, get_foot_positions, profiled  # Import utility functions and the stage profiler
+from view import ViewTransformer  # Its pixel polygon bounds the 'pitch' inference region
+from .track_table import TrackTable
+from .batch_inference import BatchInferenceEngine
+from .region_inference import RegionInference
+from .ball_tracker import BallTracker, ball_boxes, interpolate_boxes
 
 class Tracker:
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)  # Initialize the YOLO model with the given path
-        self.tracker = sv.ByteTrack()  # Initialize the ByteTrack tracker
+    def __init__(self, model_path, batch_size=None, detect_every=1, adaptive_skip=False, region=None, imgsz=640, ball_tiles=False):
+        self.model_path = model_path
+        self.detect_every = detect_every  # Run the detector on every Nth frame and interpolate the frames in between
+        self.adaptive_skip = adaptive_skip  # Shrink/grow the detection stride with motion and detection confidence
+        self.max_interpolation_error = 8  # Pixels a player may drift from the interpolated box before the stride shrinks
+        self.detected_frames = 0  # Frames the detector actually ran on
+        self.conf = 0.1  # Detector confidence threshold
+        self.batch_size = batch_size
+        self.region = region
+        self.imgsz = imgsz
+        self.ball_tiles = ball_tiles
+        self._model = None  # The YOLO model and its inference engine are only loaded once something is detected, so a
+        self._inference = None  # Tracker used for its ByteTrack and ball state alone never loads the weights
+        self.tracker_params = {}  # ByteTrack arguments; part of the cache key of cached tracks
+        self.tracker = sv.ByteTrack(**self.tracker_params)  # Initialize the ByteTrack tracker
+        self.ball_tracker = BallTracker()  # Picks the ball among several detections and predicts it through occlusions
+        self.last_ball_bbox = None  # Last known ball bbox, carried between streamed windows
+
+    @property
+    def model(self):
+        if self._model is None:
+            from ultralytics import YOLO  # Imported on first use, so tracking and drawing work without it
+            self._model = YOLO(self.model_path)  # Initialize the YOLO model with the given path
+        return self._model
+
+    @property
+    def inference(self):
+        if self._inference is None:
+            if self.region is None and self.imgsz == 640 and not self.ball_tiles:
+                self._inference = BatchInferenceEngine(self.model, conf=self.conf, batch_size=self.batch_size)  # Batch size is auto-tuned unless given
+            else:  # Cropped ('pitch' or 'dynamic' region) and/or downscaled inference, optionally with a tiled ball pass
+                self._inference = RegionInference(self.model, conf=self.conf, batch_size=self.batch_size, region=self.region, polygon=ViewTransformer().pixel_vertices,
+                                                  imgsz=self.imgsz, ball_tiles=self.ball_tiles)
+        return self._inference
+
+    @property
+    def inference_params(self):
+        # Detector options beyond conf and imgsz; part of the detections cache key, so known without loading the model
+        if self.region is None and self.imgsz == 640 and not self.ball_tiles:
+            return {}
+        return RegionInference.describe(region=self.region, ball_tiles=self.ball_tiles)
 
     def add_position_to_tracks(self, tracks):
         for object, object_tracks in tracks.items():
@@ -27,48 +68,239 @@ class Tracker:
                         position = get_foot_position(bbox)  # Get foot position for players and referees
                     tracks[object][frame_num][track_id]['position'] = position  # Add position to track info
 
-    def interpolate_ball_positions(self, ball_positions):
-        ball_positions = [x.get(1, {}).get('bbox', []) for x in ball_positions]  # Extract ball bounding boxes
-        df_ball_positions = pd.DataFrame(ball_positions, columns=['x1', 'y1', 'x2', 'y2'])  # Create DataFrame
+    def add_position_to_table(self, table):
+        # Same as add_position_to_tracks for a whole TrackTable at once
+        is_ball = table.object_mask('ball')[:, None]
+        table.position[:] = np.where(is_ball, get_centers_of_bboxes(table.bbox), get_foot_positions(table.bbox))
 
-        df_ball_positions = df_ball_positions.interpolate()  # Interpolate missing values
-        df_ball_positions = df_ball_positions.bfill()        # Backfill any remaining NaNs
+    def interpolate_ball_positions(self, ball_positions):
+        boxes = interpolate_boxes(ball_boxes(ball_positions))  # Linear between detections, held/backfilled at the ends
+        return [{1: {"bbox": box}} for box in boxes.tolist()]  # Back to per-frame ball dicts
 
-        ball_positions = [{1: {"bbox": x}} for x in df_ball_positions.to_numpy().tolist()]  # Convert back to list
+    def interpolate_ball_window(self, ball_positions):
+        # Streaming variant: the last ball bbox of the previous window anchors the interpolation
+        boxes = ball_boxes(ball_positions)
+        if self.last_ball_bbox is None and np.isnan(boxes).all():
+            return ball_positions  # Nothing to interpolate from yet
 
-        return ball_positions  # Return the interpolated ball positions
+        boxes = interpolate_boxes(boxes, anchor=self.last_ball_bbox)  # Gaps at the end are held at the last bbox
+        if len(boxes):
+            self.last_ball_bbox = boxes[-1].tolist()  # Remember the anchor for the next window
+        return [{1: {"bbox": box}} for box in boxes.tolist()]
 
+    @profiled('detect')
     def detect_frames(self, frames):
-        batch_size = 10  # Set batch size for processing frames
-        detections = []  # Initialize list to store detections
-        for i in range(0, len(frames), batch_size):
-            detections_batch = self.model.predict(frames[i:i+batch_size], conf=0.1)  # Predict on batch
-            detections += detections_batch  # Add batch detections to the list
-        return detections  # Return all detections
-
-    def get_object_tracks(self, frames, read_from_stub=False, stub_path=None):
+        if self.detect_every == 1:
+            self.detected_frames += len(frames)
+            return self.inference.predict(frames)  # Detect objects in any iterable of frames, batch by batch
+
+        # Frame skipping: skipped frames get None and are interpolated by track_detections.
+        # The last frame is always detected so a window never ends on an interpolated gap.
+        detections = [None] * len(frames)
+        if self.adaptive_skip:
+            keyframes = self.detect_adaptive_keyframes(frames, detections)
+        else:
+            keyframes = list(range(0, len(frames), self.detect_every))
+            if keyframes and keyframes[-1] != len(frames) - 1:
+                keyframes.append(len(frames) - 1)
+            for frame_num, detection in zip(keyframes, self.inference.predict_stream(frames[i] for i in keyframes)):
+                detections[frame_num] = detection
+        self.detected_frames += len(keyframes)
+        return detections
+
+    def detect_adaptive_keyframes(self, frames, detections):
+        # The next keyframe depends on the last one: players moving fast or a drop in detection
+        # confidence halve the stride, calm play grows it back up to detect_every
+        keyframes = []
+        stride = self.detect_every
+        frame_num = 0
+        mean_confidence = None
+        while frame_num < len(frames):
+            detection = self.inference.predict([frames[frame_num]])[0]
+            detections[frame_num] = detection
+
+            if keyframes:
+                previous_num = keyframes[-1]
+                motion = self.detection_motion(detections[previous_num], detection) / (frame_num - previous_num)  # Pixels per frame
+                confidence = float(np.mean(detection.confidence)) if len(detection) else 0.0
+                if motion * stride > self.max_interpolation_error or confidence < 0.8 * mean_confidence:
+                    stride = max(1, stride // 2)
+                else:
+                    stride = min(self.detect_every, stride + 1)
+                mean_confidence = 0.9 * mean_confidence + 0.1 * confidence
+            else:
+                mean_confidence = float(np.mean(detection.confidence)) if len(detection) else 0.0
+            keyframes.append(frame_num)
+
+            if frame_num == len(frames) - 1:
+                break
+            frame_num = min(frame_num + stride, len(frames) - 1)
+        return keyframes
+
+    def detection_motion(self, previous, current):
+        # Median distance from each current box center to the nearest center in the previous keyframe
+        if len(previous) == 0 or len(current) == 0:
+            return 0.0
+        previous_centers = (previous.xyxy[:, :2] + previous.xyxy[:, 2:]) / 2
+        current_centers = (current.xyxy[:, :2] + current.xyxy[:, 2:]) / 2
+        distances = np.linalg.norm(current_centers[:, None] - previous_centers[None], axis=2)
+        return float(np.median(distances.min(axis=1)))
+
+    def interpolate_skipped_frames(self, tracks, keyframes):
+        # Linear bbox interpolation between consecutive keyframes for every track seen at both ends,
+        # the same idea interpolate_ball_positions applies to the ball
+        for start, stop in zip(keyframes[:-1], keyframes[1:]):
+            if stop - start < 2:
+                continue
+            weights = (np.arange(start + 1, stop) - start) / (stop - start)  # (gap,)
+            for object_tracks in tracks.values():
+                track_ids = [track_id for track_id in object_tracks[start] if track_id in object_tracks[stop]]
+                if not track_ids:
+                    continue
+                start_boxes = np.array([object_tracks[start][track_id]["bbox"] for track_id in track_ids])
+                stop_boxes = np.array([object_tracks[stop][track_id]["bbox"] for track_id in track_ids])
+                boxes = start_boxes + weights[:, None, None] * (stop_boxes - start_boxes)  # (gap, tracks, 4)
+                for offset, frame_boxes in enumerate(boxes.tolist()):
+                    for track_id, bbox in zip(track_ids, frame_boxes):
+                        object_tracks[start + 1 + offset][track_id] = {"bbox": bbox}
+
+    def get_object_tracks(self, frames, read_from_stub=False, stub_path=None, as_table=False, cache=None, video_path=None):
+        if cache is not None:  # Content-addressed cache instead of a stub file
+            table = self.get_cached_track_table(frames, cache, video_path)
+            return table if as_table else table.to_tracks()
+
         if read_from_stub and stub_path is not None and os.path.exists(stub_path):
             with open(stub_path, 'rb') as f:
                 tracks = pickle.load(f)  # Load tracks from stub file if available
-            return tracks  # Return loaded tracks
+            return TrackTable.from_tracks(tracks) if as_table else tracks  # Return loaded tracks
 
         detections = self.detect_frames(frames)  # Detect objects in frames
+        tracks = self.track_detections(detections)  # Run ByteTrack over the detections
 
+        if stub_path is not None:
+            with open(stub_path, 'wb') as f:
+                pickle.dump(tracks, f)  # Save tracks to stub file
+
+        return TrackTable.from_tracks(tracks) if as_table else tracks  # Return tracks dictionary or column store
+
+    def get_cached_track_table(self, frames, cache, video_path):
+        # Tracks are cached per chunk on top of cached raw detections: changing only the tracker
+        # parameters re-runs ByteTrack on the stored detections, never the detector
+        detections_key = cache.key(
+            'detections',
+            video=cache.file_digest(video_path),
+            model=cache.file_digest(self.model_path),
+            conf=self.conf,
+            imgsz=self.imgsz,
+            detect_every=self.detect_every,
+            adaptive_skip=self.adaptive_skip,
+            max_interpolation_error=self.max_interpolation_error,
+            **self.inference_params
+        )
+        tracks_key = cache.key('tracks', detections=detections_key, tracker=self.tracker_params, ball=self.ball_tracker.params)
+
+        completed = cache.completed('tracks', tracks_key)
+        if completed is not None:
+            chunks = [cache.load_chunk('tracks', tracks_key, index) for index in range(completed["num_chunks"])]
+            if all(chunk is not None for chunk in chunks):  # Chunks may have been evicted meanwhile
+                return TrackTable(
+                    np.concatenate([chunk["frame"] for chunk in chunks]),
+                    np.concatenate([chunk["track_id"] for chunk in chunks]),
+                    np.concatenate([chunk["cls"] for chunk in chunks]),
+                    np.concatenate([chunk["bbox"] for chunk in chunks]),
+                    num_frames=completed["num_frames"]
+                )
+
+        self.tracker.reset()  # Track ids must not depend on what ran before
+        self.ball_tracker.reset()
+        tables = []
+        chunk_ranges = cache.chunk_ranges(len(frames))
+        for index, (start, stop) in enumerate(chunk_ranges):
+            detections = self.load_cached_detections(cache, detections_key, index)
+            if detections is None:
+                detections = self.detect_frames(frames[start:stop])
+                self.save_cached_detections(cache, detections_key, index, detections)
+
+            table = TrackTable.from_tracks(self.track_detections(detections))
+            cache.save_chunk('tracks', tracks_key, index, frame=table.frame + start, track_id=table.track_id, cls=table.cls, bbox=table.bbox)
+            tables.append((start, table))
+
+        cache.mark_complete('detections', detections_key, len(chunk_ranges), len(frames))
+        cache.mark_complete('tracks', tracks_key, len(chunk_ranges), len(frames))
+        return TrackTable(
+            np.concatenate([[]] + [table.frame + start for start, table in tables]),
+            np.concatenate([[]] + [table.track_id for _, table in tables]),
+            np.concatenate([[]] + [table.cls for _, table in tables]),
+            np.concatenate([np.zeros((0, 4))] + [table.bbox for _, table in tables]),
+            num_frames=len(frames)
+        )
+
+    def load_cached_detections(self, cache, key, index):
+        chunk = cache.load_chunk('detections', key, index)
+        if chunk is None:
+            return None
+        counts = chunk["counts"]  # -1 marks a frame skipped by frame-skipping detection
+        bounds = np.r_[0, np.cumsum(np.maximum(counts, 0))]  # Detections of frame i are rows bounds[i]:bounds[i+1]
+        return [
+            None if count < 0 else sv.Detections(
+                xyxy=chunk["xyxy"][start:stop],
+                confidence=chunk["confidence"][start:stop],
+                class_id=chunk["class_id"][start:stop],
+                data={"class_name": chunk["class_name"][start:stop].astype(object)}  # Tracking them needs no model
+            )
+            for count, start, stop in zip(counts, bounds[:-1], bounds[1:])
+        ]
+
+    def save_cached_detections(self, cache, key, index, detections):
+        counts = np.array([-1 if detection is None else len(detection) for detection in detections], dtype=np.int32)
+        detections = [
+            detection if detection is None or isinstance(detection, sv.Detections) else sv.Detections.from_ultralytics(detection)
+            for detection in detections
+        ]
+        detections = [detection for detection in detections if detection is not None]
+        cache.save_chunk(
+            'detections', key, index,
+            counts=counts,
+            xyxy=np.concatenate([np.zeros((0, 4), dtype=np.float32)] + [detection.xyxy.astype(np.float32) for detection in detections]),
+            confidence=np.concatenate([np.zeros(0, dtype=np.float32)] + [detection.confidence.astype(np.float32) for detection in detections]),
+            class_id=np.concatenate([np.zeros(0, dtype=np.int16)] + [detection.class_id.astype(np.int16) for detection in detections]),
+            class_name=np.concatenate([np.zeros(0, dtype=str)] + [self.class_names(detection).astype(str) for detection in detections])
+        )
+
+    def class_names(self, detection):
+        # Class name of every detection: the inference engine attaches them, the model's names map is the fallback
+        class_names = detection.data.get("class_name")
+        if class_names is None:
+            class_names = [self.model.names[class_id] for class_id in detection.class_id]
+        return np.array(class_names, dtype=object)
+
+    @profiled('bytetrack')
+    def track_detections(self, detections):
+        # ByteTrack keeps its state on self.tracker, so consecutive windows continue the same track ids
         tracks = {
             "players": [],
             "referees": [],
             "ball": []
         }  # Initialize tracks dictionary
 
+        keyframes = []  # Frames that were detected; the others are filled in by interpolation
         for frame_num, detection in enumerate(detections):
-            cls_names = detection.names  # Get class names
-            cls_names_inv = {v: k for k, v in cls_names.items()}  # Invert class names dictionary
-
-            detection_supervision = sv.Detections.from_ultralytics(detection)  # Convert to supervision format
-
-            for object_ind, class_id in enumerate(detection_supervision.class_id):
-                if cls_names[class_id] == "goalkeeper":
-                    detection_supervision.class_id[object_ind] = cls_names_inv["player"]  # Convert goalkeeper to player
+            if detection is None:  # Skipped by frame-skipping detection; ByteTrack does not see it
+                self.ball_tracker.skip(1)
+                tracks["players"].append({})
+                tracks["referees"].append({})
+                tracks["ball"].append({})
+                continue
+            keyframes.append(frame_num)
+
+            if isinstance(detection, sv.Detections):  # Already converted by the inference engine
+                detection_supervision = detection
+            else:
+                detection_supervision = sv.Detections.from_ultralytics(detection)  # Convert to supervision format
+
+            class_names = self.class_names(detection_supervision)  # Objects are told apart by class name
+            class_names[class_names == "goalkeeper"] = "player"  # Convert goalkeeper to player
+            detection_supervision.data["class_name"] = class_names
 
             detection_with_tracks = self.tracker.update_with_detections(detection_supervision)  # Update tracker
 
@@ -78,25 +310,25 @@ class Tracker:
 
             for frame_detection in detection_with_tracks:
                 bbox = frame_detection[0].tolist()  # Get bounding box
-                cls_id = frame_detection[3]         # Get class ID
                 track_id = frame_detection[4]       # Get track ID
+                class_name = frame_detection[5]["class_name"]  # Get class name
 
-                if cls_id == cls_names_inv['player']:
+                if class_name == 'player':
                     tracks["players"][frame_num][track_id] = {"bbox": bbox}  # Add player track
                     
-                if cls_id == cls_names_inv['referee']:
+                if class_name == 'referee':
                     tracks["referees"][frame_num][track_id] = {"bbox": bbox}  # Add referee track
 
-            for frame_detection in detection_supervision:
-                bbox = frame_detection[0].tolist()  # Get bounding box
-                cls_id = frame_detection[3]         # Get class ID
-
-                if cls_id == cls_names_inv['ball']:
-                    tracks["ball"][frame_num][1] = {"bbox": bbox}  # Add ball track
+            is_ball = class_names == 'ball'
+            ball_bbox = self.ball_tracker.update(
+                detection_supervision.xyxy[is_ball],
+                detection_supervision.confidence[is_ball] if detection_supervision.confidence is not None else None
+            )  # The most plausible of the ball detections, if any
+            if ball_bbox is not None:
+                tracks["ball"][frame_num][1] = {"bbox": ball_bbox}  # Add ball track
 
-        if stub_path is not None:
-            with open(stub_path, 'wb') as f:
-                pickle.dump(tracks, f)  # Save tracks to stub file
+        if len(keyframes) < len(detections):
+            self.interpolate_skipped_frames(tracks, keyframes)
 
         return tracks  # Return tracks dictionary
 
@@ -164,20 +396,27 @@ class Tracker:
 
         return frame  # Return the modified frame
 
+    def ball_control_counts(self, team_ball_control, start_counts=(0, 0)):
+        # Frames controlled by each team up to and including every frame, as a (frames, 2) array;
+        # start_counts are the totals before the first frame (e.g. of earlier streamed windows)
+        team_ball_control = np.asarray(team_ball_control)
+        counts = np.stack([team_ball_control == 1, team_ball_control == 2], axis=1).astype(np.int64)
+        return np.cumsum(counts, axis=0) + np.asarray(start_counts, dtype=np.int64)
+
     def draw_team_ball_control(self, frame, frame_num, team_ball_control):
-        overlay = frame.copy()  # Create a copy of the frame for overlay
-        cv2.rectangle(overlay, (1350, 850), (1900, 970), (255, 255, 255), -1)  # Draw a white rectangle
+        # Ball control up to frame_num; draw_annotations takes the counts of all frames from ball_control_counts at once
+        counts = self.ball_control_counts(team_ball_control[:frame_num + 1])
+        team_1_num_frames, team_2_num_frames = counts[-1].tolist() if len(counts) else (0, 0)
+        return self.draw_ball_control_counts(frame, team_1_num_frames, team_2_num_frames)
 
+    def draw_ball_control_counts(self, frame, team_1_num_frames, team_2_num_frames):
+        roi = frame[850:971, 1350:1901]  # The (1350, 850)-(1900, 970) panel, corners included; only it is blended
         alpha = 0.4  # Transparency factor
-        cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)  # Blend the overlay with the frame
-
-        team_ball_control_till_frame = team_ball_control[:frame_num + 1]  # Get ball control data up to current frame
-
-        team_1_num_frames = team_ball_control_till_frame[team_ball_control_till_frame == 1].shape[0]  # Frames controlled by Team 1
-        team_2_num_frames = team_ball_control_till_frame[team_ball_control_till_frame == 2].shape[0]  # Frames controlled by Team 2
+        cv2.addWeighted(roi, 1 - alpha, roi, 0, 255 * alpha, dst=roi)  # Blend a white rectangle into the panel
 
-        team_1 = team_1_num_frames / (team_1_num_frames + team_2_num_frames)  # Calculate control percentage
-        team_2 = team_2_num_frames / (team_1_num_frames + team_2_num_frames)
+        total_num_frames = max(team_1_num_frames + team_2_num_frames, 1)  # No team may have had the ball yet
+        team_1 = team_1_num_frames / total_num_frames  # Calculate control percentage
+        team_2 = team_2_num_frames / total_num_frames
 
         cv2.putText(
             frame,
@@ -201,8 +440,9 @@ class Tracker:
 
         return frame  # Return the modified frame
 
-    def draw_annotations(self, video_frames, tracks, team_ball_control):
+    def draw_annotations(self, video_frames, tracks, team_ball_control, ball_control_start=(0, 0)):
         output_video_frames = []  # Initialize list for output frames
+        ball_control_counts = self.ball_control_counts(team_ball_control, ball_control_start).tolist()  # Computed once for all frames
         for frame_num, frame in enumerate(video_frames):
             frame = frame.copy()  # Copy the frame to avoid modifying the original
 
@@ -223,7 +463,7 @@ class Tracker:
             for track_id, ball in ball_dict.items():
                 frame = self.draw_triangle(frame, ball["bbox"], (0, 0, 255))  # Draw triangle for the ball
 
-            frame = self.draw_team_ball_control(frame, frame_num, team_ball_control)  # Draw ball control stats
+            frame = self.draw_ball_control_counts(frame, *ball_control_counts[frame_num])  # Draw ball control stats
 
             output_video_frames.append(frame)  # Add the annotated frame to the output list
 
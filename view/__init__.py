@@ -1 +1,2 @@
-from .view import ViewTransformer
\ No newline at end of file
+from .view import ViewTransformer
+from .homography import ShotHomography, PitchKeypointDetector, PITCH_KEYPOINTS, pitch_line_points, apply_homography
\ No newline at end of file
@@ -0,0 +1,257 @@
+import numpy as np
+import cv2
+from .view import ViewTransformer
+
+PITCH_LENGTH = 105.0  # Meters; x runs along the touchlines, y along the goal lines
+PITCH_WIDTH = 68.0
+
+def _mirror(points):
+    return [(PITCH_LENGTH - x, y) for x, y in points]
+
+_LEFT_KEYPOINTS = [
+    (0, 0), (0, 13.84), (0, 24.84), (0, 43.16), (0, 54.16), (0, 68),  # Goal line: corner, penalty box, goal area, ..., corner
+    (5.5, 24.84), (5.5, 43.16),  # Goal area front corners
+    (11, 34),  # Penalty spot
+    (16.5, 13.84), (16.5, 54.16)  # Penalty box front corners
+]
+# Pitch keypoints in meters, in the order a pitch keypoint (pose) model must be trained with
+PITCH_KEYPOINTS = np.array(
+    _LEFT_KEYPOINTS + [(52.5, 0), (52.5, 24.85), (52.5, 34), (52.5, 43.15), (52.5, 68)] + _mirror(_LEFT_KEYPOINTS),
+    dtype=np.float32
+)
+
+def _segments():
+    left = [
+        ((0, 0), (0, 68)),
+        ((0, 13.84), (16.5, 13.84)), ((16.5, 13.84), (16.5, 54.16)), ((16.5, 54.16), (0, 54.16)),
+        ((0, 24.84), (5.5, 24.84)), ((5.5, 24.84), (5.5, 43.16)), ((5.5, 43.16), (0, 43.16))
+    ]
+    right = [tuple(_mirror(segment)) for segment in left]
+    return left + right + [((0, 0), (105, 0)), ((0, 68), (105, 68)), ((52.5, 0), (52.5, 68))]
+
+def pitch_line_points(spacing=0.5):
+    # Points every `spacing` meters along the markings of a 105 x 68 m pitch: touchlines, goal lines, halfway
+    # line, penalty and goal areas, center circle and penalty arcs
+    points = []
+    for (x1, y1), (x2, y2) in _segments():
+        steps = max(int(np.hypot(x2 - x1, y2 - y1) / spacing), 1)
+        weights = np.linspace(0, 1, steps + 1)[:, None]
+        points.append(np.array([x1, y1]) + weights * np.array([x2 - x1, y2 - y1]))
+    radius = 9.15
+    angles = np.linspace(0, 2 * np.pi, int(2 * np.pi * radius / spacing), endpoint=False)
+    points.append(np.stack([52.5 + radius * np.cos(angles), 34 + radius * np.sin(angles)], axis=1))
+    arc = angles[np.cos(angles) > (16.5 - 11) / radius]  # Part of the penalty circle outside the box
+    points.append(np.stack([11 + radius * np.cos(arc), 34 + radius * np.sin(arc)], axis=1))
+    points.append(np.stack([PITCH_LENGTH - 11 - radius * np.cos(arc), 34 + radius * np.sin(arc)], axis=1))
+    return np.concatenate(points).astype(np.float32)
+
+def apply_homography(homography, points):
+    # (N, 2) points through a 3x3 homography in one matrix product
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    mapped = points @ homography[:, :2].T + homography[:, 2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return mapped[:, :2] / mapped[:, 2:]
+
+def translation(offset):
+    # Homography of a pixel shift by `offset`
+    return np.array([[1.0, 0.0, offset[0]], [0.0, 1.0, offset[1]], [0.0, 0.0, 1.0]])
+
+class PitchKeypointDetector():
+    # Pitch keypoints of a frame from an ultralytics pose model trained on PITCH_KEYPOINTS (in that order);
+    # returns (pixel points, pitch points) of the keypoints detected with at least `conf` confidence
+    def __init__(self, model_path, conf=0.5):
+        from ultralytics import YOLO  # Only needed when a keypoint model is used
+        self.model = YOLO(model_path)
+        self.conf = conf
+
+    def __call__(self, frame):
+        result = self.model.predict(frame, verbose=False)[0]
+        if result.keypoints is None or len(result.keypoints) == 0:
+            return np.zeros((0, 2), dtype=np.float32), np.zeros((0, 2), dtype=np.float32)
+        count = min(result.keypoints.xy.shape[1], len(PITCH_KEYPOINTS))
+        pixels = result.keypoints.xy[0, :count].cpu().numpy()
+        confidence = result.keypoints.conf[0, :count].cpu().numpy() if result.keypoints.conf is not None else np.ones(count)
+        found = (confidence >= self.conf) & (pixels > 0).all(axis=1)  # Undetected keypoints come back as (0, 0)
+        return pixels[found], PITCH_KEYPOINTS[:count][found]
+
+class ShotHomography():
+    # Pixel -> pitch (meters) homography for every frame of a clip, replacing the fixed ViewTransformer quad.
+    # A homography is only estimated on keyframes: the first frame, scene cuts (a jump in the color histogram)
+    # and, with keyframe_every, every so many frames of a long shot. On a keyframe, pitch keypoints (from
+    # keypoint_detector, e.g. a PitchKeypointDetector) give a first estimate and the painted lines refine it;
+    # without keypoints the previous estimate (or, for the very first shot, initial_homography) is refined from
+    # the lines instead. Between keyframes the homography only follows the camera movement CameraMovementEstimator
+    # already measures: pixel p of frame t is pixel p + (movement since the keyframe) of the keyframe, so all points
+    # of a shot map through the keyframe's homography in one matrix product. When nothing fits, the shot falls
+    # back to ViewTransformer's quad on the camera adjusted positions (position minus the frame's camera
+    # movement), exactly as without a ShotHomography
+    def __init__(self, keypoint_detector=None, initial_homography=None, cut_threshold=0.5, keyframe_every=0,
+                 refine_lines=True, min_keypoints=4, min_line_inliers=0.3, pitch_margin=2.0):
+        self.keypoint_detector = keypoint_detector
+        self.initial_homography = None if initial_homography is None else np.asarray(initial_homography, dtype=np.float64)
+        self.cut_threshold = cut_threshold  # Histogram correlation below this between consecutive frames is a cut
+        self.keyframe_every = keyframe_every  # Re-estimate this often within a shot (0: only on cuts)
+        self.refine_lines = refine_lines
+        self.min_keypoints = min_keypoints
+        self.min_line_inliers = min_line_inliers  # Share of visible line points a refined estimate must explain
+        self.pitch_margin = pitch_margin  # Meters around the pitch that still count as on it
+        self.fallback = ViewTransformer()
+        self.line_points = pitch_line_points()
+        self.reset()
+
+    def reset(self):
+        self.anchors = []  # One per keyframe: {"frame", "shot", "homography", "source"}
+        self.anchor_per_frame = np.zeros(0, dtype=np.int64)
+        self.offset_per_frame = np.zeros((0, 2))  # Camera movement since the frame's keyframe
+        self.movement_per_frame = np.zeros((0, 2))  # Camera movement of the frame itself, for the fallback quad
+        self.num_frames = 0
+        self.shots = 0
+        self.previous_histogram = None
+
+    def histogram(self, frame):
+        small = cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA)
+        histogram = cv2.calcHist([cv2.cvtColor(small, cv2.COLOR_BGR2HSV)], [0, 1], None, [16, 8], [0, 180, 0, 256])
+        return cv2.normalize(histogram, histogram).flatten()
+
+    def line_mask(self, frame):
+        # White markings on grass: bright, unsaturated pixels near green ones (not the stands or the ads)
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        green = cv2.inRange(hsv, (35, 40, 40), (85, 255, 255))
+        white = cv2.inRange(hsv, (0, 0, 170), (180, 70, 255))
+        near_green = cv2.dilate(green, np.ones((15, 15), np.uint8))
+        return cv2.bitwise_and(white, near_green)
+
+    def line_fit(self, frame, homography, iterations=20):
+        # Chamfer matching: Gauss-Newton steps on the 8 homography parameters that pull the projected pitch
+        # markings onto the distance transform's zero set (the line pixels); points further than a shrinking
+        # distance are left out as unmatched. Returns the refined homography and the share of visible marking
+        # points lying on a line (within 3 pixels)
+        mask = self.line_mask(frame)
+        if cv2.countNonZero(mask) < 50:
+            return homography, 0.0
+        distance = cv2.distanceTransform(cv2.bitwise_not(mask), cv2.DIST_L2, 5)
+        gradient_x = cv2.Sobel(distance, cv2.CV_32F, 1, 0, ksize=3) / 8
+        gradient_y = cv2.Sobel(distance, cv2.CV_32F, 0, 1, ksize=3) / 8
+
+        inverse = np.linalg.inv(homography)  # Pitch -> pixels
+        params = (inverse / inverse[2, 2]).ravel()[:8]
+        x, y = self.line_points[:, 0].astype(np.float64), self.line_points[:, 1].astype(np.float64)
+        height, width = mask.shape
+        inliers = 0.0
+        for max_distance in np.geomspace(24, 3, iterations):
+            w = params[6] * x + params[7] * y + 1
+            u = (params[0] * x + params[1] * y + params[2]) / w
+            v = (params[3] * x + params[4] * y + params[5]) / w
+            visible = np.flatnonzero((w > 0) & (u >= 0) & (u < width - 1) & (v >= 0) & (v < height - 1))
+            columns, rows = u[visible].astype(np.int64), v[visible].astype(np.int64)
+            residuals = distance[rows, columns].astype(np.float64)
+            inliers = float(np.mean(residuals <= 3)) if len(visible) else 0.0
+            matched = residuals <= max_distance
+            if matched.sum() < 8:
+                return homography, 0.0
+            points = visible[matched]
+            dx = gradient_x[rows[matched], columns[matched]] / w[points]
+            dy = gradient_y[rows[matched], columns[matched]] / w[points]
+            along = dx * u[points] + dy * v[points]
+            jacobian = np.stack([dx * x[points], dx * y[points], dx, dy * x[points], dy * y[points], dy,
+                                 -along * x[points], -along * y[points]], axis=1)
+            normal = jacobian.T @ jacobian
+            normal += 1e-3 * np.diag(np.diag(normal)) + 1e-12 * np.eye(8)  # Levenberg-Marquardt damping
+            params = params + np.linalg.solve(normal, -jacobian.T @ residuals[matched])
+        return np.linalg.inv(np.r_[params, 1.0].reshape(3, 3)), inliers
+
+    def estimate(self, frame, guess):
+        # (homography, source) for a keyframe; guess is the homography carried over from the previous frame
+        homography, source = None, None
+        if self.keypoint_detector is not None:
+            pixels, pitch = self.keypoint_detector(frame)
+            if len(pixels) >= self.min_keypoints:
+                homography, _ = cv2.findHomography(np.asarray(pixels, np.float32), np.asarray(pitch, np.float32), cv2.RANSAC, 5.0)
+                source = 'keypoints' if homography is not None else None
+        if homography is None and guess is not None:
+            homography, source = guess, 'motion'
+        if homography is None:
+            return None, 'default'
+        if self.refine_lines:
+            refined, inliers = self.line_fit(frame, homography)
+            if inliers >= self.min_line_inliers:
+                return refined, source + '+lines'
+        return homography, source
+
+    def update(self, frames, camera_movement_per_frame):
+        # Adds the frames of a window (the whole clip or consecutive streamed windows) with their camera movement;
+        # returns the clip index of the window's first frame
+        start_frame = self.num_frames
+        camera_movement = np.asarray(camera_movement_per_frame, dtype=np.float64).reshape(-1, 2)
+        anchors = np.empty(len(camera_movement), dtype=np.int64)
+        offsets = np.empty((len(camera_movement), 2))
+        for index, frame in enumerate(frames):
+            frame_num = start_frame + index
+            histogram = self.histogram(frame)
+            cut = self.previous_histogram is None or cv2.compareHist(self.previous_histogram, histogram, cv2.HISTCMP_CORREL) < self.cut_threshold
+            self.previous_histogram = histogram
+
+            anchor = self.anchors[-1] if self.anchors else None
+            if anchor is not None and not cut:
+                offset = (offsets[index - 1] if index else self.offset_per_frame[-1]) + camera_movement[index]
+            else:
+                offset = np.zeros(2)
+            periodic = anchor is not None and self.keyframe_every and frame_num - anchor["frame"] >= self.keyframe_every
+            if cut or periodic:
+                if cut:
+                    self.shots += 1
+                # The estimate carried into this frame: the running shot's homography moved by the camera, or on a cut
+                # the last shot's (broadcasts keep returning to the same camera), or the initial one
+                if anchor is None or anchor["homography"] is None:
+                    guess = self.initial_homography
+                else:
+                    guess = anchor["homography"] @ translation(offset) if not cut else anchor["homography"]
+                homography, source = self.estimate(frame, guess)
+                if cut and source == 'motion' and anchor is not None:
+                    homography, source = None, 'default'  # Another shot's view that the lines did not confirm
+                if cut or source != 'default':
+                    self.anchors.append({"frame": frame_num, "shot": self.shots - 1, "homography": homography, "source": source})
+                    offset = np.zeros(2)
+            anchors[index] = len(self.anchors) - 1
+            offsets[index] = offset
+
+        self.anchor_per_frame = np.concatenate([self.anchor_per_frame, anchors[:len(camera_movement)]])
+        self.offset_per_frame = np.concatenate([self.offset_per_frame, offsets[:len(camera_movement)]])
+        self.movement_per_frame = np.concatenate([self.movement_per_frame, camera_movement])
+        self.num_frames += len(camera_movement)
+        return start_frame
+
+    def transform_points(self, points, frame_nums):
+        # (N, 2) pixel positions of clip frames frame_nums -> (N, 2) pitch coordinates in meters, NaN off the
+        # pitch; one homography application per keyframe
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        frame_nums = np.asarray(frame_nums, dtype=np.int64)
+        transformed = np.full(points.shape, np.nan, dtype=np.float32)
+        anchor_ids = self.anchor_per_frame[frame_nums]
+        shifted = points + self.offset_per_frame[frame_nums]  # Pixels of the keyframe
+        for anchor_id in np.unique(anchor_ids):
+            rows = np.flatnonzero(anchor_ids == anchor_id)
+            homography = self.anchors[anchor_id]["homography"]
+            if homography is None:  # Fixed quad of ViewTransformer on the camera adjusted positions, as without homography estimation
+                adjusted = points[rows].astype(np.float32) - self.movement_per_frame[frame_nums[rows]].astype(np.float32)  # Like adjust_positions
+                transformed[rows] = self.fallback.transform_points(adjusted)
+                continue
+            pitch = apply_homography(homography, shifted[rows])
+            on_pitch = ((pitch[:, 0] >= -self.pitch_margin) & (pitch[:, 0] <= PITCH_LENGTH + self.pitch_margin) &
+                        (pitch[:, 1] >= -self.pitch_margin) & (pitch[:, 1] <= PITCH_WIDTH + self.pitch_margin))
+            transformed[rows[on_pitch]] = pitch[on_pitch]
+        return transformed
+
+    def add_transformed_position_to_table(self, table, start_frame=0):
+        # Same contract as ViewTransformer.add_transformed_position_to_table, from the raw (not camera adjusted)
+        # positions since the camera movement is part of every frame's homography; start_frame is the clip index
+        # of the table's frame 0 (update's return value for a streamed window)
+        table.position_transformed[:] = self.transform_points(table.position, table.frame.astype(np.int64) + start_frame)
+        for class_id in np.unique(table.cls):
+            table.computed.add(('position_transformed', int(class_id)))
+
+    def summary(self):
+        sources = {}
+        for anchor in self.anchors:
+            sources[anchor["source"]] = sources.get(anchor["source"], 0) + 1
+        return {"frames": self.num_frames, "shots": self.shots, "keyframes": len(self.anchors), "sources": sources}
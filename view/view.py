@@ -42,4 +42,38 @@ class ViewTransformer():
                     position_trasnformed = self.transform_point(position)  # Transform the position
                     if position_trasnformed is not None:
                         position_trasnformed = position_trasnformed.squeeze().tolist()  # Squeeze and convert the transformed position to a list
-                    tracks[object][frame_num][track_id]['position_transformed'] = position_trasnformed  # Update the track information with the transformed position
\ No newline at end of file
+                    tracks[object][frame_num][track_id]['position_transformed'] = position_trasnformed  # Update the track information with the transformed position
+
+    def points_inside(self, points):
+        # Vectorized cv2.pointPolygonTest(..) >= 0 for an (N, 2) array; points are truncated to integers first
+        points = np.trunc(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+        x, y = points[:, 0], points[:, 1]
+        inside = np.zeros(len(points), dtype=bool)
+        on_edge = np.zeros(len(points), dtype=bool)
+
+        vertices = self.pixel_vertices.astype(np.float64)
+        for (x1, y1), (x2, y2) in zip(vertices, np.roll(vertices, -1, axis=0)):  # One pass per polygon edge
+            crosses = (y1 > y) != (y2 > y)  # Edge spans the horizontal ray through the point
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            inside ^= crosses & (x < x_cross)
+
+            cross = (x2 - x1) * (y - y1) - (y2 - y1) * (x - x1)  # Zero when the point is on the edge line
+            within = (np.minimum(x1, x2) <= x) & (x <= np.maximum(x1, x2)) & (np.minimum(y1, y2) <= y) & (y <= np.maximum(y1, y2))
+            on_edge |= (cross == 0) & within
+
+        return inside | on_edge
+
+    def transform_points(self, points):
+        # Batch transform_point: (N, 2) pixels -> (N, 2) court coordinates, NaN for points off the court
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        transformed = np.full(points.shape, np.nan, dtype=np.float32)
+        inside = self.points_inside(points) & ~np.isnan(points).any(axis=1)
+        if np.any(inside):
+            transformed[inside] = cv2.perspectiveTransform(points[inside].reshape(-1, 1, 2), self.persepctive_trasnformer).reshape(-1, 2)
+        return transformed
+
+    def add_transformed_position_to_table(self, table):
+        table.position_transformed[:] = self.transform_points(table.position_adjusted)
+        for class_id in np.unique(table.cls):  # Every row now has its transformed position, even if it is None
+            table.computed.add(('position_transformed', int(class_id)))
\ No newline at end of file